@@ -0,0 +1,175 @@
+from __future__ import print_function, division
+import numpy as np
+from ciabatta.meta import make_repr_str
+from spatious import vector
+
+
+class Welford(object):
+    """Streaming mean and variance of a quantity, updated with batches of
+    samples, using Welford's algorithm generalised to batches.
+
+    Parameters
+    ----------
+    shape: tuple[int]
+        Shape of a single sample.
+    """
+
+    def __init__(self, shape=()):
+        self.shape = shape
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = np.zeros(self.shape)
+        self._m2 = np.zeros(self.shape)
+
+    def add(self, xs):
+        """Add a batch of samples, stacked along the first axis."""
+        n_b = xs.shape[0]
+        if not n_b:
+            return
+        mean_b = np.mean(xs, axis=0)
+        m2_b = np.sum(np.square(xs - mean_b), axis=0)
+        count = self.count + n_b
+        delta = mean_b - self.mean
+        self.mean = self.mean + delta * (n_b / count)
+        self._m2 = self._m2 + m2_b + np.square(delta) * (self.count * n_b /
+                                                         count)
+        self.count = count
+
+    @property
+    def var(self):
+        """Unbiased sample variance."""
+        if self.count < 2:
+            return np.full(self.shape, np.nan)
+        return self._m2 / (self.count - 1)
+
+    @property
+    def sem(self):
+        """Standard error of the mean."""
+        return np.sqrt(self.var / self.count)
+
+    def __repr__(self):
+        fs = [('shape', self.shape), ('count', self.count)]
+        return make_repr_str(self, fs)
+
+
+def get_log_lags(lag_max, n_lags):
+    """Return roughly logarithmically spaced integer lags from 1 up to
+    `lag_max`, without duplicates.
+    """
+    return np.unique(np.logspace(0.0, np.log10(lag_max),
+                                 n_lags).astype(np.int64))
+
+
+class OnlineMeasurer(object):
+    """Model observer that accumulates summary measures during a run, so
+    they are available without storing model snapshots.
+
+    The displacement `dr`, its magnitude `dr_mag`, and the direction `u` of
+    every particle are sampled every `sample_every` iterations. Samples are
+    pooled over all particles and over each output interval of `every`
+    iterations, and the pooled mean and standard error are recorded at the
+    end of the interval.
+
+    The mean squared displacement is accumulated at each of a set of lags,
+    averaged over all particles and over non-overlapping time origins
+    throughout the run, starting from the run's initial state.
+
+    Add the measurer to :attr:`Model.observers`, then call
+    :meth:`get_results` or :meth:`save`.
+
+    Parameters
+    ----------
+    every: int
+        Number of iterations in each output interval.
+    sample_every: int
+        Number of iterations between samples within an output interval.
+    lags: array-like[int]
+        Lags, in iterations, at which to accumulate the mean squared
+        displacement. See :func:`get_log_lags`.
+    """
+    measure_names = ('dr', 'dr_mag', 'u')
+
+    def __init__(self, every, sample_every=1, lags=()):
+        self.every = every
+        self.sample_every = sample_every
+        self.lags = np.array(lags, dtype=np.int64)
+
+        self._accs = None
+        self._ts = []
+        self._series = dict((name, ([], [])) for name in self.measure_names)
+        self._msd_accs = [Welford() for _ in self.lags]
+        self._drs_prev = [None for _ in self.lags]
+
+    def _get_samples(self, m, dr):
+        return {'dr': dr, 'dr_mag': vector.vector_mag(dr),
+                'u': m.ships.agents.directions.u}
+
+    def _observe_msd(self, m, dr):
+        for i_lag, lag in enumerate(self.lags):
+            if m.i % lag:
+                continue
+            dr_prev = self._drs_prev[i_lag]
+            # The start of the run is an origin too, where every particle's
+            # displacement is zero.
+            if dr_prev is None and m.i == lag:
+                dr_prev = np.zeros_like(dr)
+            if dr_prev is not None:
+                sd = np.sum(np.square(dr - dr_prev), axis=-1)
+                self._msd_accs[i_lag].add(sd)
+            self._drs_prev[i_lag] = dr.copy()
+
+    def observe(self, m):
+        dr = m.ships.agents.positions.dr
+        if not m.i % self.sample_every:
+            samples = self._get_samples(m, dr)
+            if self._accs is None:
+                self._accs = dict((k, Welford(v.shape[1:]))
+                                  for k, v in samples.items())
+            for k, v in samples.items():
+                self._accs[k].add(v)
+        if len(self.lags):
+            self._observe_msd(m, dr)
+        if not m.i % self.every and self._accs is not None:
+            self._ts.append(m.ships.time.t)
+            for name in self.measure_names:
+                acc = self._accs[name]
+                self._series[name][0].append(acc.mean)
+                self._series[name][1].append(acc.sem)
+                acc.reset()
+
+    @property
+    def msd(self):
+        """Mean squared displacement at each lag, and its uncertainty."""
+        return (np.array([acc.mean for acc in self._msd_accs]),
+                np.array([acc.sem for acc in self._msd_accs]))
+
+    def get_results(self):
+        """Return the accumulated measures.
+
+        Returns
+        -------
+        results: dict[str, numpy.ndarray]
+            Times `t`; for each measure name, the measure `<name>` and its
+            uncertainty `<name>_err` at each time; and the lags `lag`, in
+            iterations, with the mean squared displacement `msd` and its
+            uncertainty `msd_err` at each lag.
+        """
+        results = {'t': np.array(self._ts)}
+        for name in self.measure_names:
+            meases, meas_errs = self._series[name]
+            results[name] = np.array(meases)
+            results[name + '_err'] = np.array(meas_errs)
+        results['lag'] = self.lags
+        results['msd'], results['msd_err'] = self.msd
+        return results
+
+    def save(self, fname):
+        """Save the accumulated measures to a `.npz` file."""
+        np.savez(fname, **self.get_results())
+
+    def __repr__(self):
+        fs = [('every', self.every), ('sample_every', self.sample_every),
+              ('lags', self.lags)]
+        return make_repr_str(self, fs)
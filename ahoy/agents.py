@@ -2,9 +2,12 @@ from __future__ import print_function, division
 import numpy as np
 from ciabatta.meta import make_repr_str
 from ahoy.rudder_sets import rudder_set_factory
-from ahoy.directions import directions_factory
+from ahoy.directions import directions_factory, Directions2D
 from ahoy.positions import positions_factory
-from ahoy.swimmers import swimmers_factory
+from ahoy.swimmers import swimmers_factory, Swimmers
+from ahoy.obstructors import PorousObstructor, NoneObstructor
+from ahoy.streams import subsystem_rng
+from ahoy import numerics
 
 
 class Agents(object):
@@ -15,11 +18,22 @@ class Agents(object):
         self.positions = positions
         self.swimmers = swimmers
 
+    def _get_scratch(self):
+        """Return arrays preallocated for the displacement and for wrapping,
+        so a step need not allocate them."""
+        try:
+            return self._dr, self._work
+        except AttributeError:
+            self._dr = np.empty([self.n, self.directions.dim])
+            self._work = np.empty([self.n])
+            return self._dr, self._work
+
     def iterate(self, dt, rng, obstructor):
         self.rudder_sets.rotate(self.directions, dt, rng)
-        dr = self.swimmers.get_dr(dt)
-        self.positions.displace(dr)
-        obstructor.obstruct(self.positions, dr, self.directions)
+        dr, work = self._get_scratch()
+        self.swimmers.get_dr(dt, out=dr)
+        self.positions.displace(dr, work)
+        obstructor.obstruct(self.positions, dr, self.directions, rng)
 
     @property
     def chi(self):
@@ -33,12 +47,89 @@ class Agents(object):
     def n(self):
         return self.directions.n
 
+    def __getstate__(self):
+        # Don't store the scratch arrays, make them again when needed.
+        state = self.__dict__.copy()
+        for k in ('_dr', '_work'):
+            state.pop(k, None)
+        return state
+
     def __repr__(self):
         fs = [('directions', self.directions), ('positions', self.positions),
               ('rudder_sets', self.rudder_sets), ('swimmers', self.swimmers)]
         return make_repr_str(self, fs)
 
 
+class FusedAgents(Agents):
+    """Agents whose displacement, wrapping and obstruction are done in a
+    single compiled pass over the particles, into preallocated arrays.
+
+    Only 2D swimming agents are supported. Obstruction is fused only for
+    porous obstructors; other obstructors fall back to stepping as in
+    :class:`Agents`. Rudder rotation and obstruction turning consume random
+    numbers exactly as in :class:`Agents`.
+    """
+
+    def __init__(self, directions, positions, rudder_sets, swimmers):
+        if not (isinstance(directions, Directions2D) and
+                isinstance(swimmers, Swimmers)):
+            raise NotImplementedError('Fused stepping only implemented for '
+                                      '2D swimming agents')
+        super(FusedAgents, self).__init__(directions, positions, rudder_sets,
+                                          swimmers)
+        try:
+            self._L = self.positions.L
+        except AttributeError:
+            self._L = np.full([self.positions.dim], np.inf)
+
+    def _get_fused_scratch(self):
+        """Return arrays preallocated for the obstruction flags and normals,
+        and the pore arguments to use when there are no pores."""
+        try:
+            return self._obs, self._th_normals, self._no_pore_args
+        except AttributeError:
+            self._obs = np.zeros([self.n], dtype=np.uint8)
+            self._th_normals = np.zeros([self.n])
+            self._no_pore_args = (np.zeros([0, 2]), 0.0,
+                                  np.zeros([1, 1], dtype=np.int64),
+                                  np.ones([2], dtype=np.int64), np.ones([2]),
+                                  np.zeros([0, 2], dtype=np.int64))
+            return self._obs, self._th_normals, self._no_pore_args
+
+    def _get_pore_args(self, obstructor, no_pore_args):
+        if isinstance(obstructor, PorousObstructor) and obstructor.n:
+            cl = obstructor.cell_list
+            return (cl.rs, obstructor.R ** 2, cl.cell_members, cl.n_cells,
+                    cl.dx, cl.offsets)
+        return no_pore_args
+
+    def iterate(self, dt, rng, obstructor):
+        if not (isinstance(obstructor, PorousObstructor) or
+                obstructor.__class__ is NoneObstructor):
+            super(FusedAgents, self).iterate(dt, rng, obstructor)
+            return
+        self.rudder_sets.rotate(self.directions, dt, rng)
+        obs, th_normals, no_pore_args = self._get_fused_scratch()
+        (pore_rs, R_sq, cell_members, n_cells, cell_dx,
+         offsets) = self._get_pore_args(obstructor, no_pore_args)
+        numerics.step_fused(self.directions.th, self.positions.r_w, self._L,
+                            self.swimmers.v_0, dt,
+                            pore_rs, R_sq, cell_members, n_cells, cell_dx,
+                            offsets, obs, th_normals)
+        self.positions.wrap()
+        if pore_rs.shape[0]:
+            obs = obs.view(np.bool_)
+            obstructor.turner.turn(obs, self.directions, th_normals[obs],
+                                   subsystem_rng(rng, 'obstruction'))
+
+    def __getstate__(self):
+        # Don't store the fused stepping's scratch arrays either.
+        state = super(FusedAgents, self).__getstate__()
+        for k in ('_obs', '_th_normals', '_no_pore_args'):
+            state.pop(k, None)
+        return state
+
+
 def agents_factory(rng, dim, aligned_flag,
                    n=None, rho_0=None,
                    chi=None, onesided_flag=None,
@@ -47,7 +138,9 @@ def agents_factory(rng, dim, aligned_flag,
                    temporal_chemo_flag=None, dt_mem=None, t_mem=None, time=None,
                    spatial_flag=None, v_0=None,
                    periodic_flag=None, L=None, origin_flags=None, obstructor=None,
-                   c_field_flag=None, c_field=None):
+                   c_field_flag=None, c_field=None, fused_flag=None,
+                   mem_recursive_flag=None, u_0=None, r_0=None,
+                   mem_time_major_flag=None, mem_single_flag=None):
     if rho_0 is not None:
         try:
             volume_free = obstructor.volume_free
@@ -55,15 +148,20 @@ def agents_factory(rng, dim, aligned_flag,
             volume_free = np.product(L)
         n = int(round(rho_0 * volume_free))
     ds = directions_factory(n, dim, aligned_flag=aligned_flag,
-                            rng=rng)
+                            rng=rng, u_0=u_0)
     ps = positions_factory(spatial_flag, periodic_flag, n, dim, L,
-                           origin_flags, rng, obstructor)
+                           origin_flags, rng, obstructor, r_0)
     rudder_sets = rudder_set_factory(temporal_chemo_flag,
                                      ds,
                                      ps, v_0, dt_mem, t_mem, time,
                                      c_field_flag, c_field,
                                      onesided_flag, chi,
                                      tumble_flag, p_0, tumble_chemo_flag,
-                                     rotation_flag, Dr_0, dim, rotation_chemo_flag)
+                                     rotation_flag, Dr_0, dim, rotation_chemo_flag,
+                                     mem_recursive_flag, mem_time_major_flag,
+                                     mem_single_flag)
     swims = swimmers_factory(spatial_flag, v_0, ds)
-    return Agents(ds, ps, rudder_sets, swims)
+    if fused_flag:
+        return FusedAgents(ds, ps, rudder_sets, swims)
+    else:
+        return Agents(ds, ps, rudder_sets, swims)
@@ -0,0 +1,125 @@
+from __future__ import print_function, division
+from itertools import product
+import numpy as np
+from ciabatta.meta import make_repr_str
+
+
+class CellList(object):
+    """Uniform-grid spatial index over a fixed set of points in a
+    periodic box.
+
+    The box is divided into cells at least `r_cut` long on each side, so any
+    point within `r_cut` of a query position lies in the query's own cell or
+    one of its neighbours.
+
+    Parameters
+    ----------
+    rs: numpy.ndarray[dtype=float, shape=(m, d)]
+        Indexed points, assumed to lie in the box centred on the origin.
+    L: numpy.ndarray[dtype=float, shape=(d,)]
+        System lengths.
+    r_cut: float
+        Distance out to which neighbour queries are guaranteed complete.
+    """
+
+    def __init__(self, rs, L, r_cut):
+        self.rs = rs
+        self.L = L
+        self.r_cut = r_cut
+        self.n_cells = np.maximum(1, np.floor(L / r_cut).astype(np.int64))
+        self.dx = L / self.n_cells
+
+        cids = self._get_cell_ids(self.rs)
+        n_cells_tot = int(np.prod(self.n_cells))
+        counts = np.bincount(cids, minlength=n_cells_tot)
+        starts = np.cumsum(counts) - counts
+        order = np.argsort(cids, kind='mergesort')
+        slots = np.arange(len(order)) - starts[cids[order]]
+        self.cell_members = np.full([n_cells_tot, max(counts.max(), 1)], -1,
+                                    dtype=np.int64)
+        self.cell_members[cids[order], slots] = order
+
+        self.offsets = np.array(list(product([-1, 0, 1], repeat=self.dim)),
+                                dtype=np.int64)
+
+    @property
+    def dim(self):
+        return self.L.shape[0]
+
+    @property
+    def n(self):
+        return self.rs.shape[0]
+
+    def _get_cell_coords(self, rs):
+        coords = np.floor((rs + self.L / 2.0) / self.dx).astype(np.int64)
+        return coords % self.n_cells
+
+    def _get_cell_ids(self, rs):
+        return np.ravel_multi_index(self._get_cell_coords(rs).T, self.n_cells)
+
+    def get_candidates(self, rs):
+        """Find the indexed points that may lie within `r_cut` of each
+        position.
+
+        Parameters
+        ----------
+        rs: numpy.ndarray[dtype=float, shape=(n, d)]
+            Query positions.
+
+        Returns
+        -------
+        candidates: numpy.ndarray[dtype=int, shape=(n, k)]
+            Indexes of points in each position's neighbouring cells,
+            padded with -1.
+        """
+        coords = self._get_cell_coords(rs)
+        coords_nbr = ((coords[:, np.newaxis, :] + self.offsets) %
+                      self.n_cells)
+        cids_nbr = np.ravel_multi_index(np.moveaxis(coords_nbr, -1, 0),
+                                        self.n_cells)
+        return self.cell_members[cids_nbr].reshape([rs.shape[0], -1])
+
+    def csep_periodic_close(self, rs):
+        """Return the closest separation vector between each position and
+        the indexed points, in periodic space.
+
+        Separations are computed with the same arithmetic as
+        :func:`spatious.distance.csep_periodic_close`, so any separation
+        shorter than `r_cut` is identical to the all-pairs result.
+        Positions with no indexed point in their neighbouring cells get an
+        infinite separation.
+
+        Parameters
+        ----------
+        rs: numpy.ndarray[dtype=float, shape=(n, d)]
+            Query positions.
+
+        Returns
+        -------
+        sep: numpy.ndarray[dtype=float, shape=(n, d)]
+            Closest separation vectors, pointing from the indexed point to
+            the position.
+        sep_sq: numpy.ndarray[dtype=float, shape=(n,)]
+            Squared magnitudes of `sep`.
+        """
+        cands = self.get_candidates(rs)
+        valid = cands >= 0
+        seps = rs[:, np.newaxis, :] - self.rs[cands]
+        for i_dim in range(self.dim):
+            seps_dim = seps[:, :, i_dim]
+            seps_dim[seps_dim > self.L[i_dim] / 2.0] -= self.L[i_dim]
+            seps_dim[seps_dim < -self.L[i_dim] / 2.0] += self.L[i_dim]
+        seps[~valid] = np.inf
+        seps_sq = np.sum(np.square(seps), axis=-1)
+
+        # Break ties on the lowest point index, like the all-pairs argmin.
+        is_min = seps_sq == seps_sq.min(axis=-1, keepdims=True)
+        i_close = np.argmin(np.where(is_min & valid, cands, self.n), axis=-1)
+
+        i_all = np.arange(rs.shape[0])
+        return seps[i_all, i_close], seps_sq[i_all, i_close]
+
+    def __repr__(self):
+        fs = [('n', self.n), ('L', self.L), ('r_cut', self.r_cut),
+              ('n_cells', self.n_cells)]
+        return make_repr_str(self, fs)
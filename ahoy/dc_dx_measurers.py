@@ -2,7 +2,7 @@ from __future__ import print_function, division
 from abc import ABCMeta, abstractmethod
 import numpy as np
 from ciabatta.meta import make_repr_str
-from ahoy.ring_buffer import CylinderBuffer
+from ahoy.ring_buffer import CylinderBuffer, ExpPolyFilter
 from ahoy import measurers, c_measurers
 
 
@@ -18,6 +18,31 @@ def get_K(t, dt, t_rot_0):
     return K
 
 
+def get_K_recursive(dt, t_rot_0):
+    """Return the memory kernel of :func:`get_K`, multiplied by `dt`, as
+    an exponential decay per time step, and quadratic coefficients, in
+    the form used by :class:`ExpPolyFilter`.
+
+    The kernel has infinite memory, so rather than rescaling its negative
+    part to make it sum to zero, its constant coefficient is adjusted. It is
+    normalised in the same way as :func:`get_K`, so it gives the same
+    response to a linear gradient once the memory is full.
+    """
+    A = 0.5
+    g = dt / t_rot_0
+    decay = np.exp(-g)
+    # Sums over p of decay ** p * p ** k, for k in 0, 1, 2, 3.
+    S = np.array([1.0,
+                  decay,
+                  decay * (1.0 + decay),
+                  decay * (1.0 + 4.0 * decay + decay ** 2)])
+    S /= (1.0 - decay) ** np.arange(1, 5)
+    coeffs = np.array([0.0, -A * g, -A * g ** 2 / 2.0])
+    coeffs[0] = -np.dot(coeffs[1:], S[1:3]) / S[0]
+    norm_const = -dt * np.dot(coeffs, S[1:])
+    return decay, coeffs / norm_const
+
+
 class DcDxMeasurer(measurers.Measurer):
     __metaclass__ = ABCMeta
 
@@ -44,15 +69,25 @@ class SpatialDcDxMeasurer(DcDxMeasurer):
 class TemporalDcDxMeasurer(DcDxMeasurer):
 
     def __init__(self, c_measurer, v_0, dt_mem, t_mem, t_rot_0,
-                 time):
+                 time, mem_recursive_flag=False, mem_time_major_flag=None,
+                 mem_single_flag=None):
         self.c_measurer = c_measurer
         self.v_0 = v_0
         self.dt_mem = dt_mem
         self.t_mem = t_mem
+        self.mem_recursive_flag = mem_recursive_flag
         cs = self.c_measurer.get_cs()
         n = cs.shape[0]
-        self.K_dt = get_K(self.t_mem, self.dt_mem, t_rot_0) * self.dt_mem
-        self.c_mem = CylinderBuffer(n, self.K_dt.shape[0])
+        # The recursive memory applies the kernel without truncating it at
+        # `t_mem`, storing three values per particle rather than the history.
+        if self.mem_recursive_flag:
+            decay, self.K_dt = get_K_recursive(self.dt_mem, t_rot_0)
+            self.c_mem = ExpPolyFilter(n, decay)
+        else:
+            self.K_dt = get_K(self.t_mem, self.dt_mem, t_rot_0) * self.dt_mem
+            self.c_mem = CylinderBuffer(n, self.K_dt.shape[0],
+                                        time_major_flag=mem_time_major_flag,
+                                        single_flag=mem_single_flag)
         self.time = time
 
         # Optimisation, only calculate dc_dx when c memory is updated.
@@ -79,9 +114,15 @@ class TemporalDcDxMeasurer(DcDxMeasurer):
         self.iterate()
         return self.dc_dx_cache
 
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # Snapshots from before memory could be recursive.
+        self.__dict__.setdefault('mem_recursive_flag', False)
+
     def __repr__(self):
         fs = [('c_measurer', self.c_measurer), ('v_0', self.v_0),
               ('dt_mem', self.dt_mem), ('t_mem', self.t_mem),
+              ('mem_recursive_flag', self.mem_recursive_flag),
               ('t_last_update', self.t_last_update)]
         return make_repr_str(self, fs)
 
@@ -89,10 +130,13 @@ class TemporalDcDxMeasurer(DcDxMeasurer):
 def dc_dx_factory(temporal_chemo_flag,
                   ds=None,
                   ps=None, v_0=None, dt_mem=None, t_mem=None, t_rot_0=None, time=None,
-                  c_field_flag=None, c_field=None):
+                  c_field_flag=None, c_field=None, mem_recursive_flag=None,
+                  mem_time_major_flag=None, mem_single_flag=None):
     if temporal_chemo_flag:
         return temporal_dc_dx_factory(ps, v_0, dt_mem, t_mem, t_rot_0, time,
-                                      c_field_flag, c_field)
+                                      c_field_flag, c_field,
+                                      mem_recursive_flag, mem_time_major_flag,
+                                      mem_single_flag)
     else:
         return spatial_dc_dx_factory(ds, c_field_flag, c_field, ps)
 
@@ -106,9 +150,13 @@ def spatial_dc_dx_factory(ds, c_field_flag=None, c_field=None, ps=None):
 
 
 def temporal_dc_dx_factory(ps, v_0, dt_mem, t_mem, t_rot_0, time,
-                           c_field_flag=None, c_field=None):
+                           c_field_flag=None, c_field=None,
+                           mem_recursive_flag=None, mem_time_major_flag=None,
+                           mem_single_flag=None):
     if not c_field_flag:
         c_measurer = c_measurers.LinearCMeasurer(ps)
     else:
         c_measurer = c_measurers.FieldCMeasurer(c_field, ps)
-    return TemporalDcDxMeasurer(c_measurer, v_0, dt_mem, t_mem, t_rot_0, time)
+    return TemporalDcDxMeasurer(c_measurer, v_0, dt_mem, t_mem, t_rot_0, time,
+                                mem_recursive_flag, mem_time_major_flag,
+                                mem_single_flag)
@@ -1,8 +1,8 @@
 from __future__ import print_function, division
 import numpy as np
-from ciabatta import crandom
 from ciabatta.meta import make_repr_str
 from spatious import vector
+from ahoy.streams import draw_masked, draw_sphere_masked
 
 
 class Directions1D(object):
@@ -21,7 +21,20 @@ class Directions1D(object):
 
     @property
     def u(self):
-        return self.sign[:, np.newaxis].copy()
+        return self.get_u()
+
+    def get_u(self, out=None):
+        """Return the direction vectors.
+
+        Parameters
+        ----------
+        out: numpy.ndarray[dtype=float, shape=(n, d)]
+            Array in which to write the vectors, to avoid allocating one.
+        """
+        if out is None:
+            return self.sign[:, np.newaxis].astype(np.float)
+        out[:, 0] = self.sign
+        return out
 
     @property
     def u_0(self):
@@ -30,7 +43,7 @@ class Directions1D(object):
     def tumble(self, tumblers, rng=None):
         if rng is None:
             rng = np.random
-        self.sign[tumblers] = crandom.randbool(tumblers.sum(), rng=rng)
+        self.sign[tumblers] = draw_masked(rng, 'randint', tumblers, 2) * 2 - 1
 
     def __repr__(self):
         fs = [('n', self.n)]
@@ -38,48 +51,178 @@ class Directions1D(object):
 
 
 class Directions2D(Directions1D):
+    """Directions in 2D, stored as angles.
+
+    The direction vectors are cached, and only those of particles whose
+    angles have changed since they were last computed are recomputed. Angles
+    should therefore be changed only through :meth:`rotate`, :meth:`tumble`
+    and :meth:`set_th`, which mark the particles they change.
+    """
 
     def __init__(self, u_0):
         self.th = np.arctan2(u_0[:, 1], u_0[:, 0])
         self.th_0 = self.th.copy()
+        self._init_u_cache()
 
-    def _th_to_u(self, th):
-        return np.array([np.cos(th), np.sin(th)]).T
+    def _init_u_cache(self):
+        self._u = np.empty([self.th.shape[0], 2])
+        self._dirty = np.ones([self.th.shape[0]], dtype=np.bool)
 
     @property
-    def u(self):
-        return self._th_to_u(self.th)
+    def n(self):
+        return self.th.shape[0]
+
+    @property
+    def dim(self):
+        return 2
+
+    def _th_to_u(self, th, out=None):
+        if out is None:
+            out = np.empty([th.shape[0], 2])
+        np.cos(th, out=out[:, 0])
+        np.sin(th, out=out[:, 1])
+        return out
+
+    def _update_u_cache(self):
+        dirty = self._dirty
+        if dirty.all():
+            self._th_to_u(self.th, self._u)
+        elif dirty.any():
+            i_dirty = np.nonzero(dirty)[0]
+            self._u[i_dirty] = self._th_to_u(self.th[i_dirty])
+        else:
+            return
+        dirty.fill(False)
+
+    def get_u(self, out=None):
+        self._update_u_cache()
+        if out is None:
+            return self._u.copy()
+        out[...] = self._u
+        return out
 
     @property
     def u_0(self):
         return self._th_to_u(self.th_0)
 
+    def set_th(self, ids, th):
+        """Set the angles of some particles.
+
+        Parameters
+        ----------
+        ids: numpy.ndarray[dtype=bool or int]
+            Mask or indices of the particles to change.
+        th: numpy.ndarray[dtype=float]
+            New angles.
+        """
+        self.th[ids] = th
+        self._dirty[ids] = True
+
     def tumble(self, tumblers, rng=None):
         if rng is None:
             rng = np.random
-        self.th[tumblers] = rng.uniform(-np.pi, np.pi, size=tumblers.sum())
+        self.set_th(tumblers, draw_masked(rng, 'uniform', tumblers,
+                                          -np.pi, np.pi))
 
     def rotate(self, dth):
         self.th += dth
+        self._dirty.fill(True)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # Snapshots from before the direction vectors were cached.
+        if '_u' not in state:
+            self._init_u_cache()
 
     def __repr__(self):
         fs = [('n', self.n)]
         return make_repr_str(self, fs)
 
 
+class Directions3D(Directions1D):
+    """Directions in 3D, stored as unit vectors.
+
+    Rotations are given as rotation vectors, whose direction is the axis
+    and whose magnitude is the angle of each particle's rotation.
+    """
+
+    def __init__(self, u_0):
+        self._u = vector.vector_unit_nonull(u_0.astype(np.float))
+        self._u_0 = self._u.copy()
+
+    @property
+    def n(self):
+        return self._u.shape[0]
+
+    @property
+    def dim(self):
+        return 3
+
+    def get_u(self, out=None):
+        if out is None:
+            return self._u.copy()
+        out[...] = self._u
+        return out
+
+    @property
+    def u_0(self):
+        return self._u_0.copy()
+
+    def set_u(self, ids, u):
+        """Set the directions of some particles.
+
+        Parameters
+        ----------
+        ids: numpy.ndarray[dtype=bool or int]
+            Mask or indices of the particles to change.
+        u: numpy.ndarray[dtype=float, shape=(m, 3)]
+            New unit vectors.
+        """
+        self._u[ids] = u
+
+    def tumble(self, tumblers, rng=None):
+        if rng is None:
+            rng = np.random
+        self.set_u(tumblers, draw_sphere_masked(rng, tumblers))
+
+    def rotate(self, dth):
+        """Rotate every particle by Rodrigues' formula.
+
+        Parameters
+        ----------
+        dth: numpy.ndarray[dtype=float, shape=(n, 3)]
+            Rotation vector of each particle.
+        """
+        th = vector.vector_mag(dth)[:, np.newaxis]
+        k = vector.vector_unit_nullnull(dth)
+        u = self._u
+        k_dot_u = np.sum(k * u, axis=-1)[:, np.newaxis]
+        cos_th = np.cos(th)
+        u_rot = (u * cos_th + np.cross(k, u) * np.sin(th) +
+                 k * (k_dot_u * (1.0 - cos_th)))
+        # Correct the slow drift in magnitude due to rounding.
+        self._u[...] = vector.vector_unit_nonull(u_rot)
+
+
 def directions_nd(u_0):
     dim = u_0.shape[1]
     if dim == 1:
         return Directions1D(u_0)
     elif dim == 2:
         return Directions2D(u_0)
+    elif dim == 3:
+        return Directions3D(u_0)
+    else:
+        raise NotImplementedError('No directions implemented in this '
+                                  'dimension')
 
 
-def directions_factory(n, dim, aligned_flag=False, rng=None):
-    if aligned_flag:
-        u_0 = get_aligned_vectors(n, dim)
-    else:
-        u_0 = get_uniform_vectors(n, dim, rng)
+def directions_factory(n, dim, aligned_flag=False, rng=None, u_0=None):
+    if u_0 is None:
+        if aligned_flag:
+            u_0 = get_aligned_vectors(n, dim)
+        else:
+            u_0 = get_uniform_vectors(n, dim, rng)
     return directions_nd(u_0)
 
 
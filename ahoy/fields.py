@@ -1,15 +1,41 @@
 from __future__ import print_function, division
+import inspect
 import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import cg, spsolve, splu, LinearOperator
+from scipy.fft import dctn, idctn, fftn, ifftn
 import fipy
+from fipy.meshes.uniformGrid import UniformGrid
 from fipy.terms import TransientTerm, DiffusionTerm, ImplicitSourceTerm
 from ciabatta.meta import make_repr_str
+from ahoy.mesh import cell_locator_factory
+from ahoy.interpolation import interpolator_factory
+
+# SciPy 1.12 renamed the conjugate gradient solver's relative tolerance from
+# `tol` to `rtol`, and 1.14 removed `tol`.
+if 'rtol' in inspect.signature(cg).parameters:
+    _cg_rtol_kwarg = 'rtol'
+else:
+    _cg_rtol_kwarg = 'tol'
 
 
 class Field(object):
-    def __init__(self, mesh, c_0):
+    def __init__(self, mesh, c_0, interp_flag=False):
         self.mesh = mesh
         self.c_0 = c_0
+        self.interp_flag = interp_flag
         self.c = fipy.CellVariable(mesh=self.mesh, value=self.c_0)
+        self.cell_locator = cell_locator_factory(self.mesh)
+        if self.interp_flag:
+            self.interpolator = interpolator_factory(self.mesh)
+
+        # Optimisation, the nearest cells of the last points looked up, as
+        # particles are usually looked up several times before moving.
+        self._cids_rs = None
+        self._cids = None
+        self._stencils_rs = None
+        self._stencils = None
+        self._grad_c = None
 
     @property
     def dim(self):
@@ -19,15 +45,41 @@ class Field(object):
         return ps.r_w.T
 
     def _get_nearest_cell_ids(self, rs):
-        return self.mesh._getNearestCellID(rs)
+        if not np.array_equal(rs, self._cids_rs):
+            self._cids = self.cell_locator.get_nearest_cell_ids(rs)
+            self._cids_rs = rs.copy()
+        return self._cids
 
     def get_nearest_cell_ids(self, ps):
         return self._get_nearest_cell_ids(self._ps_to_rs(ps))
 
+    @property
+    def grad_c(self):
+        """Gradient of `c` at each cell, as an array of shape `(d, m)`.
+
+        It is evaluated on first use, and kept until `c` is next solved for,
+        so it is never computed if nothing samples it.
+        """
+        if self._grad_c is None:
+            self._grad_c = np.array(self.c.grad.value)
+        return self._grad_c
+
+    def _get_stencils(self, rs):
+        if not np.array_equal(rs, self._stencils_rs):
+            self._stencils = self.interpolator.get_stencils(rs)
+            self._stencils_rs = rs.copy()
+        return self._stencils
+
     def _get_grad_i(self, rs):
-        return self.c.grad[:, self._get_nearest_cell_ids(rs)].value.T
+        if self.interp_flag:
+            cids, weights = self._get_stencils(rs)
+            return np.sum(self.grad_c[:, cids] * weights, axis=-1).T
+        return self.grad_c[:, self._get_nearest_cell_ids(rs)].T
 
     def _get_val_i(self, rs):
+        if self.interp_flag:
+            cids, weights = self._get_stencils(rs)
+            return np.sum(self.c.value[cids] * weights, axis=-1)
         return self.c[self._get_nearest_cell_ids(rs)].value.T
 
     def get_grad_i(self, ps):
@@ -36,17 +88,38 @@ class Field(object):
     def get_val_i(self, ps):
         return self._get_val_i(self._ps_to_rs(ps))
 
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # Snapshots from before fields were interpolated and looked up by a
+        # cell locator.
+        self.__dict__.setdefault('interp_flag', False)
+        for k in ('_cids_rs', '_cids', '_stencils_rs', '_stencils',
+                  '_grad_c'):
+            self.__dict__.setdefault(k, None)
+        if 'cell_locator' not in state:
+            self.cell_locator = cell_locator_factory(self.mesh)
+
     def __repr__(self):
-        fs = [('dim', self.dim), ('mesh', self.mesh), ('c_0', self.c_0)]
+        fs = [('dim', self.dim), ('mesh', self.mesh), ('c_0', self.c_0),
+              ('interp_flag', self.interp_flag)]
         return make_repr_str(self, fs)
 
 
 class FoodField(Field):
+    """Concentration field that diffuses, and is consumed by particles.
 
-    def __init__(self, mesh, D, delta, c_0):
-        super(FoodField, self).__init__(mesh, c_0)
+    The field changes slowly compared to the particles, so it can be solved
+    for only every `every` steps, with a single implicit step over the
+    elapsed time, consuming the particle density averaged over those steps.
+    """
+
+    def __init__(self, mesh, D, delta, c_0, interp_flag=False, every=1):
+        super(FoodField, self).__init__(mesh, c_0, interp_flag)
         self.D = D
         self.delta = delta
+        self.every = every
+        self._rho_sum = None
+        self._i_sub = 0
 
         self.rho = fipy.CellVariable(mesh=self.mesh, value=0.0)
 
@@ -61,17 +134,209 @@ class FoodField(Field):
         np.add.at(rho_array, cids, drhos)
         return rho_array
 
-    def iterate(self, ps, dt):
-        rho_array = self._get_rho_array(ps)
+    def _solve(self, rho_array, dt):
         self.rho.setValue(rho_array)
         self.eq.solve(dt=dt)
 
+    def iterate(self, ps, dt):
+        rho_array = self._get_rho_array(ps)
+        if self.every > 1:
+            if self._i_sub == 0:
+                self._rho_sum = rho_array
+            else:
+                self._rho_sum += rho_array
+            self._i_sub += 1
+            if self._i_sub < self.every:
+                return
+            rho_array = self._rho_sum / self.every
+            self._i_sub = 0
+        self._solve(rho_array, self.every * dt)
+        self._grad_c = None
+
+    def __setstate__(self, state):
+        super(FoodField, self).__setstate__(state)
+        # Snapshots from before the field could be solved every few steps.
+        self.__dict__.setdefault('every', 1)
+        self.__dict__.setdefault('_rho_sum', None)
+        self.__dict__.setdefault('_i_sub', 0)
+
     def __repr__(self):
         fs = [('dim', self.dim), ('mesh', self.mesh), ('c_0', self.c_0),
-              ('D', self.D), ('delta', self.delta)]
+              ('D', self.D), ('delta', self.delta),
+              ('interp_flag', self.interp_flag), ('every', self.every)]
         return make_repr_str(self, fs)
 
 
+def get_diffusion_matrix(mesh, D):
+    """Return the finite-volume matrix of `-D` times the Laplacian,
+    integrated over each cell, with no-flux boundaries, as assembled by
+    FiPy's `DiffusionTerm`.
+
+    Parameters
+    ----------
+    mesh: fipy.meshes.mesh.Mesh
+        Mesh.
+    D: float
+        Diffusion coefficient.
+
+    Returns
+    -------
+    K: scipy.sparse.csr_matrix[shape=(m, m)]
+        Matrix.
+    """
+    interior = np.asarray(mesh.interiorFaces)
+    i, j = np.asarray(mesh.faceCellIDs.data)[:, interior]
+    coeffs = D * (np.asarray(mesh._faceAreas) /
+                  np.asarray(mesh._cellDistances))[interior]
+    rows = np.concatenate([i, j, i, j])
+    cols = np.concatenate([j, i, i, j])
+    vals = np.concatenate([-coeffs, -coeffs, coeffs, coeffs])
+    n = mesh.numberOfCells
+    return sparse.coo_matrix((vals, (rows, cols)), shape=(n, n)).tocsr()
+
+
+class SparseFoodField(FoodField):
+    """Food field that is solved without going through FiPy.
+
+    The diffusion matrix is assembled once, and only its diagonal, which
+    holds the time step and the rho-dependent sink, is updated each step.
+    The system is solved by conjugate gradients, starting from the previous
+    step's solution.
+
+    The solve is preconditioned either by the inverse of the diagonal, or
+    by an LU factorisation of the sink-free matrix, which is constant for a
+    fixed time step, so is made once and reused across steps. The sink
+    changes each step with the particles, so is left out. The factorisation
+    pays off only when the sink is weak compared to diffusion, because each
+    of its solves costs as much as tens of Jacobi iterations.
+
+    Parameters
+    ----------
+    tol: float
+        Relative tolerance of the solution.
+    precond: str
+        Preconditioner, either `'jacobi'` or `'lu'`.
+    """
+
+    def __init__(self, mesh, D, delta, c_0, interp_flag=False, every=1,
+                 tol=1e-10, precond='jacobi'):
+        super(SparseFoodField, self).__init__(mesh, D, delta, c_0,
+                                              interp_flag, every)
+        if precond not in ('jacobi', 'lu'):
+            raise NotImplementedError('Unknown preconditioner {}'
+                                      .format(precond))
+        self.tol = tol
+        self.precond = precond
+        self._vols = np.asarray(self.mesh.cellVolumes)
+        self._K = get_diffusion_matrix(self.mesh, self.D)
+        self._dt = None
+
+    def _assemble(self, dt):
+        self._A = (self._K + sparse.diags(self._vols / dt)).tocsr()
+        rows = np.repeat(np.arange(self._A.shape[0]),
+                         np.diff(self._A.indptr))
+        self._i_diag = np.where(self._A.indices == rows)[0]
+        self._A_diag_0 = self._A.data[self._i_diag].copy()
+        if self.precond == 'lu':
+            self._lu = splu(self._A.tocsc())
+        self._dt = dt
+
+    def _solve(self, rho_array, dt):
+        self.rho.setValue(rho_array)
+        if dt != self._dt:
+            self._assemble(dt)
+        A_diag = self._A_diag_0 + self.delta * rho_array * self._vols
+        self._A.data[self._i_diag] = A_diag
+        c_old = np.array(self.c.value)
+        b = self._vols / dt * c_old
+        if self.precond == 'lu':
+            M = LinearOperator(self._A.shape, self._lu.solve)
+        else:
+            M = sparse.diags(1.0 / A_diag)
+        c_new, info = cg(self._A, b, x0=c_old, atol=0.0, M=M,
+                         **{_cg_rtol_kwarg: self.tol})
+        if info != 0:
+            c_new = spsolve(self._A.tocsc(), b)
+        self.c.setValue(c_new)
+
+    def __getstate__(self):
+        # Don't store the assembled matrix, make it again when needed.
+        state = self.__dict__.copy()
+        for k in ('_A', '_i_diag', '_A_diag_0', '_lu'):
+            state.pop(k, None)
+        state['_dt'] = None
+        return state
+
+    def __setstate__(self, state):
+        super(SparseFoodField, self).__setstate__(state)
+        # Snapshots from before the preconditioner could be chosen.
+        self.__dict__.setdefault('precond', 'jacobi')
+
+
+class SpectralFoodField(FoodField):
+    """Food field on a uniform grid without obstacles, solved with fast
+    transforms rather than a linear solver.
+
+    Each step applies half the consumption, which is local to each cell
+    and applied exactly, then diffusion, then the other half of the
+    consumption. Diffusion is applied exactly in the basis of eigenvectors
+    of the finite-volume Laplacian. The basis is given by a cosine transform
+    for a grid with no-flux boundaries, as made by
+    :func:`ahoy.mesh.uniform_mesh_factory`, and by a Fourier transform for
+    a FiPy periodic grid.
+
+    This is Strang splitting with each part applied exactly, so its error
+    comes only from consumption varying between cells, and is second order
+    in the time step. It is not the backward Euler step of
+    :class:`FoodField` and :class:`SparseFoodField`, so agrees with them
+    only while `delta * rho * dt` is small. For a uniform density, a step
+    multiplies the field by `exp(-delta * rho * dt)` here, and by
+    `1 / (1 + delta * rho * dt)` in those solvers, so at
+    `delta * rho * dt = 1.25` the two differ by about 0.16 times the field.
+    """
+
+    def __init__(self, mesh, D, delta, c_0, interp_flag=False, every=1):
+        super(SpectralFoodField, self).__init__(mesh, D, delta, c_0,
+                                                interp_flag, every)
+        if isinstance(self.mesh, (fipy.PeriodicGrid1D, fipy.PeriodicGrid2D)):
+            self.periodic_flag = True
+        elif isinstance(self.mesh, UniformGrid):
+            self.periodic_flag = False
+        else:
+            raise NotImplementedError('Spectral solver needs a uniform grid '
+                                      'mesh')
+        self._shape = tuple(self.mesh.shape)
+        if self.dim == 1:
+            dxs = [self.mesh.dx]
+        else:
+            dxs = [self.mesh.dx, self.mesh.dy]
+
+        # Eigenvalues of minus the Laplacian, for each basis vector.
+        self._lams = 0.0
+        for n, dx in zip(self._shape, dxs):
+            th = (2.0 if self.periodic_flag else 1.0) * np.pi / n
+            lams = (2.0 - 2.0 * np.cos(th * np.arange(n))) / dx ** 2
+            self._lams = np.add.outer(self._lams, lams)
+        self._dt = None
+
+    def _diffuse(self, c_grid):
+        if self.periodic_flag:
+            return np.real(ifftn(fftn(c_grid) * self._diffuser))
+        else:
+            return idctn(dctn(c_grid, norm='ortho') * self._diffuser,
+                         norm='ortho')
+
+    def _solve(self, rho_array, dt):
+        self.rho.setValue(rho_array)
+        if dt != self._dt:
+            self._diffuser = np.exp(-self.D * self._lams * dt)
+            self._dt = dt
+        consumer = np.exp(-0.5 * self.delta * rho_array * dt)
+        c = np.array(self.c.value) * consumer
+        c = self._diffuse(c.reshape(self._shape, order='F'))
+        self.c.setValue(c.ravel(order='F') * consumer)
+
+
 class NoneFoodField(object):
 
     def iterate(self, ps, dt):
@@ -82,10 +347,26 @@ class NoneFoodField(object):
         return make_repr_str(self, fs)
 
 
-def food_field_factory(c_field_flag, L, c_dx, c_D, c_delta, c_0, obstructor):
+def food_field_factory(c_field_flag, L, c_dx, c_D, c_delta, c_0, obstructor,
+                       c_interp_flag=None, c_solver=None, c_every=None,
+                       c_precond=None):
     if c_field_flag:
         mesh = obstructor.get_mesh(L, c_dx)
-        c_field = FoodField(mesh, c_D, c_delta, c_0)
+        if c_every is None:
+            c_every = 1
+        if c_precond is None:
+            c_precond = 'jacobi'
+        if c_solver is None or c_solver == 'fipy':
+            c_field = FoodField(mesh, c_D, c_delta, c_0, c_interp_flag,
+                                c_every)
+        elif c_solver == 'sparse':
+            c_field = SparseFoodField(mesh, c_D, c_delta, c_0, c_interp_flag,
+                                      c_every, precond=c_precond)
+        elif c_solver == 'spectral':
+            c_field = SpectralFoodField(mesh, c_D, c_delta, c_0,
+                                        c_interp_flag, c_every)
+        else:
+            raise NotImplementedError('Food field solver not recognised')
     else:
         c_field = NoneFoodField()
     return c_field
@@ -0,0 +1,135 @@
+from __future__ import print_function, division
+from itertools import product
+import numpy as np
+from scipy.spatial import Delaunay
+from fipy.meshes.uniformGrid import UniformGrid
+from ahoy.mesh import cell_locator_factory
+
+
+class Interpolator(object):
+    """Finds, for each point, a stencil of cells and weights that
+    interpolates cell-centred values to the point.
+
+    Values are then interpolated by
+    `np.sum(vals[cids] * weights, axis=-1)`.
+    """
+
+    def get_stencils(self, rs):
+        """Find the interpolation stencil of each point.
+
+        Parameters
+        ----------
+        rs: numpy.ndarray[dtype=float, shape=(d, n)]
+            Points, in the layout of FiPy's cell centres.
+
+        Returns
+        -------
+        cids: numpy.ndarray[dtype=int, shape=(n, k)]
+            Indexes of the cells in each point's stencil.
+        weights: numpy.ndarray[dtype=float, shape=(n, k)]
+            Weight of each cell.
+        """
+        raise NotImplementedError
+
+
+class UniformInterpolator(Interpolator):
+    """Multilinear interpolation between the cell centres of a uniform
+    grid mesh.
+
+    Points beyond the outermost cell centres take the values at the
+    mesh's edge.
+
+    Parameters
+    ----------
+    mesh: fipy.meshes.uniformGrid.UniformGrid
+        Mesh.
+    """
+
+    def __init__(self, mesh):
+        self.n_cells = np.array(mesh.shape)
+        if mesh.dim == 1:
+            self.dx = np.array([mesh.dx])
+        else:
+            self.dx = np.array([mesh.dx, mesh.dy])
+        self.origin = np.asarray(mesh.origin).reshape([mesh.dim])
+        # Offsets to the corners of the cell containing a point.
+        self.offsets = np.array(list(product([0, 1], repeat=mesh.dim)))
+
+    def get_stencils(self, rs):
+        # Position in units of cells, relative to the first cell centre.
+        s = (rs.T - self.origin) / self.dx - 0.5
+        s = np.clip(s, 0.0, self.n_cells - 1)
+        coords_0 = np.minimum(np.floor(s).astype(np.int64),
+                              np.maximum(self.n_cells - 2, 0))
+        fs = s - coords_0
+
+        coords = coords_0[:, np.newaxis, :] + self.offsets
+        coords = np.minimum(coords, self.n_cells - 1)
+        # FiPy's grids number cells with the x index varying fastest.
+        cids = np.ravel_multi_index(np.moveaxis(coords, -1, 0),
+                                    self.n_cells, order='F')
+        weights = np.prod(np.where(self.offsets, fs[:, np.newaxis, :],
+                                   1.0 - fs[:, np.newaxis, :]), axis=-1)
+        return cids, weights
+
+
+class TriangulationInterpolator(Interpolator):
+    """Barycentric interpolation on a Delaunay triangulation of the cell
+    centres of an arbitrary 2D mesh.
+
+    Triangles much longer than the mesh's cells, such as those spanning an
+    obstacle, are not used. Points outside the remaining triangles take the
+    value of their nearest cell.
+
+    Parameters
+    ----------
+    mesh: fipy.meshes.mesh.Mesh
+        Mesh.
+    max_edge_factor: float
+        Longest edge of a triangle that is used, in units of the mesh's
+        typical cell length.
+    """
+
+    def __init__(self, mesh, max_edge_factor=3.0):
+        ccs = mesh.cellCenters.value.T
+        self.tri = Delaunay(ccs)
+        self.cell_locator = cell_locator_factory(mesh)
+
+        dx = np.sqrt(np.mean(mesh.cellVolumes))
+        verts = ccs[self.tri.simplices]
+        edges = verts - np.roll(verts, 1, axis=1)
+        edge_lengths = np.sqrt(np.sum(np.square(edges), axis=-1))
+        self.valid = np.max(edge_lengths, axis=-1) <= max_edge_factor * dx
+
+    def get_stencils(self, rs):
+        pts = rs.T
+        i_simplex = self.tri.find_simplex(pts)
+        inside = i_simplex >= 0
+        inside[inside] = self.valid[i_simplex[inside]]
+
+        n = pts.shape[0]
+        k = self.tri.simplices.shape[1]
+        cids = np.empty([n, k], dtype=np.int64)
+        weights = np.zeros([n, k])
+
+        T = self.tri.transform[i_simplex[inside]]
+        bary = np.einsum('ijk,ik->ij', T[:, :-1, :],
+                         pts[inside] - T[:, -1, :])
+        cids[inside] = self.tri.simplices[i_simplex[inside]]
+        weights[inside, :-1] = bary
+        weights[inside, -1] = 1.0 - np.sum(bary, axis=-1)
+
+        cids_near = self.cell_locator.get_nearest_cell_ids(rs[:, ~inside])
+        cids[~inside] = cids_near[:, np.newaxis]
+        weights[~inside, 0] = 1.0
+        return cids, weights
+
+
+def interpolator_factory(mesh):
+    if isinstance(mesh, UniformGrid):
+        return UniformInterpolator(mesh)
+    elif mesh.dim == 2:
+        return TriangulationInterpolator(mesh)
+    else:
+        raise NotImplementedError('No interpolation implemented for this '
+                                  'mesh')
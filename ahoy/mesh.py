@@ -1,4 +1,21 @@
+from collections import OrderedDict
+import hashlib
+import os
+from os.path import join, exists
+import pickle
+import tempfile
+import numpy as np
+from scipy.spatial import cKDTree
 import fipy
+from fipy.meshes.uniformGrid import UniformGrid
+
+# Directory in which porous meshes are cached between runs, or `None` to not
+# cache them on disk, which is the default.
+cache_dir = os.environ.get('AHOY_MESH_CACHE_DIR')
+# Number of porous meshes to keep in memory.
+cache_size = 16
+
+_mesh_cache = OrderedDict()
 
 
 gmsh_text_box = '''
@@ -67,5 +84,121 @@ def uniform_mesh_factory(L, dx):
                 ((L[0] / 2.0,), (L[1] / 2.0,)))
 
 
+def _get_cache_fname(key):
+    return join(cache_dir, '{}.pkl'.format(key))
+
+
+def _load_cached_mesh(key):
+    if key in _mesh_cache:
+        _mesh_cache[key] = _mesh_cache.pop(key)
+        return _mesh_cache[key]
+    if cache_dir is not None and exists(_get_cache_fname(key)):
+        with open(_get_cache_fname(key), 'rb') as f:
+            return pickle.load(f)
+    return None
+
+
+def _store_cached_mesh(key, msh):
+    _mesh_cache[key] = msh
+    while len(_mesh_cache) > cache_size:
+        _mesh_cache.popitem(last=False)
+    if cache_dir is not None and not exists(_get_cache_fname(key)):
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        # Write to a temporary file first so that concurrent runs never read a
+        # partly written mesh.
+        fd, fname_tmp = tempfile.mkstemp(dir=cache_dir)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(msh, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.rename(fname_tmp, _get_cache_fname(key))
+
+
 def porous_mesh_factory(rs, R, dx, L):
-    return fipy.Gmsh2D(_porous_mesh_geo_factory(rs, R, dx, L))
+    """Make a mesh of a 2D box with circular holes.
+
+    Meshing is slow, so meshes are cached in memory, and in `cache_dir` if
+    it is set, keyed on a hash of the geometry passed to the mesher.
+
+    Parameters
+    ----------
+    rs: numpy.ndarray[dtype=float, shape=(m, 2)]
+        Hole centres.
+    R: float
+        Hole radius.
+    dx: float
+        Characteristic cell length.
+    L: numpy.ndarray[dtype=float, shape=(2,)]
+        System lengths.
+
+    Returns
+    -------
+    mesh: fipy.Gmsh2D
+        Mesh.
+    """
+    geo = _porous_mesh_geo_factory(rs, R, dx, L)
+    key = hashlib.sha1(geo.encode('utf-8')).hexdigest()
+    msh = _load_cached_mesh(key)
+    if msh is None:
+        msh = fipy.Gmsh2D(geo)
+    _store_cached_mesh(key, msh)
+    return msh
+
+
+class UniformCellLocator(object):
+    """Finds the nearest cell of a uniform grid mesh by arithmetic.
+
+    Parameters
+    ----------
+    mesh: fipy.meshes.uniformGrid.UniformGrid
+        Mesh.
+    """
+
+    def __init__(self, mesh):
+        self.n_cells = np.array(mesh.shape)
+        if mesh.dim == 1:
+            self.dx = np.array([mesh.dx])
+        else:
+            self.dx = np.array([mesh.dx, mesh.dy])
+        self.origin = np.asarray(mesh.origin).reshape([mesh.dim])
+
+    def get_nearest_cell_ids(self, rs):
+        """Find the cell nearest to each point.
+
+        Parameters
+        ----------
+        rs: numpy.ndarray[dtype=float, shape=(d, n)]
+            Points, in the layout of FiPy's cell centres.
+
+        Returns
+        -------
+        cids: numpy.ndarray[dtype=int, shape=(n,)]
+            Cell indexes.
+        """
+        coords = np.floor((rs.T - self.origin) / self.dx).astype(np.int64)
+        coords = np.clip(coords, 0, self.n_cells - 1)
+        # FiPy's grids number cells with the x index varying fastest.
+        return np.ravel_multi_index(coords.T, self.n_cells, order='F')
+
+
+class TreeCellLocator(object):
+    """Finds the nearest cell of an arbitrary mesh using a k-d tree over
+    its cell centres.
+
+    Parameters
+    ----------
+    mesh: fipy.meshes.mesh.Mesh
+        Mesh.
+    """
+
+    def __init__(self, mesh):
+        self.tree = cKDTree(mesh.cellCenters.value.T)
+
+    def get_nearest_cell_ids(self, rs):
+        return self.tree.query(rs.T)[1]
+
+
+def cell_locator_factory(mesh):
+    if isinstance(mesh, UniformGrid):
+        return UniformCellLocator(mesh)
+    else:
+        return TreeCellLocator(mesh)
@@ -1,27 +1,50 @@
 from __future__ import print_function, division
+import copy
 import numpy as np
 from ciabatta.meta import make_repr_str
 import ahoy
-from ahoy import ships, obstructors, fields, turners
+from ahoy import (ships, obstructors, fields, turners, streams, directions,
+                  positions)
 
 
 class Model(object):
 
     def __init__(self, seed, dt,
-                 aligned_flag=False, origin_flags=None,
-                 **ship_kwargs):
+                 aligned_flag=False, origin_flags=None, rng=None,
+                 streams_flag=False, **ship_kwargs):
         # Record initial conditions
         self.seed = seed
         self.dt = dt
 
         # Initialise system
         self.i = 0
-        self.rng = np.random.RandomState(seed)
+        if rng is None:
+            rng = np.random.RandomState(seed)
+        self.rng = rng
         self.ships = ships.ships_factory(self.rng,
                                          aligned_flag=aligned_flag,
                                          origin_flags=origin_flags,
                                          **ship_kwargs)
 
+        # Optionally step with counter-based streams, independent of how
+        # the particles are split between threads, rather than `rng`, which
+        # is then only used to set up the system.
+        if streams_flag:
+            self.streams = streams.ParticleStreams(seed,
+                                                   self.ships.agents.n)
+        else:
+            self.streams = None
+
+        # Objects with an `observe(model)` method, called after each
+        # iteration.
+        self.observers = []
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # Snapshots from before models had observers.
+        if 'observers' not in state:
+            self.observers = []
+
     @property
     def aligned_flags(self):
         return np.all(self.ships.agents.directions.u_0 == 0.0, axis=0)
@@ -30,9 +53,26 @@ class Model(object):
     def origin_flags(self):
         return np.all(self.ships.agents.positions.r_0 == 0.0, axis=0)
 
+    @property
+    def step_rng(self):
+        """Source of the random numbers used to step the model."""
+        try:
+            streams = self.streams
+        except AttributeError:
+            streams = None
+        return self.rng if streams is None else streams
+
+    def add_observer(self, observer):
+        """Add an observer, which observes the model's current state straight
+        away, so that the initial state of a run is observed too."""
+        self.observers.append(observer)
+        observer.observe(self)
+
     def iterate(self):
-        self.ships.iterate(self.dt, self.rng)
+        self.ships.iterate(self.dt, self.step_rng)
         self.i += 1
+        for observer in self.observers:
+            observer.observe(self)
 
     def _get_output_dirname_agent_part(self):
         ags = self.ships.agents
@@ -68,8 +108,11 @@ class Model(object):
                                                             type_s)
                 if nm.is_temporal:
                     measurer = nm.dc_dx_measurer
-                    s += ',dtMem={:g},tMem={:g}'.format(measurer.dt_mem,
-                                                        measurer.t_mem)
+                    if measurer.mem_recursive_flag:
+                        s += ',dtMem={:g},tMem=rec'.format(measurer.dt_mem)
+                    else:
+                        s += ',dtMem={:g},tMem={:g}'.format(measurer.dt_mem,
+                                                            measurer.t_mem)
         return s
 
     def _get_output_dirname_obstruction_part(self):
@@ -96,15 +139,26 @@ class Model(object):
         s = 'c='
         if c_field.__class__ is fields.NoneFoodField:
             s += 'NoC'
-        elif c_field.__class__ is fields.FoodField:
-            s += 'C(c0={:g},cD={:g},cDelta={:g})'.format(c_field.c_0,
-                                                         c_field.D,
-                                                         c_field.delta)
+        elif isinstance(c_field, fields.FoodField):
+            s += 'C(c0={:g},cD={:g},cDelta={:g}'.format(c_field.c_0,
+                                                        c_field.D,
+                                                        c_field.delta)
+            if c_field.interp_flag:
+                s += ',interp'
+            if c_field.every > 1:
+                s += ',every={:d}'.format(c_field.every)
+            if c_field.__class__ is fields.SparseFoodField:
+                s += ',solver=sparse'
+            elif c_field.__class__ is fields.SpectralFoodField:
+                s += ',solver=spectral'
+            s += ')'
         return s
 
     def get_output_dirname(self):
         s = 'ahoy_{}D,dt={:g},seed={}'.format(self.ships.dim, self.dt,
                                               self.seed)
+        if self.step_rng is not self.rng:
+            s += ',rng=philox'
         s += ',{}'.format(self._get_output_dirname_agent_part())
         s += ',{}'.format(self._get_output_dirname_obstruction_part())
         s += ',{}'.format(self._get_output_dirname_field_part())
@@ -118,3 +172,150 @@ class Model(object):
               ('ships', self.ships)
               ]
         return make_repr_str(self, fs)
+
+
+def _slice_copy(obj, sl, attrs):
+    """Shallow-copy an object, replacing its array attributes by views onto
+    a slice of their first axis."""
+    view = copy.copy(obj)
+    for attr in attrs:
+        if attr in obj.__dict__:
+            setattr(view, attr, getattr(obj, attr)[sl])
+    return view
+
+
+class EnsembleModel(Model):
+    """Several independent replicas of the same model, stepped together.
+
+    The replicas' particles are stacked into one set of `n_replicas * n`
+    particles, so each step is a few large array operations rather than
+    many small ones. Replica `i` owns the contiguous block of particles
+    `i * n` to `(i + 1) * n`.
+
+    Each replica has its own random number streams, for both its initial
+    conditions and its stepping, derived from the seed and its index alone,
+    so replica `i` is the same whatever the number of replicas. Replicas do
+    share one obstacle geometry. Particles coupled through a food field
+    cannot be separated into replicas, so that is not supported.
+
+    Parameters
+    ----------
+    n_replicas: int
+        Number of replicas.
+    n: int
+        Number of particles in each replica.
+    """
+
+    def __init__(self, seed, dt, n_replicas, n,
+                 aligned_flag=False, origin_flags=None,
+                 **ship_kwargs):
+        if ship_kwargs.get('c_field_flag'):
+            raise NotImplementedError('Replicas coupled through a food field '
+                                      'cannot be run as an ensemble')
+        if ship_kwargs.get('rho_0') is not None:
+            raise NotImplementedError('Give the number of particles in each '
+                                      'replica, not a density')
+        self.n_replicas = n_replicas
+        rng = np.random.RandomState(seed)
+        # Make the shared obstacles first, as replicas' particles avoid them.
+        if ship_kwargs.get('obstructor') is None:
+            ship_kwargs['obstructor'] = obstructors.obstructor_factory(
+                ship_kwargs.get('pore_flag'), ship_kwargs.get('pore_turner'),
+                ship_kwargs.get('pore_R'), ship_kwargs.get('L'),
+                ship_kwargs.get('pore_pf'), rng, True)
+        u_0, r_0 = self._get_initial_conditions(seed, n, aligned_flag,
+                                                origin_flags, ship_kwargs)
+        super(EnsembleModel, self).__init__(seed, dt,
+                                            aligned_flag=aligned_flag,
+                                            origin_flags=origin_flags,
+                                            rng=rng, n=n_replicas * n,
+                                            u_0=u_0, r_0=r_0,
+                                            **ship_kwargs)
+        # One block of streams per replica.
+        self.streams = streams.ParticleStreams(seed, n_replicas * n,
+                                               block_size=n)
+
+    def _get_replica_seed_seq(self, seed, i):
+        return streams.namespace_seed_seq(seed, 'initial', i)
+
+    def _get_initial_conditions(self, seed, n, aligned_flag, origin_flags,
+                                ship_kwargs):
+        """Draw the initial directions and positions of each replica from
+        its own stream, stacked for all replicas."""
+        dim = ship_kwargs['dim']
+        L = ship_kwargs.get('L')
+        draw_r_flag = (ship_kwargs.get('spatial_flag') and
+                       ship_kwargs.get('periodic_flag'))
+        u_0s, r_0s = [], []
+        for i in range(self.n_replicas):
+            seed_seq = self._get_replica_seed_seq(seed, i)
+            rng = np.random.RandomState(seed_seq.generate_state(4))
+            if aligned_flag:
+                u_0s.append(directions.get_aligned_vectors(n, dim))
+            else:
+                u_0s.append(directions.get_uniform_vectors(n, dim, rng))
+            if draw_r_flag:
+                r_0s.append(positions.get_uniform_points(
+                    n, L, origin_flags, rng, ship_kwargs['obstructor']))
+        r_0 = np.concatenate(r_0s) if r_0s else None
+        return np.concatenate(u_0s), r_0
+
+    @property
+    def n(self):
+        return self.ships.agents.n // self.n_replicas
+
+    def get_replica(self, i):
+        """Return a view of a single replica.
+
+        The view is a :class:`Model` whose particle arrays share memory with
+        the ensemble, so it works with the measure getters in
+        :mod:`ahoy.utils.utils` and stays current as the ensemble iterates.
+
+        Parameters
+        ----------
+        i: int
+            Replica index.
+
+        Returns
+        -------
+        m: Model
+            Replica view.
+        """
+        sl = slice(i * self.n, (i + 1) * self.n)
+        ags = self.ships.agents
+        ds = _slice_copy(ags.directions, sl,
+                         ('sign', 'sign_0', 'th', 'th_0', '_u', '_u_0',
+                          '_dirty'))
+        ps = _slice_copy(ags.positions, sl, ('_r', '_r_w', 'wraps', 'r_0'))
+        swims = copy.copy(ags.swimmers)
+        swims.directions = ds
+        ags_view = copy.copy(ags)
+        ags_view.directions = ds
+        ags_view.positions = ps
+        ags_view.swimmers = swims
+        ships_view = copy.copy(self.ships)
+        ships_view.agents = ags_view
+
+        m = Model.__new__(Model)
+        m.__dict__.update(self.__dict__)
+        del m.n_replicas
+        m.ships = ships_view
+        return m
+
+    @property
+    def replicas(self):
+        return [self.get_replica(i) for i in range(self.n_replicas)]
+
+    def get_output_dirname(self):
+        return '{},reps={}'.format(self.get_replica(0).get_output_dirname(),
+                                   self.n_replicas)
+
+    def __repr__(self):
+        fs = [('seed', self.seed), ('dt', self.dt),
+              ('n_replicas', self.n_replicas),
+              ('origin_flags', self.origin_flags),
+              ('aligned_flags', self.aligned_flags),
+              ('i', self.i), ('rng', self.rng),
+              ('ships', self.ships)
+              ]
+        return make_repr_str(self, fs)
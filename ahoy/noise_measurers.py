@@ -59,12 +59,15 @@ def noise_measurer_factory(chemo_flag,
                            temporal_chemo_flag,
                            ds,
                            ps, v_0, dt_mem, t_mem, t_rot_0, time,
-                           c_field_flag, c_field):
+                           c_field_flag, c_field, mem_recursive_flag=None,
+                           mem_time_major_flag=None, mem_single_flag=None):
     if chemo_flag:
         dc_dx_measurer = dc_dx_factory(temporal_chemo_flag,
                                        ds,
                                        ps, v_0, dt_mem, t_mem, t_rot_0, time,
-                                       c_field_flag, c_field)
+                                       c_field_flag, c_field,
+                                       mem_recursive_flag,
+                                       mem_time_major_flag, mem_single_flag)
         return chemo_noise_measurer_factory(onesided_flag, noise_0, chi,
                                             dc_dx_measurer)
     else:
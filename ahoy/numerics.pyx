@@ -1,25 +1,177 @@
 import numpy as np
 cimport numpy as np
 cimport cython
+from cython cimport floating
+from cython.parallel cimport prange
+from libc.math cimport cos, sin, atan2, floor, fabs, isfinite, INFINITY
 
 
-@cython.cdivision(True)
 @cython.boundscheck(False)
-def integral_transform(np.ndarray[np.float_t, ndim=2] a,
-                       np.ndarray[np.float_t, ndim=1] K,
+@cython.wraparound(False)
+def integral_transform(floating[:, ::1] a,
+                       floating[::1] K,
                        unsigned int i_zero,
-                       np.ndarray[np.float_t, ndim=1] b,
-                       np.ndarray[np.uint_t, ndim=1] inds_p,
-                       np.ndarray[np.uint_t, ndim=1] inds_a):
+                       floating[::1] b,
+                       int n_threads=1):
+    """Transform each row of a ring buffer, whose latest entry is at
+    `i_zero`, by the kernel `K`, storing the results in `b`.
+
+    Each row is read as two contiguous segments, from `i_zero` to its end
+    and from its start to `i_zero`, and rows are shared between
+    `n_threads` threads.
+    """
     cdef:
-        unsigned int n_l = a.shape[0]
-        unsigned int n_p = a.shape[1]
-        unsigned int i_l, i_p
-        double tot
-    np.mod(i_zero + inds_p, n_p, inds_a)
-
-    for i_l in range(n_l):
-        tot = 0.0
+        Py_ssize_t n_l = a.shape[0]
+        Py_ssize_t n_p = a.shape[1]
+        Py_ssize_t n_head = n_p - i_zero
+        Py_ssize_t i_l
+
+    for i_l in prange(n_l, nogil=True, num_threads=n_threads,
+                      schedule='static'):
+        b[i_l] = (_dot(&a[i_l, i_zero], &K[0], n_head) +
+                  _dot(&a[i_l, 0], &K[n_head], i_zero))
+
+
+@cython.cdivision(True)
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def integral_transform_time_major(floating[:, ::1] a,
+                                  floating[::1] K,
+                                  unsigned int i_zero,
+                                  floating[::1] b,
+                                  int n_threads=1):
+    """Transform each column of a ring buffer, whose latest row is at
+    `i_zero`, by the kernel `K`, storing the results in `b`.
+
+    Columns are split into chunks shared between `n_threads` threads. Each
+    chunk is accumulated a row at a time, so rows are read contiguously and
+    the chunk's results stay in cache.
+    """
+    cdef:
+        Py_ssize_t n_p = a.shape[0]
+        Py_ssize_t n_l = a.shape[1]
+        Py_ssize_t n_head = n_p - i_zero
+        Py_ssize_t chunk = 1024
+        Py_ssize_t n_chunks = (n_l + chunk - 1) // chunk
+        Py_ssize_t i_c, i_p, i_l, l_start, l_end
+        floating k
+
+    for i_c in prange(n_chunks, nogil=True, num_threads=n_threads,
+                      schedule='static'):
+        l_start = i_c * chunk
+        l_end = min(l_start + chunk, n_l)
+        for i_l in range(l_start, l_end):
+            b[i_l] = 0.0
         for i_p in range(n_p):
-            tot += a[i_l, inds_a[i_p]] * K[i_p]
-        b[i_l] = tot
+            if i_p >= i_zero:
+                k = K[i_p - i_zero]
+            else:
+                k = K[i_p + n_head]
+            for i_l in range(l_start, l_end):
+                b[i_l] += k * a[i_p, i_l]
+
+
+@cython.cdivision(True)
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def step_fused(np.ndarray[np.float_t, ndim=1] th,
+               np.ndarray[np.float_t, ndim=2] r,
+               np.ndarray[np.float_t, ndim=1] L,
+               double v_0, double dt,
+               np.ndarray[np.float_t, ndim=2] pore_rs,
+               double R_sq,
+               np.ndarray[np.int64_t, ndim=2] cell_members,
+               np.ndarray[np.int64_t, ndim=1] n_cells,
+               np.ndarray[np.float_t, ndim=1] cell_dx,
+               np.ndarray[np.int64_t, ndim=2] offsets,
+               np.ndarray[np.uint8_t, ndim=1] obs,
+               np.ndarray[np.float_t, ndim=1] th_normals):
+    """Displace, wrap and check obstruction of 2D swimmers in one pass.
+
+    Each particle moves along its direction `th` by `v_0 * dt`. Its wrapped
+    position is checked against the closest pore in its neighbouring cells,
+    and if it lies inside, the displacement is undone, `obs` is set and the
+    pore's outward normal angle stored in `th_normals`.
+    """
+    cdef:
+        unsigned int n = r.shape[0]
+        unsigned int n_pores = pore_rs.shape[0]
+        unsigned int n_offsets = offsets.shape[0]
+        unsigned int m_cell = cell_members.shape[1]
+        unsigned int i, i_off, i_m
+        long cx, cy, i_cell, i_pore, i_best
+        double dr_x, dr_y, rw_x, rw_y, s_x, s_y, s_sq, s_sq_best
+        double s_x_best, s_y_best
+
+    for i in range(n):
+        dr_x = v_0 * cos(th[i]) * dt
+        dr_y = v_0 * sin(th[i]) * dt
+        r[i, 0] += dr_x
+        r[i, 1] += dr_y
+        obs[i] = 0
+
+        if n_pores == 0:
+            continue
+
+        rw_x = _wrap(r[i, 0], L[0])
+        rw_y = _wrap(r[i, 1], L[1])
+
+        cx = <long>floor((rw_x + L[0] / 2.0) / cell_dx[0])
+        cy = <long>floor((rw_y + L[1] / 2.0) / cell_dx[1])
+        i_best = -1
+        s_sq_best = INFINITY
+        s_x_best = INFINITY
+        s_y_best = INFINITY
+        for i_off in range(n_offsets):
+            i_cell = (_mod(cx + offsets[i_off, 0], n_cells[0]) * n_cells[1] +
+                      _mod(cy + offsets[i_off, 1], n_cells[1]))
+            for i_m in range(m_cell):
+                i_pore = cell_members[i_cell, i_m]
+                if i_pore < 0:
+                    break
+                s_x = _min_image(rw_x - pore_rs[i_pore, 0], L[0])
+                s_y = _min_image(rw_y - pore_rs[i_pore, 1], L[1])
+                s_sq = s_x * s_x + s_y * s_y
+                if (s_sq < s_sq_best or
+                        (s_sq == s_sq_best and i_pore < i_best)):
+                    s_sq_best = s_sq
+                    s_x_best = s_x
+                    s_y_best = s_y
+                    i_best = i_pore
+
+        if s_sq_best < R_sq:
+            r[i, 0] -= dr_x
+            r[i, 1] -= dr_y
+            obs[i] = 1
+            th_normals[i] = atan2(s_y_best, s_x_best)
+
+
+cdef inline double _wrap(double x, double L) nogil:
+    if not isfinite(L):
+        return x
+    cdef double sgn = (x > 0.0) - (x < 0.0)
+    return x - sgn * floor((fabs(x) + L / 2.0) / L) * L
+
+
+cdef inline double _min_image(double s, double L) nogil:
+    if s > L / 2.0:
+        s -= L
+    if s < -L / 2.0:
+        s += L
+    return s
+
+
+cdef inline long _mod(long a, long b) nogil:
+    cdef long m = a % b
+    if m < 0:
+        m += b
+    return m
+
+
+cdef inline double _dot(floating *x, floating *y, Py_ssize_t n) nogil:
+    cdef:
+        double tot = 0.0
+        Py_ssize_t i
+    for i in range(n):
+        tot += x[i] * y[i]
+    return tot
@@ -2,9 +2,11 @@ from __future__ import print_function, division
 from abc import ABCMeta, abstractmethod
 import numpy as np
 from ciabatta.meta import make_repr_str
-from spatious import vector, distance, geom
+from spatious import vector, geom
 from metropack import pack
 from ahoy import mesh, turners
+from ahoy.cell_list import CellList
+from ahoy.streams import subsystem_rng
 
 
 class NoneObstructor(object):
@@ -12,7 +14,7 @@ class NoneObstructor(object):
     def get_obstructeds(self, rs):
         return np.zeros([rs.shape[0]], dtype=np.bool)
 
-    def obstruct(self, ps, drs, ds):
+    def obstruct(self, ps, drs, ds, rng=None):
         return
 
     def get_mesh(self, L, dx):
@@ -52,7 +54,9 @@ class SphereObstructor(BaseObstructor):
         return geom.sphere_volume(self.R, self.dim)
 
     @abstractmethod
-    def _get_th_normals(self, seps):
+    def _get_normals(self, seps):
+        """Return the outward normals of the spheres at obstructed
+        particles, as angles in 2D and as unit vectors in 3D."""
         return
 
     @abstractmethod
@@ -62,19 +66,29 @@ class SphereObstructor(BaseObstructor):
     def obstruct(self, ps, drs, ds, rng=None):
         seps = self.get_seps(ps.r_w)
         obs = self._is_obstructed(seps)
-        self._push(obs, ps.r, drs)
-        th_normals = self._get_th_normals(seps[obs])
-        self.turner.turn(obs, ds, th_normals, rng)
+        self._push(obs, ps.r_w, drs)
+        ps.wrap()
+        normals = self._get_normals(seps[obs])
+        self.turner.turn(obs, ds, normals, subsystem_rng(rng, 'obstruction'))
 
     def __repr__(self):
         fs = [('turner', self.turner), ('R', self.R)]
         return make_repr_str(self, fs)
 
 
+def _get_th_normals(seps):
+    return np.arctan2(seps[:, 1], seps[:, 0])
+
+
+def _get_u_normals(seps):
+    return vector.vector_unit_nonull(seps)
+
+
 class SphereObstructor2D(SphereObstructor):
+    dim = 2
 
-    def _get_th_normals(self, seps):
-        return np.arctan2(seps[:, 1], seps[:, 0])
+    def _get_normals(self, seps):
+        return _get_th_normals(seps)
 
 
 class SingleSphereObstructor2D(SphereObstructor2D):
@@ -86,7 +100,24 @@ class SingleSphereObstructor2D(SphereObstructor2D):
         raise NotImplementedError
 
 
-class PorousObstructor(SphereObstructor2D):
+class SphereObstructor3D(SphereObstructor):
+    dim = 3
+
+    def _get_normals(self, seps):
+        return _get_u_normals(seps)
+
+
+class SingleSphereObstructor3D(SphereObstructor3D):
+
+    def get_seps(self, rs):
+        return rs
+
+    def get_mesh(self, L, dx):
+        raise NotImplementedError
+
+
+class PorousObstructor(SphereObstructor):
+    """Randomly packed spherical pores in a 2D or 3D system."""
 
     def __init__(self, turner, R, L, pf, rng, periodic_flag):
         super(PorousObstructor, self).__init__(turner, R)
@@ -94,6 +125,18 @@ class PorousObstructor(SphereObstructor2D):
         self.L = L
         self.rs, self.R = pack.pack(self.R, self.L, pf=pf, rng=rng,
                                     periodic=periodic_flag)
+        self._init_cell_list()
+
+    def _init_cell_list(self):
+        # Only pores within a radius of a particle can obstruct it, so index
+        # them on a grid of that size rather than checking every pore.
+        self.cell_list = CellList(self.rs, self.L, self.R)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # Snapshots from before pores were indexed on a cell list.
+        if 'cell_list' not in state:
+            self._init_cell_list()
 
     def obstruct(self, *args, **kwargs):
         if self.rs.shape[0]:
@@ -134,8 +177,13 @@ class PorousObstructor(SphereObstructor2D):
     def fraction_free(self):
         return self.volume_free / self.volume
 
+    def _get_normals(self, seps):
+        if self.dim == 3:
+            return _get_u_normals(seps)
+        return _get_th_normals(seps)
+
     def get_seps(self, rs):
-        return distance.csep_periodic_close(rs, self.rs, self.L)[0]
+        return self.cell_list.csep_periodic_close(rs)[0]
 
     def get_mesh(self, L, dx):
         return mesh.porous_mesh_factory(self.rs, self.R, dx, L)
@@ -0,0 +1,140 @@
+from __future__ import print_function, division
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from os.path import exists, join
+import numpy as np
+from agaro import output_utils
+from ahoy import trajectory
+import ahoy.fields
+
+Frame = namedtuple('Frame', ['t', 'r', 'r_w', 'u', 'c'])
+
+
+class Frames(object):
+    """Random access to the frames of a run, for interactive plotting.
+
+    Frames are kept in a small cache, and when a frame is requested its
+    neighbours are loaded in a background thread, so that stepping through
+    frames does not wait on disk.
+
+    Subclasses implement `__len__` and `_load_frame`, and set the static
+    attributes `dim`, `n`, `L`, `pore_rs`, `pore_R`, `mesh` and `c_0`.
+
+    Parameters
+    ----------
+    n_prefetch: int
+        Number of frames either side of the requested one to load ahead.
+    cache_size: int
+        Number of frames to keep in memory.
+    """
+
+    def __init__(self, n_prefetch=2, cache_size=16):
+        self.n_prefetch = n_prefetch
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._pending = {}
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def _load_frame(self, i):
+        raise NotImplementedError
+
+    def _store(self, i, frame):
+        self._cache[i] = frame
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _prefetch(self, i):
+        near = set(range(max(0, i - self.n_prefetch),
+                         min(len(self), i + self.n_prefetch + 1)))
+        for j in list(self._pending):
+            if j not in near:
+                self._pending.pop(j).cancel()
+        for j in near:
+            if j not in self._cache and j not in self._pending:
+                self._pending[j] = self._executor.submit(self._load_frame, j)
+
+    def __getitem__(self, i):
+        if i in self._cache:
+            frame = self._cache.pop(i)
+        elif i in self._pending:
+            frame = self._pending.pop(i).result()
+        else:
+            frame = self._load_frame(i)
+        self._store(i, frame)
+        self._prefetch(i)
+        return frame
+
+
+class SnapshotFrames(Frames):
+    """Frames read from a directory of pickled model snapshots."""
+
+    def __init__(self, dirname, *args, **kwargs):
+        super(SnapshotFrames, self).__init__(*args, **kwargs)
+        self.fnames = output_utils.get_filenames(dirname)
+        m_0 = output_utils.filename_to_model(self.fnames[0])
+        self.dim = m_0.ships.dim
+        self.n = m_0.ships.agents.n
+        self.L = m_0.ships.agents.positions.L
+        try:
+            self.pore_rs = m_0.ships.obstructor.rs
+            self.pore_R = m_0.ships.obstructor.R
+        except AttributeError:
+            self.pore_rs = np.zeros([0, self.dim])
+            self.pore_R = 0.0
+        if isinstance(m_0.ships.c_field, ahoy.fields.FoodField):
+            self.mesh = m_0.ships.c_field.mesh
+            self.c_0 = m_0.ships.c_field.c_0
+        else:
+            self.mesh = None
+            self.c_0 = None
+
+    def __len__(self):
+        return len(self.fnames)
+
+    def _load_frame(self, i):
+        m = output_utils.filename_to_model(self.fnames[i])
+        ps = m.ships.agents.positions
+        if isinstance(m.ships.c_field, ahoy.fields.FoodField):
+            c = m.ships.c_field.c.value
+        else:
+            c = None
+        return Frame(m.ships.time.t, ps.r, ps.r_w,
+                     m.ships.agents.directions.u, c)
+
+
+class TrajectoryFrames(Frames):
+    """Frames read from a memory-mapped :class:`ahoy.trajectory.Trajectory`.
+    """
+
+    def __init__(self, dirname, *args, **kwargs):
+        super(TrajectoryFrames, self).__init__(*args, **kwargs)
+        self.traj = trajectory.Trajectory(dirname)
+        self.dim = self.traj.meta['dim']
+        self.n = self.traj.meta['n']
+        self.L = self.traj.L
+        self.pore_rs = self.traj.static.get('pore_rs',
+                                            np.zeros([0, self.dim]))
+        self.pore_R = self.traj.meta.get('pore_R', 0.0)
+        self.mesh = self.traj.mesh
+        self.c_0 = self.traj.meta.get('c_0')
+
+    def __len__(self):
+        return self.traj.n_frames
+
+    def _load_frame(self, i):
+        if 'c' in self.traj.meta['fields']:
+            c = np.array(self.traj.c[i])
+        else:
+            c = None
+        return Frame(float(self.traj.t[i]),
+                     self.traj.get_r(i),
+                     self.traj.get_r_w(i), self.traj.get_u(i), c)
+
+
+def frames_factory(dirname, *args, **kwargs):
+    """Open a run's output for frame-by-frame access, using its trajectory
+    if one was recorded, and its model snapshots otherwise."""
+    if exists(join(dirname, trajectory.meta_filename)):
+        return TrajectoryFrames(dirname, *args, **kwargs)
+    else:
+        return SnapshotFrames(dirname, *args, **kwargs)
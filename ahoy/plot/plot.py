@@ -3,49 +3,46 @@ import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.widgets import Slider
 from ciabatta.ejm_rcparams import reds_cmap
-from agaro import output_utils
+from fealty.fields import density
 from ahoy.utils import utils
 from ahoy.plot.var_plot import VarPlot
-import ahoy.fields
+from ahoy.plot.frames import frames_factory
 
 
 def plot_2d(dirname):
     fig = plt.figure()
     ax_vis = fig.add_subplot(111)
 
-    fnames = output_utils.get_filenames(dirname)
-    m_0 = output_utils.filename_to_model(fnames[0])
+    frames = frames_factory(dirname)
+    f_0 = frames[0]
 
-    L = m_0.ships.agents.positions.L
+    L = frames.L
 
     ax_vis.set_xlim(-L[0] / 2.0, L[0] / 2.0)
     ax_vis.set_ylim(-L[1] / 2.0, L[1] / 2.0)
     ax_vis.set_aspect('equal')
 
     plt.subplots_adjust(left=0.25, bottom=0.25)
-    has_c_field = isinstance(m_0.ships.c_field, ahoy.fields.FoodField)
+    has_c_field = frames.mesh is not None
     if has_c_field:
-        plot_c = VarPlot(m_0.ships.c_field.c, cmap=reds_cmap, axes=ax_vis)
-    plot_p = ax_vis.quiver(m_0.ships.agents.positions.r_w[:, 0],
-                           m_0.ships.agents.positions.r_w[:, 1],
-                           m_0.ships.agents.directions.u[:, 0],
-                           m_0.ships.agents.directions.u[:, 1])
+        plot_c = VarPlot(frames.mesh, f_0.c, cmap=reds_cmap, axes=ax_vis)
+    plot_p = ax_vis.quiver(f_0.r_w[:, 0], f_0.r_w[:, 1],
+                           f_0.u[:, 0], f_0.u[:, 1])
 
     ax_slide = plt.axes([0.25, 0.1, 0.65, 0.03])
-    t_slider = Slider(ax_slide, 'Time', 0, len(fnames), valinit=0)
+    t_slider = Slider(ax_slide, 'Time', 0, len(frames), valinit=0)
 
     t_time = fig.text(0.1, 0.5, '')
 
     def update(val):
-        fname_i = int(round(val))
-        if 0 <= fname_i < len(fnames):
-            m = output_utils.filename_to_model(fnames[fname_i])
+        i = int(round(val))
+        if 0 <= i < len(frames):
+            f = frames[i]
             if has_c_field:
-                plot_c.update(m.ships.c_field.c)
-            plot_p.set_offsets(m.ships.agents.positions.r_w)
-            plot_p.set_UVC(m.ships.agents.directions.u[:, 0],
-                           m.ships.agents.directions.u[:, 1])
-            t_time.set_text('Time: {:g}'.format(m.ships.time.t))
+                plot_c.update(f.c)
+            plot_p.set_offsets(f.r_w)
+            plot_p.set_UVC(f.u[:, 0], f.u[:, 1])
+            t_time.set_text('Time: {:g}'.format(f.t))
 
             fig.canvas.draw_idle()
 
@@ -59,37 +56,39 @@ def plot_linear_density(dirname):
     ax_d = fig.add_subplot(211)
     ax_c = fig.add_subplot(212)
 
-    fnames = output_utils.get_filenames(dirname)
-    m_0 = output_utils.filename_to_model(fnames[0])
+    frames = frames_factory(dirname)
+    f_0 = frames[0]
 
-    L = m_0.ships.agents.positions.L
+    L = frames.L
 
     dx = L[0] / 100.0
 
     plt.subplots_adjust(left=0.25, bottom=0.25)
 
-    ds, xbs = utils.get_linear_density(m_0, dx)
+    def get_linear_density(f):
+        return utils.linear_density(f.r[:, 0], frames.pore_rs[:, 0],
+                                    frames.pore_R, L[0], L[1], dx)
+
+    ds, xbs = get_linear_density(f_0)
 
     plot_d = ax_d.bar(xbs[:-1], ds, width=xbs[1] - xbs[0])
-    c_field = m_0.ships.c_field.c
-    plot_c = ax_c.scatter(c_field.mesh.cellCenters[0, :], c_field.value)
+    x_c = frames.mesh.cellCenters[0, :].value
+    plot_c = ax_c.scatter(x_c, f_0.c)
     ax_slide = plt.axes([0.25, 0.1, 0.65, 0.03])
-    t_slider = Slider(ax_slide, 'Index', 0, len(fnames), valinit=0)
+    t_slider = Slider(ax_slide, 'Index', 0, len(frames), valinit=0)
 
     ax_d.set_xlim(-L[0] / 2.0, L[0] / 2.0)
     ax_c.set_xlim(-L[0] / 2.0, L[0] / 2.0)
-    ax_c.set_ylim(0.0, m_0.ships.c_field.c_0)
+    ax_c.set_ylim(0.0, frames.c_0)
 
     def update(val):
-        fname_i = int(round(val))
-        if 0 <= fname_i < len(fnames):
-            m = output_utils.filename_to_model(fnames[fname_i])
-            ds, xbs = utils.get_linear_density(m, dx)
+        i = int(round(val))
+        if 0 <= i < len(frames):
+            f = frames[i]
+            ds, xbs = get_linear_density(f)
             for rect, d in zip(plot_d, ds):
                 rect.set_height(d)
-            c_field = m.ships.c_field.c
-            plot_c.set_offsets(np.array([c_field.mesh.cellCenters[0, :],
-                                         c_field.value]).T)
+            plot_c.set_offsets(np.array([x_c, f.c]).T)
             fig.canvas.draw_idle()
 
     t_slider.on_changed(update)
@@ -102,35 +101,34 @@ def plot_1d(dirname):
     ax_vis = fig.add_subplot(211)
     ax_d = fig.add_subplot(212)
 
-    fnames = output_utils.get_filenames(dirname)
-    m_0 = output_utils.filename_to_model(fnames[0])
+    frames = frames_factory(dirname)
+    f_0 = frames[0]
 
-    L = m_0.ships.agents.positions.L
+    L = frames.L
 
     ax_vis.set_xlim(-L[0] / 2.0, L[0] / 2.0)
     ax_d.set_xlim(-L[0] / 2.0, L[0] / 2.0)
 
-    dx = L / 100.0
+    dx = L[0] / 100.0
 
     plt.subplots_adjust(left=0.25, bottom=0.25)
-    plot_p = ax_vis.scatter(m_0.ships.agents.positions.r_w[:, 0],
-                            np.zeros([m_0.ships.agents.n]))
+    plot_p = ax_vis.scatter(f_0.r_w[:, 0], np.zeros([frames.n]))
 
-    d = m_0.ships.agents.positions.get_density_field(dx)
+    d = density(f_0.r_w, L[0], dx)
     x = np.linspace(-L[0] / 2.0, L[0] / 2.0, d.shape[0])
 
     plot_d = ax_d.bar(x, d, width=x[1] - x[0])
 
     ax_slide = plt.axes([0.25, 0.1, 0.65, 0.03])
-    t_slider = Slider(ax_slide, 'Index', 0, len(fnames), valinit=0)
+    t_slider = Slider(ax_slide, 'Index', 0, len(frames), valinit=0)
 
     def update(val):
-        fname_i = int(round(val))
-        if 0 <= fname_i < len(fnames):
-            m = output_utils.filename_to_model(fnames[fname_i])
-            plot_p.set_offsets(np.array([m.ships.agents.positions.r_w[:, 0],
-                                         np.zeros([m.ships.agents.n])]).T)
-            ds = m.ships.agents.positions.get_density_field(dx)
+        i = int(round(val))
+        if 0 <= i < len(frames):
+            f = frames[i]
+            plot_p.set_offsets(np.array([f.r_w[:, 0],
+                                         np.zeros([frames.n])]).T)
+            ds = density(f.r_w, L[0], dx)
             for rect, d in zip(plot_d, ds):
                 rect.set_height(d)
             ax_d.set_ylim(0.0, 1.05 * ds.max())
@@ -142,7 +140,7 @@ def plot_1d(dirname):
 
 
 def plot_vis(dirname):
-    dim = output_utils.get_recent_model(dirname).ships.dim
+    dim = frames_factory(dirname).dim
     if dim == 1:
         plot_1d(dirname)
     elif dim == 2:
@@ -4,27 +4,26 @@ from matplotlib.collections import PolyCollection
 
 class VarPlot(object):
 
-    def __init__(self, var, cmap, axes):
+    def __init__(self, mesh, vals, cmap, axes):
         self.axes = axes
-        self.var = var
         self.cmap = cmap
-        self.mesh = self.var.mesh
-        self.plot_mesh()
+        self.mesh = mesh
+        self.plot_mesh(vals)
 
-    def plot_mesh(self):
+    def plot_mesh(self, vals):
         vertexIDs = self.mesh._orderedCellVertexIDs
         vertexCoords = self.mesh.vertexCoords
         xCoords = numerix.take(vertexCoords[0], vertexIDs)
         yCoords = numerix.take(vertexCoords[1], vertexIDs)
         polys = []
         for x, y in zip(xCoords.swapaxes(0, 1), yCoords.swapaxes(0, 1)):
-            polys.append(zip(x, y))
+            polys.append(list(zip(x, y)))
         self.collection = PolyCollection(polys)
         self.collection.set_linewidth(0.5)
         self.axes.add_collection(self.collection)
-        self.update(self.var)
+        self.update(vals)
 
-    def update(self, var):
-        rgba = self.cmap(var.value)
+    def update(self, vals):
+        rgba = self.cmap(vals)
         self.collection.set_facecolors(rgba)
         self.collection.set_edgecolors(rgba)
@@ -39,19 +39,66 @@ class Positions(object):
     def r_w_mag(self):
         return vector.vector_mag(self.r_w)
 
-    def displace(self, dr):
+    def displace(self, dr, work=None):
+        """Displace the particles in place.
+
+        Parameters
+        ----------
+        dr: numpy.ndarray[dtype=float, shape=(n, d)]
+            Displacement of each particle.
+        work: numpy.ndarray[dtype=float, shape=(n,)]
+            Scratch array to use, to avoid allocating one.
+        """
         self.r += dr
 
+    def wrap(self, work=None):
+        """Bring positions that have left the system back into it, after
+        they have been changed in place via :attr:`r_w`."""
+        return
+
     def __repr__(self):
         fs = [('n', self.n), ('dim', self.dim)]
         return make_repr_str(self, fs)
 
 
 class PeriodicPositions(Positions):
+    """Positions in a system with periodic boundaries.
+
+    Unwrapped positions, positions wrapped into the system, and the number
+    of times each particle has wrapped along each axis, are all stored and
+    kept up to date as particles move, wrapping only those particles that
+    cross a boundary.
+
+    Unwrapped positions may be changed in place, and are rewrapped when the
+    particles are next displaced. Wrapped positions changed in place must be
+    followed by a call to :meth:`wrap`.
+
+    Parameters
+    ----------
+    L: numpy.ndarray[dtype=float, shape=(d,)]
+        System lengths. Axes with infinite length are not periodic.
+    r_0: numpy.ndarray[dtype=float, shape=(n, d)]
+        Initial positions.
+    """
 
     def __init__(self, L, r_0):
-        super(PeriodicPositions, self).__init__(r_0)
         self.L = L
+        self._set_r(r_0)
+        self.r_0 = self.r.copy()
+
+    def _set_r(self, r):
+        self._r = r
+        self._r_w = r.copy()
+        self.wraps = np.zeros(r.shape, dtype=np.int)
+        self._wrap()
+
+    @property
+    def n(self):
+        return self._r_w.shape[0]
+
+    @property
+    def dim(self):
+        return self._r_w.shape[1]
 
     @property
     def volume(self):
@@ -59,22 +106,67 @@ class PeriodicPositions(Positions):
 
     @property
     def r_w(self):
-        wraps = self.get_wraps()
-        r_w = self.r.copy()
+        return self._r_w
+
+    @property
+    def r(self):
+        return self._r
+
+    @r.setter
+    def r(self, r):
+        self._r[...] = r
+        self._r_w[...] = r
+        self.wraps[...] = 0
+        self._wrap()
+
+    def displace(self, dr, work=None):
+        self._r += dr
+        self._r_w[...] = self._r
         for i_dim in np.where(np.isfinite(self.L))[0]:
-            r_w[:, i_dim] -= wraps[:, i_dim] * self.L[i_dim]
-        return r_w
+            self._r_w[:, i_dim] -= self.wraps[:, i_dim] * self.L[i_dim]
+        self._wrap(work)
+
+    def wrap(self, work=None):
+        self._wrap(work)
+        # Carry the in-place changes to the wrapped positions over to the
+        # unwrapped ones.
+        self._r[...] = self._r_w
+        for i_dim in np.where(np.isfinite(self.L))[0]:
+            self._r[:, i_dim] += self.wraps[:, i_dim] * self.L[i_dim]
+
+    def _wrap(self, work=None):
+        if not self.n:
+            return
+        for i_dim in range(self.dim):
+            L = self.L[i_dim]
+            if not np.isfinite(L):
+                continue
+            r_w = self._r_w[:, i_dim]
+            # Only allocate when some particle has crossed a boundary.
+            if np.abs(r_w, out=work).max() < L / 2.0:
+                continue
+            i_crossed = np.nonzero(np.abs(r_w) >= L / 2.0)[0]
+            wraps_new = np.floor((r_w[i_crossed] + L / 2.0) / L)
+            r_w[i_crossed] -= wraps_new * L
+            self.wraps[i_crossed, i_dim] += wraps_new.astype(np.int)
 
     def get_density_field(self, dx):
         return fields.density(self.r_w, self.L, dx)
 
     def get_wraps(self):
-        wraps = np.zeros(self.r.shape, dtype=np.int)
-        for i_dim in np.where(np.isfinite(self.L))[0]:
-            wraps_mag = ((np.abs(self.r[:, i_dim]) + self.L[i_dim] / 2.0) //
-                         self.L[i_dim])
-            wraps[:, i_dim] = np.sign(self.r[:, i_dim]) * wraps_mag
-        return wraps
+        return self.wraps
+
+    def __setstate__(self, state):
+        # Snapshots from before wrapped positions were stored hold only
+        # unwrapped positions, and those from before unwrapped positions
+        # were stored again hold only wrapped ones.
+        r = state.pop('r', None)
+        self.__dict__.update(state)
+        if r is not None:
+            self._set_r(r)
+        elif '_r' not in state:
+            self._r = np.empty_like(self._r_w)
+            self.wrap()
 
     def __repr__(self):
         fs = [('n', self.n), ('dim', self.dim), ('L', self.L)]
@@ -87,20 +179,21 @@ class NonePositions(object):
         fs = []
         return make_repr_str(self, fs)
 
-    def displace(self, dr):
+    def displace(self, dr, work=None):
         return
 
 
 def positions_factory(spatial_flag, periodic_flag, n, dim=None,
                       L=None, origin_flags=None,
-                      rng=None, obstructor=None):
+                      rng=None, obstructor=None, r_0=None):
     if not spatial_flag:
         return NonePositions()
     elif not periodic_flag:
         r_0 = np.zeros([n, dim])
         return Positions(r_0)
     else:
-        r_0 = get_uniform_points(n, L, origin_flags, rng, obstructor)
+        if r_0 is None:
+            r_0 = get_uniform_points(n, L, origin_flags, rng, obstructor)
         return PeriodicPositions(L, r_0)
 
 
@@ -111,16 +204,16 @@ def get_uniform_points(n, L, origin_flags=None, rng=None, obstructor=None):
     if rng is None:
         rng = np.random
     r = np.zeros([n, dim])
-    for i_n in range(n):
-        while True:
-            for i_dim in range(dim):
-                if np.isinf(L[i_dim]) or origin_flags[i_dim]:
-                    r[i_n, i_dim] = 0.0
-                else:
-                    r[i_n, i_dim] = rng.uniform(-L[i_dim] / 2.0,
-                                                L[i_dim] / 2.0)
-            if obstructor is None:
-                break
-            elif not obstructor.get_obstructeds(np.array([r[i_n]]))[0]:
-                break
+    # Draw positions for all particles at once, then redraw only those that
+    # landed in an obstacle until none do.
+    i_todo = np.arange(n)
+    while i_todo.size:
+        for i_dim in range(dim):
+            if not (np.isinf(L[i_dim]) or origin_flags[i_dim]):
+                r[i_todo, i_dim] = rng.uniform(-L[i_dim] / 2.0,
+                                               L[i_dim] / 2.0,
+                                               size=i_todo.size)
+        if obstructor is None:
+            break
+        i_todo = i_todo[obstructor.get_obstructeds(r[i_todo])]
     return r
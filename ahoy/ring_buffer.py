@@ -1,5 +1,10 @@
 import numpy as np
 from ahoy import numerics
+from ahoy.threads import get_n_threads
+
+# Defaults for how cylinder buffers are stored and transformed.
+default_time_major_flag = False
+default_single_flag = False
 
 
 class RingBuffer(object):
@@ -18,30 +23,148 @@ class RingBuffer(object):
         self.a[self.i_zero] = a_new
 
     def integral_transform(self, K):
-        tot = 0.0
-        for i in range(self.n_p):
-            tot += self.a[(self.i_zero + i) % self.n_p] * K[i]
-        return tot
+        return self.integral_transforms(K)
+
+    def integral_transforms(self, Ks):
+        """Transform the buffer by one or more kernels.
+
+        Parameters
+        ----------
+        Ks: numpy.ndarray[dtype=float, shape=(..., n_p)]
+            Kernels, whose first entry applies to the latest value.
+
+        Returns
+        -------
+        b: numpy.ndarray[dtype=float, shape=(...)]
+            Transform by each kernel.
+        """
+        n_head = self.n_p - self.i_zero
+        return (np.dot(Ks[..., :n_head], self.a[self.i_zero:]) +
+                np.dot(Ks[..., n_head:], self.a[:self.i_zero]))
 
 
 class CylinderBuffer(RingBuffer):
-    def __init__(self, n_l, n_p):
+    """Ring buffers of a quantity for a set of particles.
+
+    Parameters
+    ----------
+    n_l: int
+        Number of particles.
+    n_p: int
+        Number of past values to store for each particle.
+    n_threads: int
+        Number of threads with which to transform the buffers.
+        Defaults to `ahoy.threads.default_n_threads`.
+    time_major_flag: bool
+        Whether to store each time's values for all particles contiguously,
+        so both updates and transforms stream through memory. Otherwise,
+        each particle's history is stored contiguously. Defaults to
+        `default_time_major_flag`.
+    single_flag: bool
+        Whether to store values in single precision, halving the memory
+        needed. Defaults to `default_single_flag`.
+    """
+
+    def __init__(self, n_l, n_p, n_threads=None, time_major_flag=None,
+                 single_flag=None):
         self.n_l = n_l
         self.n_p = n_p
-        self.a = np.zeros([self.n_l, self.n_p])
+        self.n_threads = n_threads
+        if time_major_flag is None:
+            time_major_flag = default_time_major_flag
+        self.time_major_flag = time_major_flag
+        if single_flag is None:
+            single_flag = default_single_flag
+        self.single_flag = single_flag
+        dtype = np.float32 if self.single_flag else np.float64
+        if self.time_major_flag:
+            self.a = np.zeros([self.n_p, self.n_l], dtype=dtype)
+        else:
+            self.a = np.zeros([self.n_l, self.n_p], dtype=dtype)
         self.i_zero = 0
 
         # Optimisation
-        # TODO: These variables should be underscored
-        self.inds_p = np.arange(0, self.n_p, dtype=np.uint)
-        self.inds_a = self.inds_p.copy()
-        self.b = np.empty([self.n_l], dtype=np.float)
+        self.b = np.empty([self.n_l], dtype=dtype)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # Snapshots from before buffers were transformed in parallel, or
+        # could change their layout or precision.
+        self.__dict__.setdefault('n_threads', None)
+        self.__dict__.setdefault('time_major_flag', False)
+        self.__dict__.setdefault('single_flag', False)
+        self.__dict__.pop('inds_p', None)
+        self.__dict__.pop('inds_a', None)
 
     def update(self, a_new):
         self._i_dec()
-        self.a[:, self.i_zero] = a_new
+        if self.time_major_flag:
+            self.a[self.i_zero] = a_new
+        else:
+            self.a[:, self.i_zero] = a_new
 
     def integral_transform(self, K):
-        numerics.integral_transform(self.a, K, self.i_zero,
-                                    self.b, self.inds_p, self.inds_a)
+        K = np.asarray(K, dtype=self.a.dtype)
+        if self.time_major_flag:
+            transform = numerics.integral_transform_time_major
+        else:
+            transform = numerics.integral_transform
+        transform(self.a, K, self.i_zero, self.b,
+                  get_n_threads(self.n_threads))
         return self.b
+
+    def integral_transforms(self, Ks):
+        """Transform every particle's buffer by several kernels.
+
+        Parameters
+        ----------
+        Ks: numpy.ndarray[dtype=float, shape=(n_k, n_p)]
+            Kernels, whose first entry applies to the latest value.
+
+        Returns
+        -------
+        b: numpy.ndarray[dtype=float, shape=(n_k, n_l)]
+            Transform of each particle's buffer by each kernel.
+        """
+        Ks = np.asarray(Ks, dtype=self.a.dtype)
+        n_head = self.n_p - self.i_zero
+        if self.time_major_flag:
+            return (np.dot(Ks[:, :n_head], self.a[self.i_zero:]) +
+                    np.dot(Ks[:, n_head:], self.a[:self.i_zero]))
+        else:
+            return (np.dot(Ks[:, :n_head], self.a[:, self.i_zero:].T) +
+                    np.dot(Ks[:, n_head:], self.a[:, :self.i_zero].T))
+
+
+class ExpPolyFilter(object):
+    """Memory of a quantity for a set of particles, stored only as its
+    transforms by kernels of the form `decay ** p * p ** k` for `k` in
+    0, 1, 2, where `p` is the number of updates ago a value was added.
+
+    Any kernel that is an exponential times a quadratic in `p`, with no
+    truncation, can then be applied exactly in `O(1)` time and memory per
+    particle, independent of the kernel's length.
+
+    Parameters
+    ----------
+    n_l: int
+        Number of particles.
+    decay: float
+        Factor by which the kernel's exponential decays per update.
+    """
+
+    def __init__(self, n_l, decay):
+        self.n_l = n_l
+        self.decay = decay
+        self.s = np.zeros([3, self.n_l])
+
+    def update(self, a_new):
+        s_0, s_1, s_2 = self.s
+        s_2 += 2.0 * s_1 + s_0
+        s_1 += s_0
+        self.s *= self.decay
+        s_0 += a_new
+
+    def integral_transform(self, coeffs):
+        """Apply the kernel `decay ** p * sum(coeffs[k] * p ** k)`."""
+        return np.dot(coeffs, self.s)
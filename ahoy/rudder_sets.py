@@ -68,7 +68,9 @@ def rudder_set_factory(temporal_chemo_flag,
                        c_field_flag, c_field,
                        onesided_flag, chi,
                        tumble_flag, p_0, tumble_chemo_flag,
-                       rotation_flag, Dr_0, dim, rotation_chemo_flag):
+                       rotation_flag, Dr_0, dim, rotation_chemo_flag,
+                       mem_recursive_flag=None, mem_time_major_flag=None,
+                       mem_single_flag=None):
     sets = RudderSets()
 
     if tumble_flag or rotation_flag:
@@ -87,7 +89,8 @@ def rudder_set_factory(temporal_chemo_flag,
                                   temporal_chemo_flag,
                                   ds,
                                   ps, v_0, dt_mem, t_mem, t_rot_0, time,
-                                  c_field_flag, c_field)
+                                  c_field_flag, c_field, mem_recursive_flag,
+                                  mem_time_major_flag, mem_single_flag)
         sets.sets.append(rudders)
     if rotation_flag:
         rudders = rudders_factory(False, dim,
@@ -97,6 +100,7 @@ def rudder_set_factory(temporal_chemo_flag,
                                   temporal_chemo_flag,
                                   ds,
                                   ps, v_0, dt_mem, t_mem, t_rot_0, time,
-                                  c_field_flag, c_field)
+                                  c_field_flag, c_field, mem_recursive_flag,
+                                  mem_time_major_flag, mem_single_flag)
         sets.sets.append(rudders)
     return sets
@@ -4,6 +4,7 @@ import numpy as np
 from ciabatta.meta import make_repr_str
 from ahoy import noise_measurers
 from ahoy.noise_measurers import noise_measurer_factory
+from ahoy.streams import subsystem_rng
 
 
 class Rudders(object):
@@ -52,6 +53,7 @@ class RotationRudders(Rudders):
         return
 
     def _rotate(self, directions, noise, dt, rng):
+        rng = subsystem_rng(rng, 'rotation')
         dth = self._get_dth(directions, noise, dt, rng)
         directions.rotate(dth)
 
@@ -64,6 +66,19 @@ class RotationRudders2D(RotationRudders):
         return rng.normal(scale=np.sqrt(2.0 * noise * dt), size=directions.n)
 
 
+class RotationRudders3D(RotationRudders):
+    """Rotational diffusion on the sphere, by small rotations about random
+    axes. Directions decorrelate as `exp(-2 * noise * t)`."""
+
+    def _get_dth(self, directions, noise, dt, rng):
+        if rng is None:
+            rng = np.random
+        scale = np.sqrt(2.0 * noise * dt)
+        if np.ndim(scale):
+            scale = scale[:, np.newaxis]
+        return rng.normal(scale=scale, size=(directions.n, 3))
+
+
 class TumbleRudders(Rudders):
 
     def _get_tumblers(self, directions, noise, dt, rng):
@@ -72,6 +87,7 @@ class TumbleRudders(Rudders):
         return rng.uniform(size=directions.n) < noise * dt
 
     def _rotate(self, directions, noise, dt, rng):
+        rng = subsystem_rng(rng, 'tumble')
         tumblers = self._get_tumblers(directions, noise, dt, rng)
         directions.tumble(tumblers, rng)
 
@@ -79,6 +95,8 @@ class TumbleRudders(Rudders):
 def rotation_rudders_nd(dim, *args, **kwargs):
     if dim == 2:
         return RotationRudders2D(*args, **kwargs)
+    elif dim == 3:
+        return RotationRudders3D(*args, **kwargs)
     else:
         raise NotImplementedError('No rotation rudders implemented in this '
                                   ' dimension')
@@ -91,14 +109,18 @@ def rudders_factory(tumble_flag, dim,
                     temporal_chemo_flag,
                     ds,
                     ps, v_0, dt_mem, t_mem, t_rot_0, time,
-                    c_field_flag, c_field):
+                    c_field_flag, c_field, mem_recursive_flag=None,
+                    mem_time_major_flag=None, mem_single_flag=None):
     noise_measurer = noise_measurer_factory(chemo_flag,
                                             noise_0,
                                             onesided_flag, chi,
                                             temporal_chemo_flag,
                                             ds,
                                             ps, v_0, dt_mem, t_mem, t_rot_0, time,
-                                            c_field_flag, c_field)
+                                            c_field_flag, c_field,
+                                            mem_recursive_flag,
+                                            mem_time_major_flag,
+                                            mem_single_flag)
     if tumble_flag:
         rudders = TumbleRudders(noise_measurer)
     else:
@@ -44,14 +44,19 @@ def ships_factory(rng, dim,
                   temporal_chemo_flag=None, dt_mem=None, t_mem=None,
                   pore_flag=None, pore_turner=None, pore_R=None, pore_pf=None,
                   c_field_flag=None, c_dx=None, c_D=None, c_delta=None,
-                  c_0=None):
+                  c_0=None, fused_flag=None, obstructor=None,
+                  mem_recursive_flag=None, c_interp_flag=None, c_solver=None,
+                  c_every=None, u_0=None, r_0=None, mem_time_major_flag=None,
+                  mem_single_flag=None, c_precond=None):
     time = Time()
-    pore_periodic_flag = not c_field_flag
-    obstructor = obstructor_factory(pore_flag, pore_turner,
-                                    pore_R, L, pore_pf, rng,
-                                    pore_periodic_flag)
+    if obstructor is None:
+        pore_periodic_flag = not c_field_flag
+        obstructor = obstructor_factory(pore_flag, pore_turner,
+                                        pore_R, L, pore_pf, rng,
+                                        pore_periodic_flag)
     c_field = food_field_factory(c_field_flag, L, c_dx, c_D, c_delta,
-                                 c_0, obstructor)
+                                 c_0, obstructor, c_interp_flag, c_solver,
+                                 c_every, c_precond)
     ags = agents_factory(rng, dim, aligned_flag,
                          n, rho_0,
                          chi, onesided_flag,
@@ -60,5 +65,7 @@ def ships_factory(rng, dim,
                          temporal_chemo_flag, dt_mem, t_mem, time,
                          spatial_flag, v_0,
                          periodic_flag, L, origin_flags, obstructor,
-                         c_field_flag, c_field)
+                         c_field_flag, c_field, fused_flag,
+                         mem_recursive_flag, u_0, r_0, mem_time_major_flag,
+                         mem_single_flag)
     return Ships(time, ags, obstructor, c_field)
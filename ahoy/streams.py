@@ -0,0 +1,272 @@
+from __future__ import print_function, division
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from ciabatta.meta import make_repr_str
+from spatious import vector
+from ahoy.threads import get_n_threads
+
+# Defaults for how particle streams are divided and drawn.
+default_block_size = 16384
+
+# Parts of stepping that each draw from their own stream.
+subsystems = ('rotation', 'tumble', 'obstruction')
+
+# Uses of a system's seed. Each use owns the seed sequences whose spawn keys
+# start with its index, and arranges the keys below that as it likes, so
+# two uses can never be given the same seed sequence:
+#   'streams': particle streams, which spawn their subsystems and blocks.
+#   'initial': initial conditions, keyed by replica index.
+namespaces = ('streams', 'initial')
+
+
+def namespace_seed_seq(seed, namespace, *key):
+    """Return the seed sequence for a part of a system, within the namespace
+    of one use of its seed.
+
+    Unlike :meth:`numpy.random.SeedSequence.spawn`, the child depends only
+    on the seed and the key, not on how many children were made before it.
+
+    Parameters
+    ----------
+    seed: int or numpy.random.SeedSequence
+        Seed of the system.
+    namespace: str
+        Use of the seed, in `namespaces`.
+    key: int
+        Path of the part within the namespace.
+    """
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    key = (namespaces.index(namespace),) + tuple(key)
+    return np.random.SeedSequence(seed.entropy,
+                                  spawn_key=seed.spawn_key + key,
+                                  pool_size=seed.pool_size)
+
+
+class ParticleStreams(object):
+    """Random number streams for a set of particles, whose draws do not
+    depend on how the particles are split between threads or processes.
+
+    The particles are divided into fixed blocks, each with its own
+    counter-based Philox stream, spawned from a single seed. Each draw is
+    made for every particle, or for a subset picked by a mask, and each
+    block's numbers come only from its own stream. A particle's random
+    numbers therefore depend only on the seed, its block, and the sequence
+    of draws, so any chunking of whole blocks gives identical results.
+
+    Draws implement the subset of :class:`numpy.random.RandomState`'s
+    interface that stepping uses, but their size must be for all particles.
+
+    Parameters
+    ----------
+    seed: int or numpy.random.SeedSequence
+        Seed of the system, from whose `'streams'` namespace the block
+        streams are spawned.
+    n: int
+        Number of particles.
+    block_size: int
+        Number of particles in each block. Defaults to
+        `default_block_size`. Results depend on the block size.
+    n_threads: int
+        Number of threads across which to draw the blocks. Defaults to
+        `ahoy.threads.default_n_threads`. Results do not depend on the
+        number of threads.
+    """
+
+    def __init__(self, seed, n, block_size=None, n_threads=None):
+        if block_size is None:
+            block_size = default_block_size
+        self._setup(namespace_seed_seq(seed, 'streams'), n, block_size,
+                    n_threads)
+
+    def _setup(self, seed_seq, n, block_size, n_threads):
+        self.seed_seq = seed_seq
+        self.n = n
+        self.block_size = block_size
+        self.n_threads = n_threads
+
+        # Spawn the subsystems' seeds before the blocks', so they don't
+        # depend on the number of blocks.
+        self._subsystem_seed_seqs = self.seed_seq.spawn(len(subsystems))
+        self.block_starts = np.arange(0, max(n, 1), block_size)
+        self._block_seed_seqs = self.seed_seq.spawn(len(self.block_starts))
+        self._gens = [np.random.Generator(np.random.Philox(s))
+                      for s in self._block_seed_seqs]
+
+    @property
+    def n_blocks(self):
+        return len(self._gens)
+
+    def spawn(self, n_streams):
+        """Return independent streams for the same particles, such as one
+        for each subsystem that draws random numbers."""
+        return [self._get_child(s) for s in self.seed_seq.spawn(n_streams)]
+
+    def _get_child(self, seed_seq):
+        """Return streams for the same particles from a seed sequence
+        already spawned within this one's namespace."""
+        child = ParticleStreams.__new__(ParticleStreams)
+        child._setup(seed_seq, self.n, self.block_size, self.n_threads)
+        return child
+
+    def get_seed_seqs(self):
+        """Return the seed sequences of these streams, their subsystems'
+        and their blocks'."""
+        return ([self.seed_seq] + self._subsystem_seed_seqs +
+                self._block_seed_seqs)
+
+    def get_subsystem(self, subsystem):
+        """Return the stream of a part of stepping, named in `subsystems`,
+        so its draws do not shift those of the other parts.
+
+        Each subsystem's stream depends only on the seed, and is made the
+        first time it is needed.
+        """
+        try:
+            subsystem_streams = self._subsystem_streams
+        except AttributeError:
+            subsystem_streams = self._subsystem_streams = {}
+        if subsystem not in subsystem_streams:
+            seed_seq = self._subsystem_seed_seqs[subsystems.index(subsystem)]
+            subsystem_streams[subsystem] = self._get_child(seed_seq)
+        return subsystem_streams[subsystem]
+
+    def _get_pool(self, n_threads):
+        """Return a thread pool kept for the life of the streams, so a draw
+        need not start threads."""
+        try:
+            return self._pool
+        except AttributeError:
+            self._pool = ThreadPoolExecutor(n_threads)
+            return self._pool
+
+    def _draw(self, fill, size, mask):
+        if size is None:
+            size = self.n
+        shape = tuple(np.atleast_1d(size))
+        if shape[0] != self.n:
+            raise ValueError('Draws must be made for all particles')
+        if mask is None:
+            counts = np.diff(np.append(self.block_starts, self.n))
+        else:
+            counts = np.add.reduceat(mask.astype(np.int64),
+                                     self.block_starts)
+        out = np.empty((counts.sum(),) + shape[1:])
+        bounds = np.append(0, np.cumsum(counts))
+
+        def fill_blocks(i_blocks):
+            for i_block in i_blocks:
+                fill(self._gens[i_block],
+                     out[bounds[i_block]:bounds[i_block + 1]])
+
+        i_blockss = np.array_split(np.arange(self.n_blocks),
+                                   min(get_n_threads(self.n_threads),
+                                       self.n_blocks))
+        if len(i_blockss) > 1:
+            pool = self._get_pool(len(i_blockss))
+            list(pool.map(fill_blocks, i_blockss))
+        else:
+            fill_blocks(i_blockss[0])
+        return out
+
+    def uniform(self, low=0.0, high=1.0, size=None, mask=None):
+        """Draw uniformly distributed numbers.
+
+        Parameters
+        ----------
+        low, high: float or numpy.ndarray
+            Bounds of the interval, broadcast against the draws.
+        size: int or tuple[int]
+            Shape of the draws for all particles, whose first entry is the
+            number of particles.
+        mask: numpy.ndarray[dtype=bool, shape=(n,)]
+            Particles for which to draw, if not all of them.
+        """
+        def fill(gen, out):
+            gen.random(out=out)
+        return low + (high - low) * self._draw(fill, size, mask)
+
+    def normal(self, loc=0.0, scale=1.0, size=None, mask=None):
+        """Draw normally distributed numbers. See :meth:`uniform`."""
+        def fill(gen, out):
+            gen.standard_normal(out=out)
+        return loc + scale * self._draw(fill, size, mask)
+
+    def randint(self, high, size=None, mask=None):
+        """Draw integers from 0 up to `high`. See :meth:`uniform`."""
+        def fill(gen, out):
+            out[...] = gen.integers(high, size=out.shape)
+        return self._draw(fill, size, mask).astype(np.int64)
+
+    def __getstate__(self):
+        # Threads can't be stored, start them again when needed.
+        state = self.__dict__.copy()
+        state.pop('_pool', None)
+        return state
+
+    def __repr__(self):
+        fs = [('n', self.n), ('block_size', self.block_size),
+              ('n_threads', self.n_threads)]
+        return make_repr_str(self, fs)
+
+
+def draw_masked(rng, dist, mask, *args, **kwargs):
+    """Draw numbers for the particles picked by a mask, from either a
+    :class:`ParticleStreams` or a :class:`numpy.random.RandomState`.
+
+    Parameters
+    ----------
+    rng: ParticleStreams or numpy.random.RandomState
+        Source of random numbers.
+    dist: str
+        Name of the distribution's method, such as `'uniform'`.
+    mask: numpy.ndarray[dtype=bool, shape=(n,)]
+        Particles for which to draw.
+    shape: tuple[int]
+        Shape of the draw for each particle.
+    args, kwargs:
+        Parameters of the distribution.
+
+    Returns
+    -------
+    draws: numpy.ndarray[shape=(m,) + shape]
+        Numbers for each of the `m` picked particles.
+    """
+    shape = kwargs.pop('shape', ())
+    if isinstance(rng, ParticleStreams):
+        return getattr(rng, dist)(*args, size=(mask.shape[0],) + shape,
+                                  mask=mask, **kwargs)
+    return getattr(rng, dist)(*args, size=(mask.sum(),) + shape, **kwargs)
+
+
+def draw_sphere_masked(rng, mask, d=3):
+    """Draw unit vectors uniformly on the sphere for the particles picked by
+    a mask. See :func:`draw_masked`.
+
+    A :class:`numpy.random.RandomState` picks them by
+    :func:`spatious.vector.sphere_pick`, as before particle streams were
+    added, so existing seeds give unchanged results. Particle streams
+    normalise isotropic normal draws.
+    """
+    if isinstance(rng, ParticleStreams):
+        return vector.vector_unit_nonull(draw_masked(rng, 'normal', mask,
+                                                     shape=(d,)))
+    return vector.sphere_pick(n=mask.sum(), d=d, rng=rng)
+
+
+def subsystem_rng(rng, subsystem):
+    """Return the source of random numbers for a part of stepping.
+
+    Particle streams are split into an independent stream for each of
+    `subsystems`. Other sources are shared by all parts, as before.
+
+    Parameters
+    ----------
+    rng: ParticleStreams or numpy.random.RandomState or None
+        Source of random numbers for stepping.
+    subsystem: str
+        Name of the part of stepping, in `subsystems`.
+    """
+    if isinstance(rng, ParticleStreams):
+        return rng.get_subsystem(subsystem)
+    return rng
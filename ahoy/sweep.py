@@ -0,0 +1,210 @@
+from __future__ import print_function, division
+from collections import OrderedDict
+import copy
+from itertools import product
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+import os
+from os.path import join, isdir
+import numpy as np
+from agaro.runner import Runner
+from ahoy.model import Model
+from ahoy.obstructors import obstructor_factory, turner_str_map
+
+checkpoint_filename = 'sweep_checkpoint.txt'
+
+# Keyword arguments that determine a model's obstacle geometry.
+geometry_keys = ('pore_flag', 'pore_R', 'pore_pf', 'L', 'c_field_flag')
+
+# Number of obstructors to keep in each process's cache.
+obstructor_cache_size = 8
+
+# Obstructors built in this process, keyed on their geometry and the seed of
+# the random number generator that packed them, most recently used last.
+_obstructor_cache = OrderedDict()
+
+
+def _format_val(v):
+    if isinstance(v, np.ndarray):
+        v = v.tolist()
+    return repr(v)
+
+
+def _kwargs_key(model_kwargs, keys=None):
+    if keys is None:
+        keys = model_kwargs.keys()
+    return ','.join('{}={}'.format(k, _format_val(model_kwargs.get(k)))
+                    for k in sorted(keys))
+
+
+def _geometry_key(model_kwargs):
+    return _kwargs_key(model_kwargs, geometry_keys + ('seed',))
+
+
+def _get_obstructor(model_kwargs):
+    """Make an obstructor for a set of model arguments, reusing one
+    previously made in this process if it has the same geometry.
+
+    Returns
+    -------
+    obstructor: Obstructor
+        Obstructor.
+    rng_state: tuple
+        State of the model's random number generator just after packing the
+        obstructor, so that a model built from it matches one built from
+        scratch.
+    """
+    key = _geometry_key(model_kwargs)
+    if key in _obstructor_cache:
+        _obstructor_cache.move_to_end(key)
+    else:
+        rng = np.random.RandomState(model_kwargs['seed'])
+        pore_periodic_flag = not model_kwargs.get('c_field_flag')
+        obstructor = obstructor_factory(model_kwargs.get('pore_flag'),
+                                        model_kwargs.get('pore_turner'),
+                                        model_kwargs.get('pore_R'),
+                                        model_kwargs.get('L'),
+                                        model_kwargs.get('pore_pf'), rng,
+                                        pore_periodic_flag)
+        _obstructor_cache[key] = (obstructor, rng.get_state())
+        while len(_obstructor_cache) > obstructor_cache_size:
+            _obstructor_cache.popitem(last=False)
+    obstructor, rng_state = _obstructor_cache[key]
+    # The turner is not part of the geometry, so give each model its own.
+    if hasattr(obstructor, 'turner'):
+        obstructor = copy.copy(obstructor)
+        obstructor.turner = turner_str_map[model_kwargs.get('pore_turner')]
+    return obstructor, rng_state
+
+
+def make_model(model_kwargs):
+    """Make a model, reusing the obstacle geometry of any model previously
+    made in this process with the same seed and geometry arguments.
+
+    Parameters
+    ----------
+    model_kwargs: dict
+        Arguments to :class:`Model`.
+
+    Returns
+    -------
+    m: Model
+        Model, identical to `Model(**model_kwargs)`.
+    """
+    obstructor, rng_state = _get_obstructor(model_kwargs)
+    rng = np.random.RandomState()
+    rng.set_state(rng_state)
+    return Model(rng=rng, obstructor=obstructor, **model_kwargs)
+
+
+def _run_task(model_kwargs, output_root, t_output_every, t_upto):
+    m = make_model(model_kwargs)
+    output_dir = join(output_root, m.get_output_dirname())
+    r = Runner(output_dir, m, force_resume=True)
+    r.iterate(t_upto=t_upto, t_output_every=t_output_every)
+    # Write out anything observers are still holding after the final step.
+    for observer in r.model.observers:
+        if hasattr(observer, 'close'):
+            observer.close()
+    return output_dir
+
+
+def _read_checkpoint(output_root):
+    done = {}
+    fname = join(output_root, checkpoint_filename)
+    if os.path.exists(fname):
+        with open(fname) as f:
+            for line in f:
+                key, output_dir = line.rstrip('\n').split('\t')
+                done[key] = output_dir
+    return done
+
+
+def get_model_kwarg_sets(model_kwargs, param_grid, seeds):
+    """Expand a grid of model arguments into a list of argument sets.
+
+    Parameters
+    ----------
+    model_kwargs: dict
+        Arguments shared by all models.
+    param_grid: dict[str, list]
+        For each varied argument, the values it takes.
+    seeds: list[int]
+        Random number generator seeds.
+
+    Returns
+    -------
+    model_kwarg_sets: list[dict]
+        One argument set for each combination of varied arguments and seed.
+    """
+    keys = sorted(param_grid.keys())
+    model_kwarg_sets = []
+    for vals in product(*[param_grid[k] for k in keys]):
+        for seed in seeds:
+            model_kwarg_set = dict(model_kwargs, seed=seed)
+            model_kwarg_set.update(zip(keys, vals))
+            model_kwarg_sets.append(model_kwarg_set)
+    return model_kwarg_sets
+
+
+def run_sweep(model_kwargs, param_grid, seeds, t_output_every, t_upto,
+              output_root='.', n_workers=None):
+    """Run a model for every combination of a grid of arguments and seeds,
+    in parallel.
+
+    Each run is recorded in its own output directory, named after the model,
+    inside `output_root`. Runs sharing an obstacle geometry and seed reuse
+    one pore packing in each worker process.
+
+    Finished runs are recorded in a checkpoint file in `output_root`, and
+    are skipped if the sweep is run again. Runs that were interrupted resume
+    from their latest snapshot.
+
+    Parameters
+    ----------
+    model_kwargs: dict
+        Arguments to :class:`Model` shared by all runs.
+    param_grid: dict[str, list]
+        For each varied argument, the values it takes.
+    seeds: list[int]
+        Random number generator seeds.
+    t_output_every: float
+        Time between snapshots.
+    t_upto: float
+        Time to run each model until.
+    output_root: str
+        Directory in which to put run output directories.
+    n_workers: int
+        Number of worker processes. `None` means one per core.
+
+    Returns
+    -------
+    output_dirs: list[str]
+        Output directory of each run, in the order given by
+        :func:`get_model_kwarg_sets`.
+    """
+    if not isdir(output_root):
+        os.makedirs(output_root)
+    if n_workers is None:
+        n_workers = multiprocessing.cpu_count()
+
+    model_kwarg_sets = get_model_kwarg_sets(model_kwargs, param_grid, seeds)
+    keys = [_kwargs_key(mks) for mks in model_kwarg_sets]
+    done = _read_checkpoint(output_root)
+
+    # Queue runs sharing a geometry together, so workers tend to pick up
+    # runs whose pore packing they have already made.
+    i_todo = sorted((i for i in range(len(keys)) if keys[i] not in done),
+                    key=lambda i: _geometry_key(model_kwarg_sets[i]))
+
+    with open(join(output_root, checkpoint_filename), 'a') as f_check:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = {executor.submit(_run_task, model_kwarg_sets[i],
+                                       output_root, t_output_every, t_upto): i
+                       for i in i_todo}
+            for future in as_completed(futures):
+                key = keys[futures[future]]
+                done[key] = future.result()
+                f_check.write('{}\t{}\n'.format(key, done[key]))
+                f_check.flush()
+    return [done[key] for key in keys]
@@ -9,8 +9,20 @@ class Swimmers(object):
         self.v_0 = v_0
         self.directions = directions
 
-    def get_dr(self, dt):
-        return self.v_0 * self.directions.u * dt
+    def get_dr(self, dt, out=None):
+        """Return the displacement of each particle over a time step.
+
+        Parameters
+        ----------
+        dt: float
+            Time step.
+        out: numpy.ndarray[dtype=float, shape=(n, d)]
+            Array in which to write the displacements, to avoid allocating
+            one.
+        """
+        dr = self.directions.get_u(out)
+        dr *= self.v_0 * dt
+        return dr
 
     def __repr__(self):
         fs = [('v_0', self.v_0)]
@@ -22,8 +34,11 @@ class NoneSwimmers(object):
     def __init__(self, directions):
         self.directions = directions
 
-    def get_dr(self, dt):
-        return np.zeros_like(self.directions.u)
+    def get_dr(self, dt, out=None):
+        if out is None:
+            return np.zeros_like(self.directions.u)
+        out.fill(0.0)
+        return out
 
 
 def swimmers_factory(spatial_flag, v_0, ds):
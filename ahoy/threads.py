@@ -0,0 +1,16 @@
+from __future__ import print_function, division
+import os
+
+# Number of threads used by parallel parts of stepping, when not given.
+default_n_threads = int(os.environ.get('AHOY_N_THREADS', 1))
+
+
+def get_n_threads(n_threads=None):
+    """Return a number of threads, or `default_n_threads` if it is `None`.
+
+    The default is read from the `AHOY_N_THREADS` environment variable, or
+    is 1 if that is not set.
+    """
+    if n_threads is None:
+        return default_n_threads
+    return n_threads
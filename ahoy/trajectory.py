@@ -0,0 +1,256 @@
+from __future__ import print_function, division
+import json
+import os
+from os.path import join, isdir, exists, getsize
+import pickle
+import numpy as np
+
+meta_filename = 'meta.json'
+static_filename = 'static.npz'
+mesh_filename = 'mesh.pkl'
+
+
+def _get_frame_fields(m, c_flag):
+    """Return the per-frame fields of a model that a trajectory records,
+    as a dict of field name to array."""
+    ags = m.ships.agents
+    fields = {'t': np.array(m.ships.time.t, dtype=np.float64),
+              'i': np.array(m.i, dtype=np.int64)}
+    # Store wrapped positions, which stay small, with exact wrap counts,
+    # rather than unwrapped positions whose rounding grows as particles
+    # travel.
+    if hasattr(ags.positions, 'get_wraps'):
+        fields['r_w'] = ags.positions.r_w.astype(np.float32)
+        fields['wraps'] = ags.positions.get_wraps().astype(np.int32)
+    elif hasattr(ags.positions, 'r'):
+        fields['r'] = ags.positions.r.astype(np.float32)
+    if hasattr(ags.directions, 'th'):
+        fields['th'] = ags.directions.th.astype(np.float32)
+    elif hasattr(ags.directions, 'sign'):
+        fields['sign'] = ags.directions.sign.astype(np.int8)
+    else:
+        fields['u'] = ags.directions.u.astype(np.float32)
+    if c_flag:
+        fields['c'] = np.asarray(m.ships.c_field.c.value, dtype=np.float32)
+    return fields
+
+
+def _get_static_fields(m):
+    ags = m.ships.agents
+    fields = {}
+    if hasattr(ags.positions, 'r_0'):
+        fields['r_0'] = ags.positions.r_0
+    fields['u_0'] = ags.directions.u_0
+    obs = m.ships.obstructor
+    if hasattr(obs, 'rs'):
+        fields['pore_rs'] = obs.rs
+    if hasattr(m.ships.c_field, 'mesh'):
+        fields['cell_centers'] = m.ships.c_field.mesh.cellCenters.value.T
+    return fields
+
+
+def _get_meta(m, fields):
+    ags = m.ships.agents
+    meta = {
+        'dirname': m.get_output_dirname(),
+        'seed': m.seed,
+        'dt': m.dt,
+        'n': ags.n,
+        'dim': m.ships.dim,
+        'fields': dict((k, {'dtype': v.dtype.str, 'shape': v.shape})
+                       for k, v in fields.items()),
+    }
+    if hasattr(ags.positions, 'L'):
+        meta['L'] = list(ags.positions.L)
+    if hasattr(ags.swimmers, 'v_0'):
+        meta['v_0'] = ags.swimmers.v_0
+    if hasattr(m.ships.obstructor, 'R'):
+        meta['pore_R'] = m.ships.obstructor.R
+    if hasattr(m.ships.c_field, 'c_0'):
+        meta['c_0'] = m.ships.c_field.c_0
+    return meta
+
+
+class TrajectoryWriter(object):
+    """Model observer that records a compact trajectory of a run.
+
+    Static information, such as the initial positions and the obstacles, is
+    written once. Per-frame fields are buffered and appended in chunks to
+    one raw binary file per field, in single precision where possible, so
+    the trajectory can be read back as memory-mapped arrays by
+    :class:`Trajectory`.
+
+    Add the writer with :meth:`Model.add_observer`, so the initial state is
+    recorded as the first frame, and call :meth:`close` when the run ends to
+    write any buffered frames, or use the writer as a context manager.
+
+    A writer starting a trajectory overwrites any trajectory already in the
+    directory. A writer resumed from a snapshot of its model discards any
+    frames written after the snapshot, before appending its own.
+
+    Parameters
+    ----------
+    dirname: str
+        Directory in which to write the trajectory.
+    every: int
+        Number of iterations between recorded frames.
+    chunk_size: int
+        Number of frames to buffer before writing.
+    c_flag: bool
+        Whether to record the food field's values.
+    """
+
+    def __init__(self, dirname, every=1, chunk_size=100, c_flag=False):
+        self.dirname = dirname
+        self.every = every
+        self.chunk_size = chunk_size
+        self.c_flag = c_flag
+        self._buffers = {}
+        # Number of frames written to the trajectory files.
+        self.n_frames = 0
+        self._started = False
+
+    def _write_static(self, m, fields):
+        if not isdir(self.dirname):
+            os.makedirs(self.dirname)
+        with open(join(self.dirname, meta_filename), 'w') as f:
+            json.dump(_get_meta(m, fields), f)
+        np.savez(join(self.dirname, static_filename), **_get_static_fields(m))
+        if self.c_flag:
+            with open(join(self.dirname, mesh_filename), 'wb') as f:
+                pickle.dump(m.ships.c_field.mesh, f)
+        # Don't append to the frames of a trajectory already there.
+        for k in fields:
+            fname = join(self.dirname, '{}.bin'.format(k))
+            if exists(fname):
+                os.remove(fname)
+
+    def observe(self, m):
+        if m.i % self.every:
+            return
+        fields = _get_frame_fields(m, self.c_flag)
+        if not self._started:
+            self._write_static(m, fields)
+            self._started = True
+        for k, v in fields.items():
+            self._buffers.setdefault(k, []).append(v)
+        if len(self._buffers['t']) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Append buffered frames to the trajectory files."""
+        n_frames_new = len(self._buffers.get('t', []))
+        for k, vs in self._buffers.items():
+            with open(join(self.dirname, '{}.bin'.format(k)), 'ab') as f:
+                # Drop any frames written after the snapshot of the model
+                # this writer was resumed from.
+                f.truncate(self.n_frames * vs[0].nbytes)
+                np.array(vs).tofile(f)
+        self.n_frames += n_frames_new
+        self._buffers = {}
+
+    def close(self):
+        """Write any buffered frames."""
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __repr__(self):
+        return '{}(dirname={}, every={})'.format(self.__class__.__name__,
+                                                 self.dirname, self.every)
+
+
+class Trajectory(object):
+    """Read access to a trajectory recorded by :class:`TrajectoryWriter`.
+
+    Per-frame fields are memory-mapped arrays whose first axis is the frame
+    index, so slicing many frames reads only what is needed.
+
+    Parameters
+    ----------
+    dirname: str
+        Trajectory directory.
+    """
+
+    def __init__(self, dirname):
+        self.dirname = dirname
+        with open(join(dirname, meta_filename)) as f:
+            self.meta = json.load(f)
+        self.static = dict(np.load(join(dirname, static_filename)))
+        self._fields = {}
+
+    @property
+    def n_frames(self):
+        return self.t.shape[0]
+
+    @property
+    def L(self):
+        return np.array(self.meta['L'])
+
+    @property
+    def mesh(self):
+        """The food field's mesh, or `None` if the field was not recorded."""
+        fname = join(self.dirname, mesh_filename)
+        if not exists(fname):
+            return None
+        with open(fname, 'rb') as f:
+            return pickle.load(f)
+
+    def __getattr__(self, k):
+        if k.startswith('_') or k not in self.meta['fields']:
+            raise AttributeError(k)
+        if k not in self._fields:
+            spec = self.meta['fields'][k]
+            dtype = np.dtype(spec['dtype'])
+            shape = tuple(spec['shape'])
+            fname = join(self.dirname, '{}.bin'.format(k))
+            n_frames = getsize(fname) // (dtype.itemsize *
+                                          int(np.prod(shape)))
+            self._fields[k] = np.memmap(fname, dtype=dtype, mode='r',
+                                        shape=(n_frames,) + shape)
+        return self._fields[k]
+
+    def _offset_wraps(self, r, i, sign):
+        L = self.L
+        wraps = self.wraps[i]
+        for i_dim in np.where(np.isfinite(L))[0]:
+            r[..., i_dim] += sign * wraps[..., i_dim] * L[i_dim]
+        return r
+
+    def get_r(self, i):
+        """Unwrapped positions, for a frame index or slice."""
+        fields = self.meta['fields']
+        if 'r_w' in fields:
+            return self._offset_wraps(np.array(self.r_w[i], dtype=np.float),
+                                      i, 1)
+        return np.array(self.r[i], dtype=np.float)
+
+    def get_r_w(self, i):
+        """Positions wrapped into the system, for a frame index or slice."""
+        fields = self.meta['fields']
+        if 'r_w' in fields:
+            return np.array(self.r_w[i], dtype=np.float)
+        r_w = np.array(self.r[i], dtype=np.float)
+        # Trajectories recorded with unwrapped positions.
+        if 'wraps' in fields:
+            r_w = self._offset_wraps(r_w, i, -1)
+        return r_w
+
+    def get_u(self, i):
+        """Direction vectors, for a frame index or slice."""
+        if 'th' in self.meta['fields']:
+            th = np.array(self.th[i])
+            return np.stack([np.cos(th), np.sin(th)], axis=-1)
+        elif 'u' in self.meta['fields']:
+            return np.array(self.u[i], dtype=np.float)
+        else:
+            return np.array(self.sign[i])[..., np.newaxis].astype(np.float)
+
+    def __repr__(self):
+        return '{}(dirname={}, n_frames={})'.format(self.__class__.__name__,
+                                                    self.dirname,
+                                                    self.n_frames)
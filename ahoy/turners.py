@@ -1,9 +1,29 @@
 from __future__ import print_function, division
 import numpy as np
-from ciabatta import crandom
 from ciabatta.meta import make_repr_str
 from spatious import vector
 from spatious.vector import smallest_signed_angle as angle_dist
+from ahoy.streams import draw_masked, draw_sphere_masked
+
+
+def _get_picks_mask(obs, picks):
+    """Return a mask over all particles of those picked among the
+    obstructed ones, so their random numbers can be drawn from particle
+    streams.
+
+    Parameters
+    ----------
+    obs: numpy.ndarray[dtype=bool, shape=(n,)] or None
+        Obstructed particles, or `None` if the picks are over all
+        particles.
+    picks: numpy.ndarray[dtype=bool, shape=(m,)]
+        Picked particles among the `m` obstructed ones.
+    """
+    if obs is None:
+        return picks
+    mask = np.zeros(obs.shape, dtype=np.bool_)
+    mask[obs] = picks
+    return mask
 
 
 class Turner(object):
@@ -14,8 +34,17 @@ class Turner(object):
     def get_norm_angle(self, *args, **kwargs):
         return vector.normalise_angle(self.get_angle(*args, **kwargs))
 
+    def get_vector(self, u_in, *args, **kwargs):
+        """Turn unit vectors, given the unit normals of the surfaces they
+        meet, for directions in 3D."""
+        return u_in
+
     def turn(self, obs, ds, *args, **kwargs):
-        ds.th[obs] = self.get_norm_angle(ds.th[obs], *args, **kwargs)
+        kwargs['obs'] = obs
+        if ds.dim == 3:
+            ds.set_u(obs, self.get_vector(ds.get_u()[obs], *args, **kwargs))
+        else:
+            ds.set_th(obs, self.get_norm_angle(ds.th[obs], *args, **kwargs))
 
     def __repr__(self):
         fs = []
@@ -27,6 +56,9 @@ class BounceBackTurner(Turner):
     def get_angle(self, th_in, *args, **kwargs):
         return th_in + np.pi
 
+    def get_vector(self, u_in, *args, **kwargs):
+        return -u_in
+
 
 class ReflectTurner(Turner):
 
@@ -36,16 +68,36 @@ class ReflectTurner(Turner):
                                     np.pi,
                                     np.sign(th_rel) * np.pi - th_rel)
 
+    def get_vector(self, u_in, u_normal, *args, **kwargs):
+        u_dot_n = np.sum(u_in * u_normal, axis=-1)[:, np.newaxis]
+        return u_in - 2.0 * u_dot_n * u_normal
+
 
 class AlignTurner(Turner):
 
-    def get_angle(self, th_in, th_normal, rng, *args, **kwargs):
+    def get_angle(self, th_in, th_normal, rng, obs=None, *args, **kwargs):
         if rng is None:
             rng = np.random
         th_rel = vector.normalise_angle(th_in - th_normal)
         antiparallels = np.isclose(np.abs(angle_dist(th_in, th_normal)), np.pi)
+        alls = _get_picks_mask(obs, np.ones(th_in.shape, dtype=np.bool_))
         signs = np.where(antiparallels,
-                         crandom.randbool(antiparallels.shape[0], rng),
+                         draw_masked(rng, 'randint', alls, 2) * 2 - 1,
                          np.sign(th_rel))
         th_rel = signs * np.pi / 2.0
         return th_normal + th_rel
+
+    def get_vector(self, u_in, u_normal, rng, obs=None, *args, **kwargs):
+        if rng is None:
+            rng = np.random
+        u_dot_n = np.sum(u_in * u_normal, axis=-1)[:, np.newaxis]
+        u_tan = u_in - u_dot_n * u_normal
+        # Particles moving along the normal, either way, have no tangential
+        # direction, so take a random one in the tangent plane.
+        alongs = np.isclose(np.abs(u_dot_n[:, 0]), 1.0)
+        if np.any(alongs):
+            u_rand = draw_sphere_masked(rng, _get_picks_mask(obs, alongs))
+            u_dot_n_rand = np.sum(u_rand * u_normal[alongs],
+                                  axis=-1)[:, np.newaxis]
+            u_tan[alongs] = u_rand - u_dot_n_rand * u_normal[alongs]
+        return vector.vector_unit_nonull(u_tan)
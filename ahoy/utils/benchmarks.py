@@ -0,0 +1,91 @@
+from __future__ import print_function, division
+import time
+import numpy as np
+from ahoy import fields, positions
+from ahoy.mesh import uniform_mesh_factory
+
+
+def _time_field(f, ps, dt, n_steps):
+    f.iterate(ps, dt)
+    t_start = time.time()
+    for _ in range(n_steps):
+        f.iterate(ps, dt)
+    return (time.time() - t_start) / n_steps
+
+
+def benchmark_field_solvers(L=np.array([4.0, 4.0]), dx=0.02, n=10000,
+                            D=1.0, delta=1.0, c_0=1.0, dt=0.01, n_steps=10,
+                            seed=1):
+    """Time a step of each food field solver on a uniform mesh, with
+    stationary particles.
+
+    Returns
+    -------
+    ts: dict[str, float]
+        Time per step of each solver, named by its class, and preconditioner
+        if it has a choice.
+    c_errs: dict[str, float]
+        Largest difference of the field found by each solver from that
+        found by FiPy.
+    """
+    rng = np.random.RandomState(seed)
+    mesh = uniform_mesh_factory(L, dx)
+    rs = positions.get_uniform_points(n, L, rng=rng)
+    ps = positions.PeriodicPositions(L, rs)
+    fs = {'FoodField': fields.FoodField(mesh, D, delta, c_0),
+          'SparseFoodField': fields.SparseFoodField(mesh, D, delta, c_0),
+          'SparseFoodField(lu)': fields.SparseFoodField(mesh, D, delta, c_0,
+                                                        precond='lu'),
+          'SpectralFoodField': fields.SpectralFoodField(mesh, D, delta, c_0)}
+    ts = dict((name, _time_field(f, ps, dt, n_steps))
+              for name, f in fs.items())
+    c_ref = fs['FoodField'].c.value
+    c_errs = dict((name, np.max(np.abs(f.c.value - c_ref)))
+                  for name, f in fs.items())
+    return ts, c_errs
+
+
+def field_every_convergence(everys=(1, 2, 4, 8, 16), L=np.array([2.0, 2.0]),
+                            dx=0.05, n=1000, D=1.0, delta=0.01, c_0=1.0,
+                            dt=0.001, n_steps=256, v=1.0, seed=1):
+    """Measure the error made by solving the food field only every few
+    particle steps.
+
+    Particles swim in random fixed directions, and the same trajectories are
+    used for each number of steps between solves.
+
+    Returns
+    -------
+    errs: numpy.ndarray[dtype=float, shape=(len(everys),)]
+        Root mean square difference of the final field from that found by
+        solving every step.
+    """
+    rng = np.random.RandomState(seed)
+    mesh = uniform_mesh_factory(L, dx)
+    rs = positions.get_uniform_points(n, L, rng=rng)
+    th = rng.uniform(-np.pi, np.pi, size=n)
+    dr = v * dt * np.array([np.cos(th), np.sin(th)]).T
+
+    def run(every):
+        ps = positions.PeriodicPositions(L, rs.copy())
+        f = fields.SparseFoodField(mesh, D, delta, c_0, every=every)
+        for _ in range(n_steps):
+            ps.displace(dr)
+            f.iterate(ps, dt)
+        return np.array(f.c.value)
+
+    c_ref = run(1)
+    return np.array([np.sqrt(np.mean(np.square(run(every) - c_ref)))
+                     for every in everys])
+
+
+if __name__ == '__main__':
+    ts, c_errs = benchmark_field_solvers()
+    for name, t in sorted(ts.items()):
+        print('{}: {:.3g} s per step, largest difference in c from FiPy '
+              '{:.3g}'.format(name, t, c_errs[name]))
+
+    everys = (1, 2, 4, 8, 16)
+    errs = field_every_convergence(everys)
+    for every, err in zip(everys, errs):
+        print('Field solved every {} steps: error {:.3g}'.format(every, err))
@@ -0,0 +1,176 @@
+from __future__ import print_function, division
+import functools
+import hashlib
+import os
+from os.path import join, basename, exists, getmtime
+import pickle
+import tempfile
+import types
+import numpy as np
+from agaro.output_utils import get_filenames, filename_to_model
+
+# Not `.pkl`, which would be taken for a snapshot.
+cache_filename = 'measure_cache.pickle'
+
+
+def _load_cache(dirname):
+    fname = join(dirname, cache_filename)
+    if exists(fname):
+        with open(fname, 'rb') as f:
+            return pickle.load(f)
+    return {}
+
+
+def _store_cache(dirname, cache):
+    try:
+        fd, fname_tmp = tempfile.mkstemp(dir=dirname)
+    except OSError:
+        # A directory we cannot write to, so do without the cache.
+        return
+    with os.fdopen(fd, 'wb') as f:
+        pickle.dump(cache, f, protocol=2)
+    os.rename(fname_tmp, join(dirname, cache_filename))
+
+
+def _update_code_hash(h, code):
+    h.update(code.co_code)
+    h.update(repr(code.co_names).encode())
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            _update_code_hash(h, const)
+        else:
+            h.update(repr(const).encode())
+
+
+def get_code_hash(f):
+    """Return a fingerprint of a function's code, which changes when the
+    code does.
+
+    Only the function's own code is covered, not that of functions it
+    calls. For a :class:`functools.partial`, its arguments are included.
+    """
+    h = hashlib.sha1()
+    while isinstance(f, functools.partial):
+        h.update(repr((f.args, sorted(f.keywords.items()))).encode())
+        f = f.func
+    code = getattr(f, '__code__', None)
+    if code is None:
+        h.update(type(f).__name__.encode())
+    else:
+        _update_code_hash(h, code)
+    return h.hexdigest()[:12]
+
+
+def _get_name(measure_func):
+    try:
+        return measure_func.__name__
+    except AttributeError:
+        raise ValueError('Measure function {!r} has no name, so give it one '
+                         'explicitly'.format(measure_func))
+
+
+class MeasurePipeline(object):
+    """Evaluate several measures over time for model output directories,
+    loading each snapshot at most once.
+
+    Results are cached in each output directory, keyed on each snapshot's
+    name and modification time, so later runs of the pipeline only load
+    snapshots that are new, or for which a measure has not been computed.
+
+    Parameters
+    ----------
+    measure_funcs: list[function or tuple(str, function)]
+        Functions which take a :class:`Model` instance as a single argument,
+        and return a measure and its uncertainty, each optionally paired
+        with a name. Each is identified in the results by its name, which
+        defaults to the function's `__name__`, and in the cache by its name
+        and a hash of its code, so cached values are recomputed when the
+        code changes.
+    time_func: function
+        Function which takes a :class:`Model` instance as a single argument,
+        and returns its time.
+    cache_flag: bool
+        Whether to read and write cached results.
+    """
+
+    def __init__(self, measure_funcs, time_func, cache_flag=True):
+        self.measure_funcs = []
+        self.names = []
+        self.time_func = time_func
+        self.cache_flag = cache_flag
+        for measure_func in measure_funcs:
+            if isinstance(measure_func, tuple):
+                name, measure_func = measure_func
+                self.add(measure_func, name)
+            else:
+                self.add(measure_func)
+
+    def add(self, measure_func, name=None):
+        """Register another measure function, optionally with a name."""
+        if name is None:
+            name = _get_name(measure_func)
+        if name in self.names:
+            raise ValueError('Two measures are named {}, so give them '
+                             'distinct names'.format(name))
+        self.measure_funcs.append(measure_func)
+        self.names.append(name)
+
+    @property
+    def _cache_keys(self):
+        return ['{}:{}'.format(name, get_code_hash(f))
+                for name, f in zip(self.names, self.measure_funcs)]
+
+    def _get_snapshot_results(self, key, fname, cache, cache_keys):
+        """Return the measures for a snapshot, and whether any had to be
+        computed."""
+        results = cache.get(key, {})
+        if all(k in results for k in cache_keys + ['time']):
+            return results, False
+        m = filename_to_model(fname)
+        results['time'] = self.time_func(m)
+        for k, f in zip(cache_keys, self.measure_funcs):
+            if k not in results:
+                results[k] = f(m)
+        cache[key] = results
+        return results, True
+
+    def run(self, dirname):
+        """Evaluate the measures for every snapshot in an output directory.
+
+        Parameters
+        ----------
+        dirname: str
+            A model output directory path.
+
+        Returns
+        -------
+        ts: numpy.ndarray[dtype=float]
+            Times.
+        measures: dict[str, tuple(numpy.ndarray, numpy.ndarray)]
+            For each measure function name, the measures and their
+            uncertainties at each time.
+        """
+        cache = _load_cache(dirname) if self.cache_flag else {}
+        keys = [(basename(fname), getmtime(fname))
+                for fname in get_filenames(dirname)]
+        dirty = bool(set(cache) - set(keys))
+        cache = dict((k, cache[k]) for k in keys if k in cache)
+
+        ts = []
+        measures = dict((name, ([], [])) for name in self.names)
+        cache_keys = self._cache_keys
+        for key in keys:
+            results, computed = self._get_snapshot_results(
+                key, join(dirname, key[0]), cache, cache_keys)
+            dirty = dirty or computed
+            ts.append(results['time'])
+            for name, cache_key in zip(self.names, cache_keys):
+                meas, meas_err = results[cache_key]
+                measures[name][0].append(meas)
+                measures[name][1].append(meas_err)
+
+        if self.cache_flag and dirty:
+            _store_cache(dirname, cache)
+        measures = dict((name, (np.array(meases), np.array(meas_errs)))
+                        for name, (meases, meas_errs) in measures.items())
+        return np.array(ts), measures
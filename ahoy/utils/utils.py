@@ -2,7 +2,8 @@ from __future__ import print_function, division
 import numpy as np
 from scipy.stats import sem
 from agaro.output_utils import get_recent_model
-from agaro.measure_utils import measures, t_measures, params
+from agaro.measure_utils import measures, params
+from ahoy.utils.pipeline import MeasurePipeline
 
 
 def seg_intersect(p1, p2, yi):
@@ -130,6 +131,36 @@ def get_time(m):
 # Time dependence
 
 
+def t_measures_multi(dirname, measure_funcs):
+    """Calculate several measures over time for a model output directory,
+    loading each snapshot at most once, and only if its measures are not
+    already cached.
+
+    Parameters
+    ----------
+    dirname: str
+        A model output directory path
+    measure_funcs: list[function or tuple(str, function)]
+        Measure getters, such as :func:`get_ud_vector`, optionally paired
+        with names. See :class:`MeasurePipeline`.
+
+    Returns
+    -------
+    ts: numpy.ndarray[dtype=float]
+        Times.
+    measures: dict[str, tuple(numpy.ndarray, numpy.ndarray)]
+        For each measure getter name, the measures and their uncertainties
+        at each time.
+    """
+    return MeasurePipeline(measure_funcs, get_time).run(dirname)
+
+
+def _t_measures(dirname, measure_func):
+    ts, measures = t_measures_multi(dirname, [measure_func])
+    meases, meas_errs = measures[measure_func.__name__]
+    return ts, meases, meas_errs
+
+
 def t_uds_vector(dirname):
     """Calculate the particle drift speed over time along each axis
     for a model output directory.
@@ -146,7 +177,7 @@ def t_uds_vector(dirname):
     uds: numpy.ndarray[dtype=float]
          Drift speeds, normalised by the swimmer speed.
     """
-    return t_measures(dirname, get_time, get_ud_vector)
+    return _t_measures(dirname, get_ud_vector)
 
 
 def t_uds_scalar(dirname):
@@ -165,7 +196,7 @@ def t_uds_scalar(dirname):
     uds: numpy.ndarray[dtype=float]
          Particle drift speeds.
     """
-    return t_measures(dirname, get_time, get_ud_scalar)
+    return _t_measures(dirname, get_ud_scalar)
 
 
 def t_uds_abs(dirname):
@@ -184,7 +215,7 @@ def t_uds_abs(dirname):
     uds_abs: numpy.ndarray[dtype=float]
          Particle absolute drift speeds.
     """
-    return t_measures(dirname, get_time, get_ud_abs)
+    return _t_measures(dirname, get_ud_abs)
 
 
 def t_Ds_scalar(dirname):
@@ -203,7 +234,7 @@ def t_Ds_scalar(dirname):
     Ds: numpy.ndarray[dtype=float]
          Particle diffusion constants.
     """
-    return t_measures(dirname, get_time, get_D_scalar)
+    return _t_measures(dirname, get_D_scalar)
 
 
 def t_Ds_vector(dirname):
@@ -222,7 +253,7 @@ def t_Ds_vector(dirname):
     Ds: numpy.ndarray[dtype=float]
          Particle diffusion constants.
     """
-    return t_measures(dirname, get_time, get_D_vector)
+    return _t_measures(dirname, get_D_vector)
 
 
 def t_rs_scalar(dirname):
@@ -241,7 +272,7 @@ def t_rs_scalar(dirname):
     rs: numpy.ndarray[dtype=float]
          Particle displacements
     """
-    return t_measures(dirname, get_time, get_r_scalar)
+    return _t_measures(dirname, get_r_scalar)
 
 
 def t_rs_vector(dirname):
@@ -260,7 +291,7 @@ def t_rs_vector(dirname):
     rs: numpy.ndarray[dtype=float]
          Particle displacements
     """
-    return t_measures(dirname, get_time, get_r_vector)
+    return _t_measures(dirname, get_r_vector)
 
 
 def t_rs_abs(dirname):
@@ -279,7 +310,7 @@ def t_rs_abs(dirname):
     rs: numpy.ndarray[dtype=float]
          Particle absolute displacements
     """
-    return t_measures(dirname, get_time, get_r_abs)
+    return _t_measures(dirname, get_r_abs)
 
 
 def t_u_nets_scalar(dirname):
@@ -298,7 +329,7 @@ def t_u_nets_scalar(dirname):
     v_nets: numpy.ndarray[dtype=float]
          Centre-of-mass particle speeds.
     """
-    return t_measures(dirname, get_time, get_u_net_scalar)
+    return _t_measures(dirname, get_u_net_scalar)
 
 
 def t_u_nets_vector(dirname):
@@ -317,7 +348,7 @@ def t_u_nets_vector(dirname):
     v_nets: numpy.ndarray[dtype=float]
          Centre-of-mass particle velocities.
     """
-    return t_measures(dirname, get_time, get_u_net_vector)
+    return _t_measures(dirname, get_u_net_vector)
 
 
 # Parameter to measure relations
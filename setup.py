@@ -43,7 +43,9 @@ test_requirements = [
 
 extensions = cythonize([
     Extension("ahoy.numerics", ["ahoy/numerics.pyx"],
-              include_dirs=[numpy.get_include()]),
+              include_dirs=[numpy.get_include()],
+              extra_compile_args=['-fopenmp'],
+              extra_link_args=['-fopenmp']),
 ])
 
 console_scripts = [
@@ -0,0 +1,72 @@
+from __future__ import print_function, division
+import numpy as np
+from scipy.stats import sem
+from ahoy.model import Model
+from ahoy.accumulators import Welford, OnlineMeasurer, get_log_lags
+import test
+
+
+class TestWelford(test.TestBase):
+
+    def test_batches(self):
+        xs = self.rng.normal(size=(100, 3))
+        acc = Welford((3,))
+        for xs_b in np.split(xs, [10, 11, 60]):
+            acc.add(xs_b)
+        self.assertEqual(acc.count, 100)
+        self.assertTrue(np.allclose(acc.mean, np.mean(xs, axis=0)))
+        self.assertTrue(np.allclose(acc.var, np.var(xs, axis=0, ddof=1)))
+        self.assertTrue(np.allclose(acc.sem, sem(xs, axis=0)))
+
+
+class TestOnlineMeasurer(test.TestBase):
+
+    def setUp(self):
+        super(TestOnlineMeasurer, self).setUp()
+        self.m = Model(seed=1, dt=0.01, dim=2, n=50, spatial_flag=True,
+                       periodic_flag=True, v_0=1.0, L=np.array([2.0, 2.0]),
+                       tumble_flag=True, p_0=1.0)
+
+    def test_snapshot_measures(self):
+        measurer = OnlineMeasurer(every=5, sample_every=5)
+        self.m.observers.append(measurer)
+        for _ in range(20):
+            self.m.iterate()
+        res = measurer.get_results()
+        self.assertEqual(len(res['t']), 4)
+        ps = self.m.ships.agents.positions
+        self.assertTrue(np.allclose(res['dr'][-1], np.mean(ps.dr, axis=0)))
+        self.assertTrue(np.allclose(res['dr_mag_err'][-1], sem(ps.dr_mag)))
+        self.assertTrue(np.allclose(res['u'][-1],
+                                    np.mean(self.m.ships.agents.directions.u,
+                                            axis=0)))
+
+    def test_msd(self):
+        lags = get_log_lags(10, 5)
+        self.assertEqual(lags[0], 1)
+        self.assertEqual(lags[-1], 10)
+        measurer = OnlineMeasurer(every=10, lags=lags)
+        self.m.observers.append(measurer)
+        drs = []
+        for _ in range(30):
+            self.m.iterate()
+            drs.append(self.m.ships.agents.positions.dr.copy())
+        msds, msd_errs = measurer.msd
+        drs = np.array(drs)
+        i_lag = list(lags).index(10)
+        # Origins at iterations 0, 10 and 20, so lag-10 displacements end at
+        # iterations 10, 20 and 30.
+        drs = np.concatenate([np.zeros_like(drs[:1]), drs])
+        sds = np.sum(np.square(drs[[10, 20, 30]] - drs[[0, 10, 20]]), axis=-1)
+        self.assertTrue(np.allclose(msds[i_lag], np.mean(sds)))
+        self.assertTrue(np.all(np.diff(msds) > 0.0))
+
+        # Observing the initial state gives the same origins.
+        m = Model(seed=1, dt=0.01, dim=2, n=50, spatial_flag=True,
+                  periodic_flag=True, v_0=1.0, L=np.array([2.0, 2.0]),
+                  tumble_flag=True, p_0=1.0)
+        measurer_0 = OnlineMeasurer(every=10, lags=lags)
+        m.add_observer(measurer_0)
+        for _ in range(30):
+            m.iterate()
+        self.assertTrue(np.allclose(measurer_0.msd[0], msds))
@@ -1,5 +1,6 @@
 from __future__ import print_function, division
 import numpy as np
+from spatious import vector
 from ahoy import directions
 import test
 
@@ -27,6 +28,14 @@ class TestDirections1D(test.TestBase):
         ds = directions.directions_nd(u)
         self.assertTrue(np.allclose(ds.u, u))
 
+    def test_get_u_out(self):
+        ds = directions.directions_factory(self.n, self.dim,
+                                           aligned_flag=False, rng=self.rng)
+        out = np.empty([ds.n, ds.dim])
+        u = ds.get_u(out=out)
+        self.assertTrue(u is out)
+        self.assertTrue(np.allclose(out, ds.u))
+
     def test_tumble_identity(self):
         ds = directions.directions_factory(self.n, self.dim,
                                            aligned_flag=False, rng=self.rng)
@@ -69,6 +78,19 @@ class TestDirections2D(TestDirections1D):
         ds.tumble(tumblers, rng=self.rng)
         self.assertFalse(np.any(np.isclose(ds.u_0, ds.u)))
 
+    def test_u_cache(self):
+        ds = directions.directions_factory(self.n, self.dim,
+                                           aligned_flag=False, rng=self.rng)
+        ds.u
+        tumblers = np.zeros([ds.n], dtype=np.bool)
+        tumblers[0] = True
+        ds.tumble(tumblers, rng=self.rng)
+        self.assertTrue(np.allclose(ds.u, ds._th_to_u(ds.th)))
+        ds.set_th(np.array([1]), np.array([0.3]))
+        self.assertTrue(np.allclose(ds.u[1], [np.cos(0.3), np.sin(0.3)]))
+        ds.rotate(self.rng.uniform(-np.pi, np.pi, size=ds.n))
+        self.assertTrue(np.allclose(ds.u, ds._th_to_u(ds.th)))
+
     def test_rotate_identity(self):
         ds = directions.directions_factory(self.n, self.dim,
                                            aligned_flag=False, rng=self.rng)
@@ -112,6 +134,52 @@ class TestDirections2D(TestDirections1D):
         self.assertTrue(np.allclose(mags_0, mags_rot))
 
 
+class TestDirections3D(TestDirections1D):
+    dim = 3
+
+    def test_tumble_coverage(self):
+        ds = directions.directions_factory(self.n, self.dim,
+                                           aligned_flag=False, rng=self.rng)
+        tumblers = np.ones([ds.n], dtype=np.bool)
+        ds.tumble(tumblers, rng=self.rng)
+        self.assertFalse(np.any(np.isclose(ds.u_0, ds.u)))
+
+    def test_tumble_seeding(self):
+        ds = directions.directions_factory(self.n, self.dim,
+                                           aligned_flag=True)
+        tumblers = np.ones([ds.n], dtype=np.bool)
+        ds.tumble(tumblers, rng=np.random.RandomState(1))
+        u_expected = vector.sphere_pick(n=self.n, d=self.dim,
+                                        rng=np.random.RandomState(1))
+        self.assertTrue(np.array_equal(ds.u, u_expected))
+
+    def test_rotate_right_angle(self):
+        u_0 = np.zeros([self.n, self.dim])
+        u_0[:, 0] = 1.0
+        dth = np.zeros([self.n, self.dim])
+        dth[:, 2] = np.pi / 2.0
+        ds = directions.directions_nd(u_0)
+        ds.rotate(dth)
+        u_rot_expected = np.zeros([self.n, self.dim])
+        u_rot_expected[:, 1] = 1.0
+        self.assertTrue(np.allclose(ds.u, u_rot_expected))
+
+    def test_rotate_idempotence(self):
+        ds = directions.directions_factory(self.n, self.dim,
+                                           aligned_flag=False, rng=self.rng)
+        dth = self.rng.normal(size=(self.n, self.dim))
+        ds.rotate(dth)
+        self.assertFalse(np.allclose(ds.u_0, ds.u))
+        ds.rotate(-dth)
+        self.assertTrue(np.allclose(ds.u_0, ds.u))
+
+    def test_rotate_about_self(self):
+        ds = directions.directions_factory(self.n, self.dim,
+                                           aligned_flag=False, rng=self.rng)
+        ds.rotate(2.0 * ds.u)
+        self.assertTrue(np.allclose(ds.u_0, ds.u))
+
+
 class TestDirectionsFactories(test.TestBase):
 
     def test_uniform_directions_isotropy(self):
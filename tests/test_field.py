@@ -1,9 +1,13 @@
 from __future__ import print_function, division
 from itertools import product
+import pickle
 import numpy as np
 from scipy.stats import multivariate_normal
-from ahoy import positions, fields
-from ahoy.mesh import uniform_mesh_factory
+import fipy
+from ahoy import positions, fields, interpolation, obstructors
+from ahoy.utils.benchmarks import field_every_convergence
+from ahoy.mesh import (uniform_mesh_factory, UniformCellLocator,
+                       TreeCellLocator)
 import test
 
 
@@ -38,6 +42,27 @@ class TestField1D(test.TestBase):
         cids_manual = get_nearest_cell_ids_manual(f, ps)
         self.assertTrue(np.allclose(cids, cids_manual))
 
+    def test_cell_locators(self):
+        mesh = uniform_mesh_factory(self.L, self.dx)
+        # Include points outside the mesh.
+        rs = 1.2 * positions.get_uniform_points(100, self.L, rng=self.rng).T
+        cids_fipy = mesh._getNearestCellID(rs)
+        for locator in (UniformCellLocator(mesh), TreeCellLocator(mesh)):
+            self.assertTrue(np.all(locator.get_nearest_cell_ids(rs) ==
+                                   cids_fipy))
+
+    def test_cell_ids_memo(self):
+        mesh = uniform_mesh_factory(self.L, self.dx)
+        f = fields.Field(mesh, c_0=1.0)
+        rs = positions.get_uniform_points(10, self.L, rng=self.rng)
+        ps = positions.PeriodicPositions(self.L, rs)
+        cids = f.get_nearest_cell_ids(ps)
+        self.assertTrue(f.get_nearest_cell_ids(ps) is cids)
+        ps.displace(np.full(rs.shape, 0.5 * self.L))
+        cids_moved = f.get_nearest_cell_ids(ps)
+        self.assertTrue(np.all(cids_moved == get_nearest_cell_ids_manual(f,
+                                                                         ps)))
+
 
 class TestField2D(TestField1D):
     L = np.array([1.0, 2.0])
@@ -47,6 +72,239 @@ class TestField2D(TestField1D):
     rs_special = np.array(list(product(x_vals, y_vals)))
 
 
+class TestInterpolation(test.TestBase):
+    L = np.array([1.0, 2.0])
+    dx = 0.1
+
+    def check_linear(self, mesh, interpolator_class):
+        f = fields.Field(mesh, c_0=0.0, interp_flag=True)
+        self.assertTrue(isinstance(f.interpolator, interpolator_class))
+        grad = np.array([0.3, -1.2])
+        f.c.setValue(np.dot(grad, mesh.cellCenters.value))
+
+        # Stay inside the outermost cell centres.
+        rs = 0.8 * positions.get_uniform_points(50, self.L, rng=self.rng)
+        ps = positions.PeriodicPositions(self.L, rs)
+        self.assertTrue(np.allclose(f.get_val_i(ps), np.dot(rs, grad)))
+        grad_cs = f.get_grad_i(ps)
+        self.assertEqual(grad_cs.shape, rs.shape)
+
+    def test_uniform(self):
+        mesh = uniform_mesh_factory(self.L, self.dx)
+        self.check_linear(mesh, interpolation.UniformInterpolator)
+
+    def test_triangulation(self):
+        dxs = self.rng.uniform(0.5, 1.5, size=10)
+        dys = self.rng.uniform(0.5, 1.5, size=20)
+        dxs *= self.L[0] / dxs.sum()
+        dys *= self.L[1] / dys.sum()
+        mesh = (fipy.Grid2D(dx=dxs, dy=dys) -
+                ((self.L[0] / 2.0,), (self.L[1] / 2.0,)))
+        self.check_linear(mesh, interpolation.TriangulationInterpolator)
+
+    def test_uniform_edges(self):
+        mesh = uniform_mesh_factory(self.L, self.dx)
+        interpolator = interpolation.UniformInterpolator(mesh)
+        rs = np.array([[-0.5, 0.5, 0.0], [-1.0, 1.0, 0.0]])
+        cids, weights = interpolator.get_stencils(rs)
+        self.assertTrue(np.allclose(weights.sum(axis=-1), 1.0))
+        self.assertTrue(np.all(cids >= 0))
+        self.assertTrue(np.all(cids < mesh.numberOfCells))
+
+
+class TestGradCache(test.TestBase):
+    L = np.array([1.0, 2.0])
+    dx = 0.1
+
+    def test_grad_cache(self):
+        mesh = uniform_mesh_factory(self.L, self.dx)
+        f = fields.FoodField(mesh, D=1.0, delta=1.0, c_0=1.0)
+        rs = positions.get_uniform_points(10, self.L, rng=self.rng)
+        ps = positions.PeriodicPositions(self.L, rs)
+        self.assertTrue(f._grad_c is None)
+        f.iterate(ps, dt=0.01)
+        self.assertTrue(f._grad_c is None)
+        grad_c = f.grad_c
+        self.assertTrue(np.allclose(grad_c, f.c.grad.value))
+        self.assertTrue(f.grad_c is grad_c)
+        f.iterate(ps, dt=0.01)
+        self.assertTrue(np.allclose(f.grad_c, f.c.grad.value))
+        self.assertFalse(np.allclose(f.grad_c, grad_c))
+
+
+class TestFieldResume(test.TestBase):
+    L = np.array([1.0, 2.0])
+    dx = 0.1
+
+    def test_old_snapshot(self):
+        mesh = uniform_mesh_factory(self.L, self.dx)
+        rs = positions.get_uniform_points(10, self.L, rng=self.rng)
+        ps = positions.PeriodicPositions(self.L, rs)
+        f = fields.FoodField(mesh, D=1.0, delta=1.0, c_0=1.0)
+        state = pickle.loads(pickle.dumps(f)).__dict__
+        for k in ('interp_flag', 'every', '_rho_sum', '_i_sub', '_grad_c',
+                  'cell_locator', '_cids_rs', '_cids', '_stencils_rs',
+                  '_stencils'):
+            del state[k]
+        f_old = fields.FoodField.__new__(fields.FoodField)
+        f_old.__setstate__(state)
+        self.assertTrue(np.allclose(f_old.get_val_i(ps), f.get_val_i(ps)))
+        self.assertTrue(np.allclose(f_old.get_grad_i(ps), f.get_grad_i(ps)))
+        f_old.iterate(ps, dt=0.01)
+        self.assertEqual(f_old._i_sub, 0)
+
+
+class TestSparseFoodField(test.TestBase):
+    L = np.array([1.0, 2.0])
+    dx = 0.1
+
+    def test_matches_fipy(self):
+        mesh = uniform_mesh_factory(self.L, self.dx)
+        rs = positions.get_uniform_points(50, self.L, rng=self.rng)
+        ps = positions.PeriodicPositions(self.L, rs)
+        f_fipy = fields.FoodField(mesh, D=1.0, delta=2.0, c_0=1.0)
+        f_sparse = fields.SparseFoodField(mesh, D=1.0, delta=2.0, c_0=1.0)
+        for _ in range(5):
+            f_fipy.iterate(ps, dt=0.01)
+            f_sparse.iterate(ps, dt=0.01)
+            ps.displace(self.rng.normal(scale=0.05, size=rs.shape))
+        self.assertTrue(np.allclose(f_sparse.c.value, f_fipy.c.value))
+
+        f_sparse = pickle.loads(pickle.dumps(f_sparse))
+        f_fipy.iterate(ps, dt=0.02)
+        f_sparse.iterate(ps, dt=0.02)
+        self.assertTrue(np.allclose(f_sparse.c.value, f_fipy.c.value))
+
+    def test_lu_precond(self):
+        mesh = uniform_mesh_factory(self.L, self.dx)
+        rs = positions.get_uniform_points(50, self.L, rng=self.rng)
+        ps = positions.PeriodicPositions(self.L, rs)
+        f_jacobi = fields.SparseFoodField(mesh, D=1.0, delta=2.0, c_0=1.0)
+        f_lu = fields.SparseFoodField(mesh, D=1.0, delta=2.0, c_0=1.0,
+                                      precond='lu')
+        for _ in range(3):
+            f_jacobi.iterate(ps, dt=0.01)
+            f_lu.iterate(ps, dt=0.01)
+        lu = f_lu._lu
+        f_lu.iterate(ps, dt=0.01)
+        self.assertTrue(f_lu._lu is lu)
+        f_jacobi.iterate(ps, dt=0.01)
+        self.assertTrue(np.allclose(f_lu.c.value, f_jacobi.c.value))
+
+        f_lu = pickle.loads(pickle.dumps(f_lu))
+        self.assertFalse(hasattr(f_lu, '_lu'))
+        f_lu.iterate(ps, dt=0.01)
+        f_jacobi.iterate(ps, dt=0.01)
+        self.assertTrue(np.allclose(f_lu.c.value, f_jacobi.c.value))
+        with self.assertRaises(NotImplementedError):
+            fields.SparseFoodField(mesh, D=1.0, delta=2.0, c_0=1.0,
+                                   precond='ilu')
+
+    def test_factory_precond(self):
+        obstructor = obstructors.NoneObstructor()
+
+        def get_field(c_precond):
+            return fields.food_field_factory(True, self.L, self.dx, 1.0, 2.0,
+                                             1.0, obstructor,
+                                             c_solver='sparse',
+                                             c_precond=c_precond)
+        self.assertEqual(get_field(None).precond, 'jacobi')
+        self.assertEqual(get_field('lu').precond, 'lu')
+
+
+class TestSpectralFoodField(test.TestBase):
+    L = np.array([1.0, 2.0])
+    dx = 0.1
+
+    def check_mode_decay(self, mesh, th):
+        f = fields.SpectralFoodField(mesh, D=1.5, delta=0.0, c_0=0.0)
+        # Lowest mode along x, whose decay rate is known.
+        i_x = np.arange(mesh.numberOfCells) % mesh.nx
+        c = np.cos(th * (i_x + 0.5))
+        f.c.setValue(c)
+        lam = (2.0 - 2.0 * np.cos(th)) / mesh.dx ** 2
+        ps = positions.PeriodicPositions(self.L, np.zeros([1, 2]))
+        for _ in range(10):
+            f.iterate(ps, dt=0.001)
+        # With no consumption, the particle has no effect.
+        self.assertTrue(np.allclose(f.c.value,
+                                    c * np.exp(-1.5 * lam * 0.01)))
+
+    def test_mode_decay_no_flux(self):
+        mesh = uniform_mesh_factory(self.L, self.dx)
+        self.assertFalse(fields.SpectralFoodField(mesh, 1.0, 1.0,
+                                                  1.0).periodic_flag)
+        self.check_mode_decay(mesh, np.pi / mesh.nx)
+
+    def test_mode_decay_periodic(self):
+        mesh = fipy.PeriodicGrid2D(dx=self.dx, dy=self.dx, nx=10, ny=20)
+        self.assertTrue(fields.SpectralFoodField(mesh, 1.0, 1.0,
+                                                 1.0).periodic_flag)
+        self.check_mode_decay(mesh, 2.0 * np.pi / mesh.nx)
+
+    def test_uniform_density(self):
+        mesh = uniform_mesh_factory(self.L, self.dx)
+        # One particle in each cell.
+        ps = positions.PeriodicPositions(self.L, mesh.cellCenters.value.T)
+        rho = 1.0 / mesh.cellVolumes[0]
+        D, dt, n_steps = 1.5, 0.05, 4
+        # Strong consumption over a step, where an implicit solver is far off.
+        delta = 1.25 / (rho * dt)
+        f = fields.SpectralFoodField(mesh, D=D, delta=delta, c_0=1.0)
+        # Lowest mode along x on top of a uniform field.
+        th = np.pi / mesh.nx
+        i_x = np.arange(mesh.numberOfCells) % mesh.nx
+        mode = np.cos(th * (i_x + 0.5))
+        f.c.setValue(1.0 + 0.5 * mode)
+        lam = (2.0 - 2.0 * np.cos(th)) / mesh.dx ** 2
+        for _ in range(n_steps):
+            f.iterate(ps, dt=dt)
+        t = n_steps * dt
+        c = (np.exp(-delta * rho * t) +
+             0.5 * mode * np.exp(-(D * lam + delta * rho) * t))
+        self.assertTrue(np.allclose(f.c.value, c))
+
+    def test_matches_sparse(self):
+        mesh = uniform_mesh_factory(self.L, self.dx)
+        rs = positions.get_uniform_points(20, self.L, rng=self.rng)
+        ps = positions.PeriodicPositions(self.L, rs)
+        f_sparse = fields.SparseFoodField(mesh, D=1.0, delta=0.01, c_0=1.0)
+        f_spectral = fields.SpectralFoodField(mesh, D=1.0, delta=0.01,
+                                              c_0=1.0)
+        for _ in range(100):
+            f_sparse.iterate(ps, dt=1e-4)
+            f_spectral.iterate(ps, dt=1e-4)
+        self.assertTrue(np.allclose(f_spectral.c.value, f_sparse.c.value,
+                                    atol=1e-4))
+
+
+class TestFieldEvery(test.TestBase):
+
+    def test_convergence(self):
+        everys = (1, 2, 4, 8)
+        errs = field_every_convergence(everys, dx=0.1, n=200, n_steps=64)
+        self.assertEqual(errs[0], 0.0)
+        self.assertTrue(np.all(np.diff(errs) > 0.0))
+        # Error should shrink as the solve interval is halved, roughly in
+        # proportion to the interval, and at most by a factor of four.
+        self.assertTrue(np.all(errs[2:] / errs[1:-1] < 4.0))
+
+    def test_every_field_rho(self):
+        L = np.array([1.0, 2.0])
+        mesh = uniform_mesh_factory(L, 0.1)
+        rs = positions.get_uniform_points(20, L, rng=self.rng)
+        ps = positions.PeriodicPositions(L, rs)
+        f = fields.FoodField(mesh, D=1.0, delta=1.0, c_0=1.0, every=3)
+        rho_arrays = []
+        for _ in range(3):
+            self.assertTrue(np.all(f.c.value == 1.0))
+            rho_arrays.append(f._get_rho_array(ps))
+            f.iterate(ps, dt=0.01)
+            ps.displace(self.rng.normal(scale=0.1, size=rs.shape))
+        self.assertTrue(np.allclose(f.rho.value, np.mean(rho_arrays, axis=0)))
+        self.assertTrue(np.all(f.c.value < 1.0))
+
+
 class TestFoodField1D(test.TestBase):
     L = np.array([4.0])
     dx = 0.005
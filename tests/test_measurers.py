@@ -1,6 +1,7 @@
 from __future__ import print_function, division
 import numpy as np
 from ahoy import stime, directions, c_measurers, dc_dx_measurers
+from ahoy.ring_buffer import ExpPolyFilter
 import test
 
 
@@ -63,6 +64,7 @@ class MockPositions(object):
 
 
 class TestLinearTemporalDcDxMeasurer(TestLinearSpatialDcDxMeasurer):
+    mem_recursive_flag = False
 
     def setUp(self):
         super(TestLinearTemporalDcDxMeasurer, self).setUp()
@@ -71,19 +73,47 @@ class TestLinearTemporalDcDxMeasurer(TestLinearSpatialDcDxMeasurer):
         self.dt_mem = 0.05
         self.t_mem = 5.0
         self.t_rot_0 = 1.0
+        self.t_run = 2.0 * self.t_mem
 
     def run_nd(self, dim, u_0, dc_dxs_expected):
         time = stime.Time()
         ps = MockPositions(dim, self.n, self.v_0, u_0)
         c_measurer = c_measurers.LinearCMeasurer(ps)
-        dc_dx_measurer = dc_dx_measurers.TemporalDcDxMeasurer(c_measurer,
-                                                              self.v_0,
-                                                              self.dt_mem,
-                                                              self.t_mem,
-                                                              self.t_rot_0,
-                                                              time)
-        while time.t < 2.0 * self.t_mem:
+        dc_dx_measurer = dc_dx_measurers.TemporalDcDxMeasurer(
+            c_measurer, self.v_0, self.dt_mem, self.t_mem, self.t_rot_0,
+            time, self.mem_recursive_flag)
+        while time.t < self.t_run:
             ps.iterate(self.dt)
             dc_dxs = dc_dx_measurer.get_dc_dxs()
             time.iterate(self.dt)
         self.assertTrue(np.allclose(dc_dxs, dc_dxs_expected))
+
+
+class TestLinearRecursiveTemporalDcDxMeasurer(TestLinearTemporalDcDxMeasurer):
+    mem_recursive_flag = True
+
+    def setUp(self):
+        super(TestLinearRecursiveTemporalDcDxMeasurer, self).setUp()
+        # Memory is not truncated, so the initial history only decays away.
+        self.t_run = 25.0 * self.t_rot_0
+
+
+class TestRecursiveKernel(test.TestBase):
+
+    def test_filter_matches_convolution(self):
+        dt, t_rot_0 = 0.05, 1.0
+        decay, coeffs = dc_dx_measurers.get_K_recursive(dt, t_rot_0)
+        n_t = 2000
+        ps = np.arange(n_t)
+        K_dt = decay ** ps * (coeffs[0] + coeffs[1] * ps +
+                              coeffs[2] * ps ** 2)
+        self.assertTrue(np.isclose(np.sum(K_dt), 0.0))
+        self.assertTrue(np.isclose(np.sum(K_dt * -ps * dt), 1.0))
+
+        cs = self.rng.normal(size=(n_t, 3))
+        c_mem = ExpPolyFilter(3, decay)
+        for c in cs:
+            c_mem.update(c)
+        b_direct = np.dot(K_dt, cs[::-1])
+        self.assertTrue(np.allclose(c_mem.integral_transform(coeffs),
+                                    b_direct))
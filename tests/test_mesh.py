@@ -1,3 +1,8 @@
+import hashlib
+import pickle
+import shutil
+import tempfile
+from os.path import join
 import numpy as np
 from ahoy import mesh
 import test
@@ -38,11 +43,53 @@ class TestPorousMesh(test.TestBase):
             [0.88, 0.0],
         ])
 
-        np.random.seed(2)
-        mesh_1 = mesh.porous_mesh_factory(rs, R, dx, L)
+        # Mesh afresh each time, rather than fetching the cached mesh.
+        cache_dir_orig = mesh.cache_dir
+        mesh.cache_dir = None
+        try:
+            np.random.seed(2)
+            mesh._mesh_cache.clear()
+            mesh_1 = mesh.porous_mesh_factory(rs, R, dx, L)
 
-        np.random.seed(3)
-        mesh_2 = mesh.porous_mesh_factory(rs, R, dx, L)
+            np.random.seed(3)
+            mesh._mesh_cache.clear()
+            mesh_2 = mesh.porous_mesh_factory(rs, R, dx, L)
+        finally:
+            mesh.cache_dir = cache_dir_orig
+            mesh._mesh_cache.clear()
 
+        self.assertFalse(mesh_1 is mesh_2)
         self.assertTrue(np.allclose(mesh_1.cellCenters.value,
                                     mesh_2.cellCenters.value))
+
+
+class TestPorousMeshCache(test.TestBase):
+    L = np.array([2.0, 2.0])
+    R = 0.1
+    dx = 0.1
+    rs = np.array([[-0.5, 0.5], [0.88, 0.0]])
+
+    def setUp(self):
+        super(TestPorousMeshCache, self).setUp()
+        self.cache_dir_orig = mesh.cache_dir
+        mesh.cache_dir = tempfile.mkdtemp()
+        mesh._mesh_cache.clear()
+
+    def tearDown(self):
+        shutil.rmtree(mesh.cache_dir)
+        mesh.cache_dir = self.cache_dir_orig
+        mesh._mesh_cache.clear()
+
+    def test_disk_cache(self):
+        """Check a mesh in the disk cache is used instead of meshing."""
+        geo = mesh._porous_mesh_geo_factory(self.rs, self.R, self.dx, self.L)
+        key = hashlib.sha1(geo.encode('utf-8')).hexdigest()
+        msh_cached = mesh.uniform_mesh_factory(self.L, self.dx)
+        with open(join(mesh.cache_dir, '{}.pkl'.format(key)), 'wb') as f:
+            pickle.dump(msh_cached, f)
+
+        msh_1 = mesh.porous_mesh_factory(self.rs, self.R, self.dx, self.L)
+        self.assertTrue(np.allclose(msh_1.cellCenters.value,
+                                    msh_cached.cellCenters.value))
+        msh_2 = mesh.porous_mesh_factory(self.rs, self.R, self.dx, self.L)
+        self.assertTrue(msh_1 is msh_2)
@@ -1,5 +1,8 @@
+import pickle
 import numpy as np
-from ahoy.model import Model
+from ahoy.model import Model, EnsembleModel
+from ahoy.utils import utils
+from ahoy import streams, obstructors, turners
 import test
 
 
@@ -185,3 +188,289 @@ class TestModel(test.TestBase):
         self.assertTrue(model.ships.agents.positions.dim, 1)
         self.assertTrue(model.ships.agents.directions.dim, 1)
         self.assertTrue(model.ships.dim, 1)
+
+    def test_fused_model(self):
+        model_kwargs = {
+            'seed': 1,
+            'dt': 0.01,
+
+            'dim': 2,
+            'n': 100,
+            'aligned_flag': False,
+
+            'spatial_flag': True,
+            'periodic_flag': True,
+            'v_0': 1.5,
+            'L': np.array([2.0, 2.2]),
+            'origin_flags': np.array([False, False]),
+
+            'tumble_flag': True,
+            'p_0': 1.3,
+
+            'rotation_flag': True,
+            'Dr_0': 1.3,
+
+            'pore_flag': True,
+            'pore_turner': 'reflect',
+            'pore_R': 0.2,
+            'pore_pf': 0.2,
+        }
+
+        num_iterations = 30
+
+        def get_model(fused_flag):
+            model = Model(fused_flag=fused_flag, **model_kwargs)
+            for _ in range(num_iterations):
+                model.iterate()
+            return model
+
+        model_1 = get_model(False)
+        model_2 = get_model(True)
+
+        self.assertTrue(np.allclose(model_1.ships.agents.positions.r,
+                                    model_2.ships.agents.positions.r))
+        self.assertTrue(np.allclose(model_1.ships.agents.directions.u,
+                                    model_2.ships.agents.directions.u))
+
+    def test_streams_model_threads(self):
+        model_kwargs = {
+            'seed': 1,
+            'dt': 0.01,
+            'dim': 2,
+            'n': 200,
+            'spatial_flag': True,
+            'periodic_flag': True,
+            'v_0': 1.5,
+            'L': np.array([2.0, 2.2]),
+            'tumble_flag': True,
+            'p_0': 1.3,
+            'rotation_flag': True,
+            'Dr_0': 1.3,
+            'streams_flag': True,
+        }
+
+        def get_model(n_threads):
+            model = Model(**model_kwargs)
+            model.streams = streams.ParticleStreams(model.seed,
+                                                    model.ships.agents.n,
+                                                    block_size=16,
+                                                    n_threads=n_threads)
+            for _ in range(50):
+                model.iterate()
+            return model
+
+        model_1 = get_model(1)
+        model_2 = get_model(4)
+        self.assertTrue(np.array_equal(model_1.ships.agents.positions.r,
+                                       model_2.ships.agents.positions.r))
+        self.assertTrue(np.array_equal(model_1.ships.agents.directions.th,
+                                       model_2.ships.agents.directions.th))
+        self.assertIn('rng=philox', model_1.get_output_dirname())
+
+    def test_ensemble_model_replicas(self):
+        n_replicas = 3
+        n = 50
+        model = EnsembleModel(seed=1, dt=0.01, n_replicas=n_replicas, n=n,
+                              dim=2, spatial_flag=True, periodic_flag=True,
+                              v_0=1.5, L=np.array([2.0, 2.2]),
+                              tumble_flag=True, p_0=1.3)
+        for _ in range(20):
+            model.iterate()
+
+        self.assertEqual(model.ships.agents.n, n_replicas * n)
+        dr = model.ships.agents.positions.dr.reshape([n_replicas, n, 2])
+        for i, replica in enumerate(model.replicas):
+            ps = replica.ships.agents.positions
+            self.assertEqual(ps.n, n)
+            self.assertTrue(np.shares_memory(ps.r_w,
+                                             model.ships.agents.positions.r_w))
+            ud, ud_err = utils.get_ud_vector(replica)
+            ud_expected = (np.mean(dr[i], axis=0) / model.ships.time.t /
+                           model.ships.agents.swimmers.v_0)
+            self.assertTrue(np.allclose(ud, ud_expected))
+        self.assertFalse(np.allclose(dr[0], dr[1]))
+
+    def test_ensemble_model_replica_independence(self):
+        model_kwargs = {
+            'seed': 1, 'dt': 0.01, 'n': 50, 'dim': 2,
+            'spatial_flag': True, 'periodic_flag': True, 'v_0': 1.5,
+            'L': np.array([2.0, 2.2]), 'tumble_flag': True, 'p_0': 1.3,
+        }
+
+        def get_replica(n_replicas):
+            model = EnsembleModel(n_replicas=n_replicas, **model_kwargs)
+            for _ in range(20):
+                model.iterate()
+            return model.get_replica(1)
+
+        ps_2 = get_replica(2).ships.agents.positions
+        ps_3 = get_replica(3).ships.agents.positions
+        self.assertTrue(np.array_equal(ps_2.r_0, ps_3.r_0))
+        self.assertTrue(np.array_equal(ps_2.r, ps_3.r))
+
+    def test_ensemble_model_seed_namespaces(self):
+        n_replicas = 4
+        model = EnsembleModel(seed=1, dt=0.01, n_replicas=n_replicas, n=8,
+                              dim=2, spatial_flag=True, periodic_flag=True,
+                              v_0=1.0, L=np.array([2.0, 2.0]),
+                              tumble_flag=True, p_0=1.0)
+        stream_seed_seqs = list(model.streams.get_seed_seqs())
+        for subsystem in streams.subsystems:
+            stream_seed_seqs.extend(
+                model.streams.get_subsystem(subsystem).get_seed_seqs())
+        initial_seed_seqs = [model._get_replica_seed_seq(model.seed, i)
+                             for i in range(n_replicas)]
+        stream_keys = set(s.spawn_key for s in stream_seed_seqs)
+        initial_keys = set(s.spawn_key for s in initial_seed_seqs)
+        self.assertFalse(stream_keys & initial_keys)
+        stream_states = set(tuple(s.generate_state(4))
+                            for s in stream_seed_seqs)
+        for s in initial_seed_seqs:
+            self.assertNotIn(tuple(s.generate_state(4)), stream_states)
+
+    def test_ensemble_model_density(self):
+        with self.assertRaises(NotImplementedError):
+            EnsembleModel(seed=1, dt=0.01, n_replicas=2, n=10, rho_0=1.0,
+                          dim=2, spatial_flag=True, periodic_flag=True,
+                          v_0=1.0, L=np.array([2.0, 2.0]))
+
+    def test_resume_without_observers(self):
+        model = Model(seed=1, dt=0.01, n=10, dim=2, spatial_flag=True,
+                      periodic_flag=True, v_0=1.0, L=np.array([2.0, 2.0]))
+        del model.observers
+        model_old = pickle.loads(pickle.dumps(model))
+        model_old.iterate()
+        self.assertEqual(model_old.observers, [])
+
+    def test_pickle_without_scratch(self):
+        model = Model(seed=1, dt=0.01, n=10, dim=2, spatial_flag=True,
+                      periodic_flag=True, v_0=1.0, L=np.array([2.0, 2.0]))
+        model.iterate()
+        self.assertTrue(hasattr(model.ships.agents, '_dr'))
+        model_new = pickle.loads(pickle.dumps(model))
+        self.assertFalse(hasattr(model_new.ships.agents, '_dr'))
+        self.assertFalse(hasattr(model_new.ships.agents, '_work'))
+        model.iterate()
+        model_new.iterate()
+        self.assertTrue(np.all(model_new.ships.agents.positions.r ==
+                               model.ships.agents.positions.r))
+
+    def test_pickle_fused_without_scratch(self):
+        model = Model(seed=1, dt=0.01, n=10, dim=2, spatial_flag=True,
+                      periodic_flag=True, v_0=1.0, L=np.array([2.0, 2.0]),
+                      fused_flag=True)
+        model.iterate()
+        self.assertTrue(hasattr(model.ships.agents, '_obs'))
+        model_new = pickle.loads(pickle.dumps(model))
+        for k in ('_obs', '_th_normals', '_no_pore_args'):
+            self.assertFalse(hasattr(model_new.ships.agents, k))
+        model.iterate()
+        model_new.iterate()
+        self.assertTrue(np.all(model_new.ships.agents.positions.r ==
+                               model.ships.agents.positions.r))
+
+    def test_fused_model_other_obstructor(self):
+        def get_model(fused_flag):
+            obstructor = obstructors.SingleSphereObstructor2D(
+                turners.ReflectTurner(), R=0.5)
+            model = Model(seed=1, dt=0.01, n=20, dim=2, spatial_flag=True,
+                          periodic_flag=True, v_0=1.0,
+                          L=np.array([2.0, 2.0]), tumble_flag=True, p_0=1.0,
+                          obstructor=obstructor, fused_flag=fused_flag)
+            for _ in range(20):
+                model.iterate()
+            return model
+
+        model_1 = get_model(False)
+        model_2 = get_model(True)
+        self.assertTrue(np.all(model_1.ships.agents.positions.r ==
+                               model_2.ships.agents.positions.r))
+
+    def test_output_dirname_field_solver(self):
+        def get_dirname(c_solver):
+            model = Model(seed=1, dt=0.01, n=10, dim=2, spatial_flag=True,
+                          periodic_flag=True, v_0=1.0,
+                          L=np.array([2.0, 2.0]), c_field_flag=True,
+                          c_dx=0.2, c_D=1.0, c_delta=1.0, c_0=1.0,
+                          c_solver=c_solver)
+            return model.get_output_dirname()
+        self.assertNotIn('solver=', get_dirname(None))
+        self.assertNotIn('solver=', get_dirname('fipy'))
+        self.assertIn(',solver=sparse)', get_dirname('sparse'))
+        self.assertIn(',solver=spectral)', get_dirname('spectral'))
+
+    def test_streams_model_obstruction(self):
+        model_kwargs = {
+            'seed': 1,
+            'dt': 0.01,
+            'dim': 2,
+            'n': 100,
+            'spatial_flag': True,
+            'periodic_flag': True,
+            'v_0': 1.5,
+            'L': np.array([2.0, 2.2]),
+            'tumble_flag': True,
+            'p_0': 1.3,
+            'pore_flag': True,
+            'pore_turner': 'align',
+            'pore_R': 0.2,
+            'pore_pf': 0.2,
+            'streams_flag': True,
+        }
+
+        def get_model(fused_flag):
+            model = Model(fused_flag=fused_flag, **model_kwargs)
+            key, pos = np.random.get_state()[1:3]
+            key = key.copy()
+            for _ in range(30):
+                model.iterate()
+            # Obstruction turns draw from the streams, not numpy's state.
+            key_new, pos_new = np.random.get_state()[1:3]
+            self.assertTrue(np.array_equal(key_new, key))
+            self.assertEqual(pos_new, pos)
+            return model
+
+        model_1 = get_model(False)
+        model_2 = get_model(True)
+        self.assertTrue(np.allclose(model_1.ships.agents.positions.r,
+                                    model_2.ships.agents.positions.r))
+        self.assertTrue(np.allclose(model_1.ships.agents.directions.u,
+                                    model_2.ships.agents.directions.u))
+
+    def test_resume_temporal_old_snapshot(self):
+        model = Model(seed=1, dt=0.01, n=10, dim=2, spatial_flag=True,
+                      periodic_flag=True, v_0=1.0, L=np.array([2.0, 2.0]),
+                      tumble_flag=True, p_0=1.0, chi=0.5,
+                      tumble_chemo_flag=True, temporal_chemo_flag=True,
+                      dt_mem=0.05, t_mem=1.0)
+        for _ in range(5):
+            model.iterate()
+        dirname = model.get_output_dirname()
+        measurer = model.ships.agents.rudder_sets.sets[0].noise_measurer
+        del measurer.dc_dx_measurer.mem_recursive_flag
+        c_mem = measurer.dc_dx_measurer.c_mem
+        del c_mem.n_threads, c_mem.time_major_flag, c_mem.single_flag
+        model_old = pickle.loads(pickle.dumps(model))
+        self.assertEqual(model_old.get_output_dirname(), dirname)
+        model_old.iterate()
+
+    def test_mem_layout_flags(self):
+        def get_model(**kwargs):
+            model = Model(seed=1, dt=0.01, n=10, dim=2, spatial_flag=True,
+                          periodic_flag=True, v_0=1.0,
+                          L=np.array([2.0, 2.0]),
+                          tumble_flag=True, p_0=1.0, chi=0.5,
+                          tumble_chemo_flag=True, temporal_chemo_flag=True,
+                          dt_mem=0.05, t_mem=1.0, **kwargs)
+            for _ in range(20):
+                model.iterate()
+            return model
+
+        model_1 = get_model()
+        model_2 = get_model(mem_time_major_flag=True, mem_single_flag=True)
+        rudders = model_2.ships.agents.rudder_sets.sets[0]
+        c_mem = rudders.noise_measurer.dc_dx_measurer.c_mem
+        self.assertTrue(c_mem.time_major_flag)
+        self.assertEqual(c_mem.a.dtype, np.float32)
+        self.assertTrue(np.allclose(model_1.ships.agents.positions.r,
+                                    model_2.ships.agents.positions.r))
@@ -1,5 +1,8 @@
+import pickle
 import numpy as np
-from ahoy import obstructors, turners
+from spatious import distance
+from ahoy import obstructors, turners, positions, directions
+from ahoy.cell_list import CellList
 import test
 
 
@@ -29,3 +32,46 @@ class TestPorousObstructor(test.TestBase):
         self.assertTrue(np.allclose(obstructor_1.R, obstructor_2.R))
         self.assertTrue(np.allclose(obstructor_1.L, obstructor_2.L))
         self.assertTrue(np.allclose(obstructor_1.rs, obstructor_2.rs))
+
+    def test_cell_list_seps(self):
+        L = np.array([200.0, 200.0])
+        R = 10.0
+        rs_pores = positions.get_uniform_points(100, L, rng=self.rng)
+        cell_list = CellList(rs_pores, L, R)
+        rs = positions.get_uniform_points(2000, L, rng=self.rng)
+
+        seps, seps_sq = cell_list.csep_periodic_close(rs)
+        seps_all, seps_sq_all = distance.csep_periodic_close(rs, rs_pores, L)
+        close = seps_sq_all < R ** 2
+        self.assertTrue(np.any(close))
+        self.assertTrue(np.array_equal(seps[close], seps_all[close]))
+        self.assertTrue(np.array_equal(seps_sq[close], seps_sq_all[close]))
+
+    def test_old_snapshot(self):
+        L = np.array([20.0, 20.0])
+        obstructor = obstructors.PorousObstructor(turners.ReflectTurner(),
+                                                  R=4.0, L=L, pf=0.2,
+                                                  rng=self.rng,
+                                                  periodic_flag=True)
+        del obstructor.cell_list
+        obstructor = pickle.loads(pickle.dumps(obstructor))
+        rs = positions.get_uniform_points(200, L, rng=self.rng)
+        seps_sq_all = distance.csep_periodic_close(rs, obstructor.rs, L)[1]
+        close = seps_sq_all < obstructor.R ** 2
+        self.assertTrue(np.any(close))
+        self.assertTrue(np.array_equal(obstructor.get_obstructeds(rs), close))
+
+
+class TestSingleSphereObstructor3D(test.TestBase):
+
+    def test_obstruct(self):
+        obstructor = obstructors.SingleSphereObstructor3D(
+            turners.ReflectTurner(), R=1.0)
+        ps = positions.Positions(np.array([[0.0, 0.0, 0.9],
+                                           [0.0, 0.0, 1.5]]))
+        ds = directions.directions_nd(np.array([[0.0, 0.6, -0.8],
+                                                [0.0, 0.6, -0.8]]))
+        drs = np.array([[0.0, 0.0, -0.2], [0.0, 0.0, -0.2]])
+        obstructor.obstruct(ps, drs, ds)
+        self.assertTrue(np.allclose(ps.r, [[0.0, 0.0, 1.1], [0.0, 0.0, 1.5]]))
+        self.assertTrue(np.allclose(ds.u, [[0.0, 0.6, 0.8], [0.0, 0.6, -0.8]]))
@@ -0,0 +1,105 @@
+from __future__ import print_function, division
+from os.path import join, exists
+import functools
+import os
+import shutil
+import tempfile
+import numpy as np
+from agaro.runner import Runner
+from agaro.measure_utils import t_measures
+from ahoy.model import Model
+from ahoy.utils import pipeline, utils
+import test
+
+
+class TestMeasurePipeline(test.TestBase):
+    model_kwargs = {
+        'seed': 1,
+        'dt': 0.01,
+        'dim': 2,
+        'n': 20,
+        'spatial_flag': True,
+        'periodic_flag': True,
+        'v_0': 1.0,
+        'L': np.array([2.0, 2.0]),
+        'tumble_flag': True,
+        'p_0': 1.0,
+    }
+
+    def setUp(self):
+        super(TestMeasurePipeline, self).setUp()
+        self.dirname = tempfile.mkdtemp()
+        m = Model(**self.model_kwargs)
+        r = Runner(self.dirname, m, force_resume=True)
+        r.iterate(t_upto=0.1, t_output_every=0.02)
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def test_matches_t_measures(self):
+        funcs = [utils.get_ud_vector, utils.get_r_abs]
+        ts, measures = pipeline.MeasurePipeline(funcs, utils.get_time).run(
+            self.dirname)
+        for f in funcs:
+            ts_ref, meases_ref, errs_ref = t_measures(self.dirname,
+                                                      utils.get_time, f)
+            self.assertTrue(np.allclose(ts, ts_ref))
+            self.assertTrue(np.allclose(measures[f.__name__][0], meases_ref,
+                                        equal_nan=True))
+            self.assertTrue(np.allclose(measures[f.__name__][1], errs_ref,
+                                        equal_nan=True))
+
+    def test_cache_reuse(self):
+        calls = []
+
+        def get_n(m):
+            calls.append(m.i)
+            return m.ships.agents.n, 0.0
+
+        p = pipeline.MeasurePipeline([get_n], utils.get_time)
+        ts, measures = p.run(self.dirname)
+        self.assertTrue(exists(join(self.dirname, pipeline.cache_filename)))
+        n_calls = len(calls)
+        self.assertEqual(n_calls, len(ts))
+        ts_cached, measures_cached = p.run(self.dirname)
+        self.assertEqual(len(calls), n_calls)
+        self.assertTrue(np.all(ts == ts_cached))
+        self.assertTrue(np.all(measures['get_n'][0] ==
+                               measures_cached['get_n'][0]))
+
+    def test_explicit_names(self):
+        funcs = [('n', lambda m: (m.ships.agents.n, 0.0)),
+                 ('i', lambda m: (m.i, 0.0)),
+                 ('ud', functools.partial(utils.get_ud_vector))]
+        ts, measures = pipeline.MeasurePipeline(funcs, utils.get_time).run(
+            self.dirname)
+        self.assertTrue(np.all(measures['n'][0] == 20))
+        self.assertFalse(np.all(measures['i'][0] == 20))
+        with self.assertRaises(ValueError):
+            pipeline.MeasurePipeline([lambda m: (0.0, 0.0),
+                                      lambda m: (1.0, 0.0)], utils.get_time)
+        with self.assertRaises(ValueError):
+            pipeline.MeasurePipeline([functools.partial(utils.get_r_abs)],
+                                     utils.get_time)
+
+    def test_code_change(self):
+        def get_n(m):
+            return m.ships.agents.n, 0.0
+        p = pipeline.MeasurePipeline([get_n], utils.get_time)
+        p.run(self.dirname)
+
+        def get_n(m):
+            return 2 * m.ships.agents.n, 0.0
+        p = pipeline.MeasurePipeline([get_n], utils.get_time)
+        ts, measures = p.run(self.dirname)
+        self.assertTrue(np.all(measures['get_n'][0] == 40))
+
+    def test_read_only(self):
+        os.chmod(self.dirname, 0o555)
+        try:
+            ts, measures = utils.t_measures_multi(self.dirname,
+                                                  [utils.get_r_abs])
+        finally:
+            os.chmod(self.dirname, 0o755)
+        self.assertEqual(len(ts), len(measures['get_r_abs'][0]))
+        pipeline._store_cache(os.path.join(self.dirname, 'missing'), {})
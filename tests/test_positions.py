@@ -1,6 +1,6 @@
 from __future__ import print_function, division
 import numpy as np
-from ahoy import positions
+from ahoy import positions, obstructors, turners
 import test
 
 
@@ -54,3 +54,77 @@ class TestPeriodicPositions2D(TestPeriodicPositions1D):
         self.assertTrue(np.allclose(r_naive, ps.r[:, 0]))
         # Check done wrapping along finite axis
         self.assertTrue(np.all(np.abs(ps.r_w[:, 1]) < L[1] / 2.0))
+
+    def test_incremental_wraps(self):
+        drs = self.rng.uniform(-1.0, 1.0, size=(50,) + self.ps.r.shape)
+        for dr in drs:
+            self.ps.displace(dr)
+        r = self.ps.r_0 + np.sum(drs, axis=0)
+        self.assertTrue(np.allclose(self.ps.r, r))
+        wraps_expected = np.floor(r / self.L + 0.5)
+        self.assertTrue(np.all(self.ps.get_wraps() == wraps_expected))
+        self.assertTrue(np.allclose(self.ps.r_w,
+                                    r - wraps_expected * self.L))
+
+    def test_displace_work(self):
+        ps_work = positions.PeriodicPositions(self.L, self.ps.r.copy())
+        work = np.empty([self.ps.n])
+        for _ in range(20):
+            dr = self.rng.uniform(-1.0, 1.0, size=self.ps.r.shape)
+            self.ps.displace(dr)
+            ps_work.displace(dr, work)
+        self.assertTrue(np.all(ps_work.r_w == self.ps.r_w))
+        self.assertTrue(np.all(ps_work.get_wraps() == self.ps.get_wraps()))
+
+    def test_set_r(self):
+        r = self.ps.r + 3.3 * self.L
+        self.ps.r = r
+        self.assertTrue(np.allclose(self.ps.r, r))
+        self.assertTrue(np.all(np.abs(self.ps.r_w) <= self.L / 2.0))
+
+    def test_set_r_in_place(self):
+        r = self.ps.r + 3.3 * self.L
+        self.ps.r[...] = r
+        self.ps.displace(np.zeros_like(r))
+        self.assertTrue(np.allclose(self.ps.r, r))
+        wraps_expected = np.floor(r / self.L + 0.5)
+        self.assertTrue(np.all(self.ps.get_wraps() == wraps_expected))
+        self.assertTrue(np.allclose(self.ps.r_w,
+                                    r - wraps_expected * self.L))
+
+    def test_wrap_in_place(self):
+        r = self.ps.r + 0.6 * self.L
+        self.ps.r_w[...] += 0.6 * self.L
+        self.ps.wrap()
+        self.assertTrue(np.allclose(self.ps.r, r))
+        self.assertTrue(np.all(np.abs(self.ps.r_w) <= self.L / 2.0))
+
+    def test_old_snapshot(self):
+        r = self.ps.r + 2.2 * self.L
+        self.ps.r = r
+        state = self.ps.__dict__.copy()
+        del state['_r']
+        ps_old = positions.PeriodicPositions.__new__(
+            positions.PeriodicPositions)
+        ps_old.__setstate__(state)
+        self.assertTrue(np.allclose(ps_old.r, r))
+
+
+class TestUniformPoints(test.TestBase):
+
+    def test_obstructed_uniform_points(self):
+        n = 1000
+        L = np.array([10.0, 10.0])
+        obstructor = obstructors.PorousObstructor(turners.Turner(), R=0.5,
+                                                  L=L, pf=0.3, rng=self.rng,
+                                                  periodic_flag=True)
+
+        def get_points(seed):
+            rng = np.random.RandomState(seed)
+            return positions.get_uniform_points(n, L, rng=rng,
+                                                obstructor=obstructor)
+
+        r = get_points(1)
+        self.assertFalse(np.any(obstructor.get_obstructeds(r)))
+        self.assertTrue(np.all(np.abs(r) <= L / 2.0))
+        self.assertTrue(np.array_equal(r, get_points(1)))
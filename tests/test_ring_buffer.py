@@ -0,0 +1,93 @@
+from __future__ import print_function, division
+import numpy as np
+from ahoy.ring_buffer import RingBuffer, CylinderBuffer
+import test
+
+
+def integral_transform_naive(a, K, i_zero):
+    n_p = a.shape[-1]
+    return np.sum(a[..., (i_zero + np.arange(n_p)) % n_p] * K, axis=-1)
+
+
+class TestCylinderBuffer(test.TestBase):
+    n_p = 13
+
+    def run_buffer(self, rtol=1e-5, **kwargs):
+        buff = CylinderBuffer(self.n, self.n_p, **kwargs)
+        K = self.rng.normal(size=self.n_p)
+        for _ in range(self.n_p + 5):
+            buff.update(self.rng.normal(size=self.n))
+            a = buff.a.T if buff.time_major_flag else buff.a
+            b_expected = integral_transform_naive(a, K, buff.i_zero)
+            self.assertTrue(np.allclose(buff.integral_transform(K),
+                                        b_expected, rtol=rtol))
+
+    def test_serial(self):
+        self.run_buffer(n_threads=1)
+
+    def test_parallel(self):
+        self.run_buffer(n_threads=4)
+
+    def test_time_major(self):
+        self.run_buffer(time_major_flag=True)
+
+    def test_time_major_parallel(self):
+        # Enough particles to be split into several chunks.
+        self.n = 2500
+        self.run_buffer(n_threads=1, time_major_flag=True)
+        self.run_buffer(n_threads=4, time_major_flag=True)
+
+    def test_old_snapshot(self):
+        buff = CylinderBuffer(self.n, self.n_p)
+        state = buff.__dict__.copy()
+        del state['n_threads']
+        state['inds_p'] = np.arange(self.n)
+        state['inds_a'] = np.arange(self.n_p)
+        buff_old = CylinderBuffer.__new__(CylinderBuffer)
+        buff_old.__setstate__(state)
+        self.assertIsNone(buff_old.n_threads)
+        self.assertFalse(hasattr(buff_old, 'inds_p'))
+        buff_old.update(self.rng.normal(size=self.n))
+        buff_old.integral_transform(self.rng.normal(size=self.n_p))
+
+    def test_single(self):
+        self.run_buffer(rtol=1e-4, single_flag=True)
+        self.run_buffer(rtol=1e-4, single_flag=True, time_major_flag=True)
+        buff = CylinderBuffer(self.n, self.n_p, single_flag=True)
+        self.assertEqual(buff.a.dtype, np.float32)
+
+    def test_integral_transforms(self):
+        for time_major_flag in (False, True):
+            buff = CylinderBuffer(self.n, self.n_p,
+                                  time_major_flag=time_major_flag)
+            Ks = self.rng.normal(size=(3, self.n_p))
+            for _ in range(self.n_p + 5):
+                buff.update(self.rng.normal(size=self.n))
+            bs = buff.integral_transforms(Ks)
+            self.assertEqual(bs.shape, (3, self.n))
+            for K, b in zip(Ks, bs):
+                self.assertTrue(np.allclose(b, buff.integral_transform(K)))
+
+
+class TestRingBuffer(test.TestBase):
+    n_p = 13
+
+    def test_integral_transform(self):
+        buff = RingBuffer(self.n_p)
+        K = self.rng.normal(size=self.n_p)
+        for _ in range(self.n_p + 5):
+            buff.update(self.rng.normal())
+            b_expected = integral_transform_naive(buff.a, K, buff.i_zero)
+            self.assertTrue(np.allclose(buff.integral_transform(K),
+                                        b_expected))
+
+    def test_integral_transforms(self):
+        buff = RingBuffer(self.n_p)
+        Ks = self.rng.normal(size=(3, self.n_p))
+        for _ in range(self.n_p + 5):
+            buff.update(self.rng.normal())
+        bs = buff.integral_transforms(Ks)
+        self.assertEqual(bs.shape, (3,))
+        for K, b in zip(Ks, bs):
+            self.assertTrue(np.isclose(b, integral_transform_naive(
+                buff.a, K, buff.i_zero)))
@@ -57,6 +57,15 @@ class TestRotationRudders2D(test.TestBase):
         self.assertTrue(np.allclose(ds_1.u, ds_2.u))
 
 
+class TestRotationRudders3D(TestRotationRudders2D):
+    rudders_cls = rudders.RotationRudders3D
+    dim = 3
+
+    def setUp(self):
+        super(TestRotationRudders3D, self).setUp()
+        self.t_rot_expect = 1.0 / (2.0 * self.noise_0)
+
+
 class TestTumbleRudders1D(TestRotationRudders2D):
     rudders_cls = rudders.TumbleRudders
     dim = 1
@@ -83,3 +92,7 @@ class TestTumbleRudders1D(TestRotationRudders2D):
 
 class TestTumbleRudders2D(TestTumbleRudders1D):
     dim = 2
+
+
+class TestTumbleRudders3D(TestTumbleRudders1D):
+    dim = 3
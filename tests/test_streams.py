@@ -0,0 +1,100 @@
+from __future__ import print_function, division
+import pickle
+import numpy as np
+from ahoy import streams, threads
+import test
+
+
+class TestParticleStreams(test.TestBase):
+    n = 1000
+    block_size = 64
+
+    def get_streams(self, seed=1, n_threads=1):
+        return streams.ParticleStreams(seed, self.n, self.block_size,
+                                       n_threads)
+
+    def draw(self, ss):
+        mask = np.arange(self.n) % 3 == 0
+        return [ss.uniform(-1.0, 1.0, size=self.n),
+                ss.normal(scale=2.0, size=(self.n, 3)),
+                ss.randint(2, size=self.n, mask=mask)]
+
+    def test_threads(self):
+        draws_1 = self.draw(self.get_streams(n_threads=1))
+        draws_4 = self.draw(self.get_streams(n_threads=4))
+        for d_1, d_4 in zip(draws_1, draws_4):
+            self.assertTrue(np.array_equal(d_1, d_4))
+
+    def test_blocks_independent(self):
+        mask_1 = np.zeros([self.n], dtype=np.bool)
+        mask_1[self.block_size:] = True
+        mask_2 = mask_1.copy()
+        mask_2[:self.block_size] = True
+        ss_1, ss_2 = self.get_streams(), self.get_streams()
+        ss_1.uniform(mask=mask_1), ss_2.uniform(mask=mask_2)
+        # Draws for later blocks are unaffected by those for the first.
+        u_1, u_2 = ss_1.uniform(), ss_2.uniform()
+        self.assertTrue(np.array_equal(u_1[self.block_size:],
+                                       u_2[self.block_size:]))
+        self.assertFalse(np.array_equal(u_1[:self.block_size],
+                                        u_2[:self.block_size]))
+
+    def test_masked_shape(self):
+        mask = self.rng.uniform(size=self.n) < 0.2
+        u = streams.draw_masked(self.get_streams(), 'normal', mask,
+                                shape=(3,))
+        self.assertEqual(u.shape, (mask.sum(), 3))
+
+    def test_size_check(self):
+        with self.assertRaises(ValueError):
+            self.get_streams().uniform(size=self.n + 1)
+
+    def test_seeding(self):
+        u_1 = self.get_streams(seed=1).uniform()
+        u_1_again = self.get_streams(seed=1).uniform()
+        u_2 = self.get_streams(seed=2).uniform()
+        self.assertTrue(np.array_equal(u_1, u_1_again))
+        self.assertFalse(np.allclose(u_1, u_2))
+
+    def test_spawn(self):
+        ss_a, ss_b = self.get_streams().spawn(2)
+        self.assertFalse(np.allclose(ss_a.uniform(), ss_b.uniform()))
+
+    def test_subsystems(self):
+        ss = self.get_streams()
+        ss_rot = ss.get_subsystem('rotation')
+        self.assertTrue(ss.get_subsystem('rotation') is ss_rot)
+        u_rot = ss_rot.uniform()
+        self.assertFalse(np.allclose(
+            u_rot, ss.get_subsystem('obstruction').uniform()))
+        # A subsystem's blocks don't depend on how many blocks there are.
+        ss_more = streams.ParticleStreams(1, 2 * self.n, self.block_size)
+        u_rot_more = ss_more.get_subsystem('rotation').uniform()
+        self.assertTrue(np.array_equal(u_rot, u_rot_more[:self.n]))
+
+    def test_pool(self):
+        ss = self.get_streams(n_threads=4)
+        self.draw(ss)
+        pool = ss._pool
+        self.draw(ss)
+        self.assertTrue(ss._pool is pool)
+        ss_new = pickle.loads(pickle.dumps(ss))
+        self.assertFalse(hasattr(ss_new, '_pool'))
+        for d, d_new in zip(self.draw(ss), self.draw(ss_new)):
+            self.assertTrue(np.array_equal(d, d_new))
+
+    def test_n_threads(self):
+        self.assertEqual(threads.get_n_threads(), threads.default_n_threads)
+        self.assertEqual(threads.get_n_threads(3), 3)
+
+    def test_namespaces(self):
+        ss = self.get_streams()
+        keys = set(s.spawn_key for s in ss.get_seed_seqs())
+        for subsystem in streams.subsystems:
+            keys.update(s.spawn_key
+                        for s in ss.get_subsystem(subsystem).get_seed_seqs())
+        i_streams = streams.namespaces.index('streams')
+        self.assertTrue(all(k[0] == i_streams for k in keys))
+        for i in range(ss.n_blocks + len(streams.subsystems)):
+            s = streams.namespace_seed_seq(1, 'initial', i)
+            self.assertNotIn(s.spawn_key, keys)
@@ -0,0 +1,76 @@
+from __future__ import print_function, division
+import shutil
+import tempfile
+import numpy as np
+from agaro.output_utils import get_recent_model
+from ahoy import sweep
+from ahoy.model import Model
+import test
+
+
+class TestSweep(test.TestBase):
+    model_kwargs = {
+        'dt': 0.01,
+        'dim': 2,
+        'n': 20,
+        'spatial_flag': True,
+        'periodic_flag': True,
+        'v_0': 1.0,
+        'L': np.array([2.0, 2.0]),
+        'tumble_flag': True,
+        'p_0': 1.0,
+        'pore_flag': True,
+        'pore_turner': 'reflect',
+        'pore_R': 0.2,
+        'pore_pf': 0.1,
+    }
+
+    def setUp(self):
+        super(TestSweep, self).setUp()
+        self.output_root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_root)
+
+    def test_make_model_reuse(self):
+        kwargs_1 = dict(self.model_kwargs, seed=1)
+        kwargs_2 = dict(self.model_kwargs, seed=1, v_0=2.0)
+        m_1 = sweep.make_model(kwargs_1)
+        m_2 = sweep.make_model(kwargs_2)
+        m_2_fresh = Model(**kwargs_2)
+        self.assertTrue(m_1.ships.obstructor.rs is m_2.ships.obstructor.rs)
+        self.assertTrue(np.all(m_2.ships.obstructor.rs ==
+                               m_2_fresh.ships.obstructor.rs))
+        self.assertTrue(np.all(m_2.ships.agents.positions.r ==
+                               m_2_fresh.ships.agents.positions.r))
+
+    def test_make_model_reuse_turner(self):
+        kwargs_1 = dict(self.model_kwargs, seed=1)
+        kwargs_2 = dict(self.model_kwargs, seed=1, pore_turner='align')
+        obs_1 = sweep.make_model(kwargs_1).ships.obstructor
+        obs_2 = sweep.make_model(kwargs_2).ships.obstructor
+        self.assertTrue(obs_1.rs is obs_2.rs)
+        self.assertEqual(obs_1.turner.__class__.__name__, 'ReflectTurner')
+        self.assertEqual(obs_2.turner.__class__.__name__, 'AlignTurner')
+
+    def test_obstructor_cache_bounded(self):
+        for seed in range(sweep.obstructor_cache_size + 3):
+            sweep.make_model(dict(self.model_kwargs, seed=seed))
+        self.assertEqual(len(sweep._obstructor_cache),
+                         sweep.obstructor_cache_size)
+
+    def test_sweep_resume(self):
+        param_grid = {'v_0': [1.0, 2.0]}
+        seeds = [1, 2]
+        dirnames = sweep.run_sweep(self.model_kwargs, param_grid, seeds,
+                                   t_output_every=0.05, t_upto=0.1,
+                                   output_root=self.output_root, n_workers=2)
+        self.assertEqual(len(set(dirnames)), 4)
+        for dirname in dirnames:
+            self.assertTrue(get_recent_model(dirname).i > 0)
+        dirnames_resumed = sweep.run_sweep(self.model_kwargs, param_grid,
+                                           seeds, t_output_every=0.05,
+                                           t_upto=0.1,
+                                           output_root=self.output_root,
+                                           n_workers=2)
+        self.assertEqual(dirnames, dirnames_resumed)
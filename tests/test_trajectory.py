@@ -0,0 +1,116 @@
+from __future__ import print_function, division
+import pickle
+import shutil
+import tempfile
+import numpy as np
+from ahoy.model import Model
+from ahoy.trajectory import TrajectoryWriter, Trajectory
+from ahoy.plot.frames import frames_factory
+import test
+
+
+class TestTrajectory(test.TestBase):
+
+    def setUp(self):
+        super(TestTrajectory, self).setUp()
+        self.dirname = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def test_write_read(self):
+        m = Model(seed=1, dt=0.01, dim=2, n=20, spatial_flag=True,
+                  periodic_flag=True, v_0=1.0, L=np.array([1.0, 2.0]),
+                  tumble_flag=True, p_0=1.0)
+        r_0 = m.ships.agents.positions.r.copy()
+        with TrajectoryWriter(self.dirname, every=2, chunk_size=3) as writer:
+            m.add_observer(writer)
+            for _ in range(20):
+                m.iterate()
+
+        traj = Trajectory(self.dirname)
+        self.assertEqual(traj.n_frames, 11)
+        self.assertTrue(np.array_equal(traj.i, np.arange(0, 21, 2)))
+        self.assertTrue(np.allclose(traj.get_r(0), r_0, atol=1e-5))
+        ps = m.ships.agents.positions
+        self.assertTrue(np.allclose(traj.get_r(-1), ps.r, atol=1e-5))
+        self.assertTrue(np.allclose(traj.get_r_w(-1), ps.r_w, atol=1e-5))
+        self.assertTrue(np.allclose(traj.get_u(-1),
+                                    m.ships.agents.directions.u, atol=1e-5))
+        self.assertTrue(np.allclose(traj.static['r_0'], ps.r_0))
+        self.assertEqual(traj.get_r_w(slice(0, 4)).shape, (4, 20, 2))
+
+    def test_far_travelled(self):
+        m = Model(seed=1, dt=0.01, dim=2, n=20, spatial_flag=True,
+                  periodic_flag=True, v_0=1.0, L=np.array([1.0, 2.0]))
+        ps = m.ships.agents.positions
+        ps.r = ps.r + 123457.0 * ps.L
+        writer = TrajectoryWriter(self.dirname)
+        m.observers.append(writer)
+        m.iterate()
+        writer.flush()
+
+        traj = Trajectory(self.dirname)
+        self.assertTrue(np.allclose(traj.get_r_w(-1), ps.r_w, atol=1e-5))
+        self.assertTrue(np.allclose(traj.get_r(-1), ps.r, rtol=0.0,
+                                    atol=1e-5))
+
+    def test_frames(self):
+        m = Model(seed=1, dt=0.01, dim=2, n=20, spatial_flag=True,
+                  periodic_flag=True, v_0=1.0, L=np.array([1.0, 2.0]),
+                  tumble_flag=True, p_0=1.0)
+        writer = TrajectoryWriter(self.dirname)
+        m.observers.append(writer)
+        r_ws = []
+        for _ in range(10):
+            m.iterate()
+            r_ws.append(m.ships.agents.positions.r_w.copy())
+        writer.flush()
+
+        frames = frames_factory(self.dirname, n_prefetch=1)
+        self.assertEqual(len(frames), 10)
+        for i in [0, 1, 5, 4, 9]:
+            self.assertTrue(np.allclose(frames[i].r_w, r_ws[i], atol=1e-5))
+
+    def get_model(self):
+        return Model(seed=1, dt=0.01, dim=2, n=20, spatial_flag=True,
+                     periodic_flag=True, v_0=1.0, L=np.array([1.0, 2.0]),
+                     tumble_flag=True, p_0=1.0)
+
+    def test_stale_trajectory(self):
+        m = self.get_model()
+        with TrajectoryWriter(self.dirname) as writer:
+            m.add_observer(writer)
+            for _ in range(10):
+                m.iterate()
+
+        m = self.get_model()
+        with TrajectoryWriter(self.dirname) as writer:
+            m.add_observer(writer)
+            for _ in range(3):
+                m.iterate()
+
+        traj = Trajectory(self.dirname)
+        self.assertTrue(np.array_equal(traj.i, np.arange(4)))
+
+    def test_resume(self):
+        m = self.get_model()
+        writer = TrajectoryWriter(self.dirname, chunk_size=3)
+        m.add_observer(writer)
+        for _ in range(5):
+            m.iterate()
+        m_snapshot = pickle.loads(pickle.dumps(m))
+        for _ in range(5):
+            m.iterate()
+        writer.close()
+
+        # Resume from the snapshot, as after a crash.
+        for _ in range(3):
+            m_snapshot.iterate()
+        m_snapshot.observers[0].close()
+
+        traj = Trajectory(self.dirname)
+        self.assertTrue(np.array_equal(traj.i, np.arange(9)))
+        self.assertTrue(np.allclose(traj.get_r(-1),
+                                    m_snapshot.ships.agents.positions.r,
+                                    atol=1e-5))
@@ -169,3 +169,42 @@ class TestAlignTurner(TestTurner):
 
     def test_NE_SW(self):
         self.do_antiparallel(self.NE, self.SW, self.NW, self.SE)
+
+
+class TestTurners3D(test.TestBase):
+    normal = np.array([[-1.0, 0.0, 0.0]])
+
+    def do_turning(self, turner, u_in, u_out_expected):
+        u_out = turner.get_vector(np.array([u_in]), self.normal, self.rng)
+        self.assertTrue(np.allclose(u_out, u_out_expected))
+
+    def test_stall(self):
+        self.do_turning(turners.Turner(), [1.0, 0.0, 0.0], [1.0, 0.0, 0.0])
+
+    def test_bounce_back(self):
+        self.do_turning(turners.BounceBackTurner(), [0.6, 0.8, 0.0],
+                        [-0.6, -0.8, 0.0])
+
+    def test_reflect(self):
+        self.do_turning(turners.ReflectTurner(), [0.6, 0.0, 0.8],
+                        [-0.6, 0.0, 0.8])
+
+    def test_align(self):
+        self.do_turning(turners.AlignTurner(), [0.6, 0.0, 0.8],
+                        [0.0, 0.0, 1.0])
+
+    def do_align_along(self, u_in_x):
+        n = 1000
+        u_in = np.zeros([n, 3])
+        u_in[:, 0] = u_in_x
+        normals = np.repeat(self.normal, n, axis=0)
+        u_out = turners.AlignTurner().get_vector(u_in, normals, self.rng)
+        self.assertTrue(np.allclose(u_out[:, 0], 0.0))
+        self.assertTrue(np.allclose(np.sum(np.square(u_out), axis=-1), 1.0))
+        self.assertTrue(np.all(np.abs(np.mean(u_out, axis=0)) < 0.1))
+
+    def test_align_antiparallel(self):
+        self.do_align_along(1.0)
+
+    def test_align_parallel(self):
+        self.do_align_along(-1.0)